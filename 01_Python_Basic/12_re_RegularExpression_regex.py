@@ -30,6 +30,7 @@
 22. re.split(): Returns a list where the string has been split at each match
 23. re.sub(): Replaces one or many matches with a string
 24. Match Object
+25. Scan large text files for many patterns at once (pattern_scanner.py)
 '''
 
 
@@ -680,4 +681,38 @@ x = re.search(pattern, pos_nucleotide_3)
 print(x.groups())  # Output: ('100', 'A')
 print(x.group(1))  # Output: '100'
 print(x.group(2))  # Output: 'A'
-print(x.group())   # Output: '100A'
\ No newline at end of file
+print(x.group())   # Output: '100A'
+
+
+#-------------------------------------------------------------------------------------------#
+#--------- 25. Scan large text files for many patterns at once (pattern_scanner.py) --------#
+#-------------------------------------------------------------------------------------------#
+
+'''
+re.findall(pattern, text) reads the whole text once PER pattern: 300 keywords over a 10 GB corpus = 300 passes over 10 GB.
+scan_files() from pattern_scanner.py (same directory):
+    + compiles the pattern set ONCE (cached by compile_patterns())
+    + merges the literal keywords into ONE regex shaped like a trie ("rain", "rainbow", "rhyme" -> r(?:ain(?:bow)?|hyme)):
+      a single pass finds all of them, only the real regexes ("[0-9]+", ...) get a pass each
+    + memory-maps the files (bytes, nothing copied) and scans them by ranges of chunk_bytes in parallel (workers processes),
+      each range overlapping the next one, so a match across 2 ranges is found once
+    + yields (file, byte offset, pattern_id): the same matches as one re.finditer() per pattern over each whole file
+See benchmark_pattern_scanner.py: 300 keywords + 3 regexes ~35x faster than one re.finditer() per pattern.
+'''
+
+from pathlib import Path
+from pattern_scanner import compile_patterns, scan_files
+
+patterns = {"rain": "rain", "rainbow": "rainbow", "humpty": "Humpty", "score": r"\d{2,3}"} # {pattern_id: pattern}
+
+pattern_set = compile_patterns(tuple(patterns.items()), whole_words=True)
+print(pattern_set.keyword_regex.pattern)  # b'(?=(\\b(?:Humpty|rain(?:bow)?)\\b))'
+print(pattern_set.scan(b"The rain in Spain, a rainbow. Score: 95")) # [(4, 'rain'), (21, 'rainbow'), (37, 'score')]
+print(compile_patterns((("he", "he"), ("hello", "hello"))).scan(b"hello")) # [(0, 'he'), (0, 'hello')]: every keyword starting at an offset
+
+if __name__ == "__main__": # Needed for the processes of the pool (workers > 1)
+    for file_path, offset, pattern_id in scan_files(sorted(Path("demo_data/txt_files").glob("*.txt")), patterns, workers=4, whole_words=True):
+        print(Path(file_path).name, offset, pattern_id)
+    # HumptyDumpty.txt 0 humpty
+    # HumptyDumpty.txt 29 humpty
+    # ...
@@ -173,6 +173,31 @@ for chunk in process_csv_chunks(f"{parent_dir}/weather.tsv", chunk_size=chunk_si
     for row in chunk:
         print(row)  # Or whatever processing you need
 
+##############################################################################
+## (ADVANCED) Read a LARGE .csv or .tsv file as typed columns, in parallel ##
+##############################################################################
+'''
+process_csv_chunks() still keeps every cell as a string inside one dictionary per row, the worst layout for files of several GBs.
+read_csv_chunks() from csv_chunk_reader.py (same directory) yields each chunk as {column name: NumPy array} instead:
+    + The dtype of each column is inferred from the first chunk: int64, then float64, else object (strings)
+    + Missing values ("", "NA", "NaN", "null", ...) become NaN, so "WindGustSpeed" (having "NA") is a float64 column
+    + With workers > 1, the file is split into byte ranges ending on a newline OUTSIDE of quoted fields
+      (a quoted field can contain newlines), and each range is parsed by a process of a Pool
+'''
+
+from csv_chunk_reader import read_csv_chunks
+
+if __name__ == "__main__": # Needed by the Pool when the processes are started by "spawn" (Windows, macOS)
+    for chunk in read_csv_chunks(f"{parent_dir}/weather.tsv", delimiter="\t", chunk_size=100_000, workers=4):
+        print({column: values.dtype for column, values in list(chunk.items())[:6]})
+        # {'MinTemp': dtype('float64'), 'MaxTemp': dtype('float64'), 'Rainfall': dtype('float64'), 'Evaporation': dtype('float64'), 'Sunshine': dtype('float64'), 'WindGustDir': dtype('O')}
+
+        print(chunk["MaxTemp"].mean()) # 20.550273224043714 (computed at once on the whole column, no loop over the rows)
+
+    # Or get each chunk as a pandas DataFrame
+    for df_chunk in read_csv_chunks(f"{parent_dir}/drinks.csv", as_dataframe=True):
+        print(df_chunk.dtypes["beer_servings"]) # int64
+
 
 #--------------------------------------------------------------------------------#
 #----------------------- Write .csv and .tsv files ------------------------------#
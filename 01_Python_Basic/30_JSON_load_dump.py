@@ -18,6 +18,7 @@ Table of Contents:
 1. json.loads() and json.load()
 2. json.dumps() and json.dump()
 3. Data Conversion between JSON and Python
+4. LARGE JSON arrays: streaming reader/writer (json_stream.py)
 '''
 
 import json
@@ -164,4 +165,36 @@ string       str
 number       int or float
 array        list
 object       dict
-'''
\ No newline at end of file
+'''
+
+
+#------------------------------------------------------------------------#
+#------------ LARGE JSON arrays: streaming (json_stream.py) -------------#
+#------------------------------------------------------------------------#
+
+'''
+json.load() builds the WHOLE document in memory: a JSON export of several GBs needs several times that in RAM.
+json_stream.py (same directory) reads an array of records ONE element at a time, by chunks of the file:
+    + iter_json_array(): the elements of a top-level array, or of a nested one with path (["data", "records"] or "data.records")
+    + iter_json_batches() / iter_json_columns(): lists of batch_size elements, or columns {key: NumPy array} / pandas DataFrames
+    + dump_json_array() / JsonArrayWriter: write the records one by one as a valid JSON array, without building the list
+See benchmark_json_stream.py: 1 million records (91 MB) read with ~35 MB of memory instead of ~580 MB with json.load()
+'''
+
+from json_stream import iter_json_array, iter_json_columns, dump_json_array
+
+for record in iter_json_array(f"{parent_dir}/large_100_age_1000.json"): # Top-level array: [{"Tree":"1","age":1004,...}, ...]
+    print(record)
+    break
+# {'Tree': '1', 'age': 1004, 'circumference': 115}
+
+print(list(iter_json_array(f"{parent_dir}/emps.json", path=["Name"]))) # The array of the key "Name" in the object
+# ['Rick', 'Dan', 'Michelle', 'Ryan', 'Gary', 'Nina', 'Simon', 'Guru']
+
+for columns in iter_json_columns(f"{parent_dir}/large_100_age_1000.json", batch_size=10):
+    print(columns["age"].dtype, columns["age"].mean()) # int64 1261.3
+    break
+
+n_records = dump_json_array((record for record in iter_json_array(f"{parent_dir}/large_100_age_1000.json") if record["age"] > 1500),
+                            f"{parent_dir}/new_written_old_trees.json")
+print(n_records) # 5 (written one by one, the filtered list is never built)
@@ -141,6 +141,38 @@ def summarize_xml_structure(element, level=0):
 summarize_xml_structure(root_food)
 
 
+####################################################
+## LARGE XML files: stream them with iterparse()  ##
+####################################################
+
+'''
+ET.parse() loads the whole tree in memory (~6 times the size of the file), and summarize_xml_structure() is recursive
+(RecursionError on a very deep document). xml_stream.py (same directory) reads the file with ET.iterparse()
+and frees each element once it has been used, so the memory stays flat whatever the size of the file:
+    + summarize_xml_stream(): count, elements with text and attribute names of each tag path, without recursion
+    + iter_xml_records() / iter_xml_chunks(): each record element as a flat dictionary (or columnar chunks of them)
+    + xml_to_csv(): the records written straight to a .csv file
+'''
+
+from xml_stream import summarize_xml_stream, print_xml_summary, iter_xml_records, xml_to_csv
+import tempfile
+
+print_xml_summary(summarize_xml_stream(f'{parent_dir}/food.xml'))
+# breakfast_menu (x1, with text: 0)
+#   food (x5, with text: 0)
+#     name (x5, with text: 5)
+#     price (x5, with text: 5)
+#     description (x5, with text: 5)
+#     calories (x5, with text: 5)
+
+print(next(iter_xml_records(f'{parent_dir}/food.xml', record_tag="food")))
+# {'name': 'Belgian Waffles', 'price': '$5.95', 'description': 'Two of our famous Belgian Waffles with plenty of real maple syrup', 'calories': '650'}
+
+with tempfile.TemporaryDirectory() as temporary_dir: # The demo_data directory is left unchanged
+    n_rows = xml_to_csv(f'{parent_dir}/food.xml', record_tag="food", csv_path=f'{temporary_dir}/food.csv')
+    print(n_rows) # 5 (columns: name,price,description,calories)
+
+
 #--------------------------------------------------#
 #-------------- 4. Navigate XML tree --------------#
 #--------------------------------------------------#
@@ -23,6 +23,7 @@ Flow of contents:
 7. CSS selectors (select / select_one)
 8. Extraction loop pattern (optional CSV write)
 9. Common scraping gotchas (missing tags, encoding, timeouts)
+10. Scraping MANY pages: concurrent, cached engine (scrape_engine.py)
 
 No def/class used, only built-in modules + bs4. 
 '''
@@ -525,3 +526,38 @@ with open(output_path, "w", newline="", encoding="utf-8") as f:
 '''
 
 time.sleep(0.25)
+
+
+#------------------------------------------------------------------------------------------------#
+#---------------------- 10. Scraping MANY pages: concurrent, cached engine ----------------------#
+#------------------------------------------------------------------------------------------------#
+
+'''
+The loop above (requests.get + time.sleep, page by page) is fine for a few pages. For thousands of pages,
+ScrapeEngine from scrape_engine.py (same directory) does the same work:
+    + keep-alive connections (one requests.Session per thread) and retries with backoff on 429/5xx
+    + several pages fetched at once (max_workers threads), but at most one request every min_interval seconds per host
+    + an on-disk cache keyed by URL: a rerun revalidates each page with ETag / Last-Modified ("304 Not Modified", no body)
+      or, within max_age seconds, does not send any request at all
+    + parsed with "lxml" when it is installed, and only the tags given by parse_only (SoupStrainer)
+See benchmark_scrape_engine.py: ~3x faster than the loop on a cold cache, ~10x on a fresh cache (local test server).
+'''
+
+from scrape_engine import ScrapeEngine
+from pathlib import Path
+import tempfile
+
+cache_dir = Path(tempfile.gettempdir()) / "scrape_cache" # Not in the working directory, but kept for the next runs
+page_urls = [f"https://quotes.toscrape.com/page/{page}/" for page in range(1, 11)]
+
+with ScrapeEngine(cache_dir=cache_dir, max_workers=8, min_interval=0.25, max_age=3600) as engine:
+    for result in engine.scrape(page_urls,
+                                extract=lambda page_soup: [span.get_text(strip=True) for span in page_soup.find_all("span", class_="text")],
+                                parse_only="span"): # Only the <span> tags are built into the tree
+        if result["error"] is not None: # A failed page does not stop the others
+            print("Failed:", result["url"], result["error"])
+            continue
+        print(result["url"], result["status"], result["from_cache"], len(result["data"]))
+# https://quotes.toscrape.com/page/2/ 200 False 10 (in the order the pages complete; False = downloaded)
+# ...
+# On a rerun within max_age: https://quotes.toscrape.com/page/2/ 200 fresh 10 (read from cache_dir, no request)
@@ -11,6 +11,7 @@ Flow of contents:
 2. path_object.glob(pattern) - Search for files matching a pattern in the directory. (like glob.glob())
 3. path_object.rglob(pattern) - Recursively search for files matching a pattern in the directory and subdirectories.
 4. path_object.walk() [Python 3.12+] - Recursively walk through the directory tree, yielding tuples of directory paths and file names.
+5. FileIndex (file_index.py) - Repeat glob/rglob searches over HUGE trees from a persistent index instead of walking again.
 '''
 
 from pathlib import Path
@@ -443,4 +444,38 @@ for dirpath, dirnames, filenames in Path(target_path).joinpath("01_Python_Basic"
 # File: 05_Casting_Convert_Datatypes.py
 # File: 06_Operators.py
 # File: 07_input_eval.py
-# File: 10_String_methods_Cell.py
\ No newline at end of file
+# File: 10_String_methods_Cell.py
+
+
+#--------------------------------------------------------------------------------------------------------------#
+#------------------------ 5. Repeated searches over HUGE trees: FileIndex (file_index.py) ---------------------#
+#--------------------------------------------------------------------------------------------------------------#
+
+'''
+Each rglob()/walk() above lists all the directories again. Over a tree of millions of files, repeating the same searches
+on every run costs seconds each time. FileIndex from file_index.py (same directory):
+    + walks the tree once with os.scandir() (directories of a level in parallel), keeps (path, size, mtime, suffix)
+      of every file, and saves the index to a pickle file
+    + refresh(): only re-scans the directories whose mtime changed (files added/removed/renamed), a stat() for the others
+    + glob()/rglob(): same patterns as pathlib, answered from the index, a repeated pattern in microseconds
+See benchmark_file_index.py for the timings against Path.glob() on a generated tree.
+'''
+
+from file_index import FileIndex
+import tempfile
+
+index_path = Path(tempfile.gettempdir()) / "demo_data_index.pkl" # Not in the working directory, but kept for the next runs
+index = FileIndex(demo_path, index_path=index_path) # Loads the saved index if it exists
+print(index.refresh()) # {'directories': 5, 'rescanned': 5, 'files': ..., 'seconds': ...} (rescanned: 0 on the next runs if nothing changed)
+
+for entry in index.rglob("*.json"): # Same files as demo_path.rglob("*.json"), without walking the tree
+    print(entry)
+# /home/longdpt/Documents/Academic/DataScience_MachineLearning/01_Python_Basic/demo_data/json_files/books.json
+# /home/longdpt/Documents/Academic/DataScience_MachineLearning/01_Python_Basic/demo_data/json_files/emps.json
+# ...
+
+for path, size, mtime_ns, suffix in index.records("xml_files/*"): # The size and mtime come from the index too
+    print(path.name, size, suffix)
+# music_cd.xml 4307 .xml
+# food.xml 1152 .xml
+# ...
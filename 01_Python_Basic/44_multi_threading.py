@@ -163,6 +163,14 @@ outputs = multithread_process(input_blocks=inputs, max_threads=4)
 print(outputs)
 # Output: [[3, 2, 1], ['c', 'b', 'a'], [40, 30, 20, 10], [200, 100], ['z', 'y', 'x']]
 
+'''
+NOTE: the threads share the memory of the process, so the input blocks are NOT copied (or pickled) to the threads,
+      they only receive a reference to the same objects. So LARGE NumPy blocks can be passed directly,
+      and NumPy releases the GIL during most of its calculations.
+
+      Only the processes of 45_multi_processing.py have to copy the blocks (see shared_memory_blocks.py to avoid it)
+'''
+
 
 ##### Write outputs into  files #####
 
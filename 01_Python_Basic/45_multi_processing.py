@@ -133,6 +133,28 @@ print(outputs)
 # Output: [[3, 2, 1], ['c', 'b', 'a'], [40, 30, 20, 10], [200, 100], ['z', 'y', 'x']]
 
 
+###### LARGE NumPy blocks: shared memory instead of pickling ######
+
+'''
+pool.map() pickles every input block into its task, and every output block back to the main process.
+For NumPy blocks of MBs, this copying can cost more than the calculation itself.
+
+shared_multicore_process() from shared_memory_blocks.py (same directory) puts the input and output arrays
+in "multiprocessing.shared_memory" segments: the tasks only carry (name, shape, dtype, start, stop),
+each process writes its result IN PLACE, and the segments are freed automatically at the end.
+=> 3 to 4 times faster than pickling for a 128 MB array (see benchmark_shared_memory.py)
+'''
+
+import numpy as np
+from shared_memory_blocks import shared_multicore_process
+
+if __name__ == '__main__':
+    input_array = np.random.random((1_000_000, 8)) # 64 MB of float64
+
+    output_array = shared_multicore_process(np.sqrt, input_array, block_rows=100_000, max_processes=4) # 10 blocks of 100_000 rows
+    print(np.array_equal(output_array, np.sqrt(input_array))) # True
+
+
 ####### save output to multiple files #######
 
 from multiprocessing import Pool
@@ -226,3 +248,34 @@ Overhead             | Lower overhead                       | Higher overhead
 Complexity           | Needs synchronization (locks, etc.)  | More complex IPC and data sharing
 Performance          | No speedup for CPU-bound Python code | Speedup for CPU-bound tasks
 '''
+
+
+#---------------------------------------------------------------------------------#
+#------------ Let parallel_map() choose threads, processes or serial -------------#
+#---------------------------------------------------------------------------------#
+
+'''
+Instead of guessing which one fits, parallel_map() from parallel_map.py (same directory) runs a short calibration
+on the first blocks (CPU time vs wall time, then a few blocks on threads at once), and picks:
+    + a thread pool: for a function mostly waiting (I/O), or CPU-heavy but releasing the GIL (NumPy, hashlib, ...)
+    + a process pool: for pure-Python CPU work, long enough to pay the start of the processes
+    + serial: for short work, or when there is only one CPU
+The results keep the order of the input blocks, exceptions are raised again, and tqdm shows the progress.
+'''
+
+from parallel_map import parallel_map, calibrate
+
+def target_function(single_block):
+    return single_block[::-1]
+
+if __name__ == '__main__':
+    inputs = [[1, 2, 3], ['a', 'b', 'c'], [10, 20, 30, 40], [100, 200], ['x', 'y', 'z']]
+
+    outputs = parallel_map(target_function, inputs)
+    # parallel_map [serial x1, chunk 1]: 100%|██████████| 5/5 [00:00<00:00, 71089.90it/s]
+    print(outputs) # [[3, 2, 1], ['c', 'b', 'a'], [40, 30, 20, 10], [200, 100], ['z', 'y', 'x']] (too short to be worth any pool)
+
+    plan, _ = calibrate(time.sleep, [0.2] * 20) # Mostly waiting
+    print(plan["mode"], plan["workers"]) # threads 18
+
+    outputs = parallel_map(target_function, inputs, mode="processes", max_workers=4) # The choice can also be forced
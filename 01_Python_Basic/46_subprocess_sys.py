@@ -972,3 +972,40 @@ process = subprocess.Popen(['nohup', 'python', 'daemon.py'],
 
 print(f"Started detached process with PID: {process.pid}")
 # (Process continues even if this Python script exits)
+
+
+#---------------------------------------------------------------------------------------------#
+#------------------ THOUSANDS of commands: asyncio fan-out (subprocess_fanout.py) ------------#
+#---------------------------------------------------------------------------------------------#
+
+'''
+The Popen loop above starts ALL the commands at once and keeps all their output in memory until communicate().
+For thousands of short commands, run_commands() from subprocess_fanout.py (same directory) follows
+the pipes and the exit of each process in an asyncio event loop instead:
+    + at most max_concurrency commands running at the same time, the others waiting in the queue
+    + a timeout per command (killed with its process group)
+    + stdout/stderr streamed line by line to a callback on_line(index, stream, line) and/or to files, not kept in memory
+    + one result per command (exit status, wall time, CPU time from os.wait4(), number of lines), and format_summary() for a table
+See benchmark_subprocess_fanout.py: 2000 short commands ~8x faster than subprocess.run() one by one.
+'''
+
+from subprocess_fanout import run_commands, format_summary
+
+commands = [[sys.executable, '-c', f'print("Process {i} done")'] for i in range(20)]
+commands.append([sys.executable, '-c', 'import time; time.sleep(10)']) # Killed by the timeout
+
+results, batch = run_commands(commands, max_concurrency=8, timeout=2,
+                              on_line=lambda index, stream, line: print(f"[{index} {stream}] {line}"))
+# [0 stdout] Process 0 done
+# [1 stdout] Process 1 done
+# ...
+
+print(results[0]["returncode"], results[20]["timed_out"]) # 0 True
+print(format_summary(results, batch, max_rows=3))
+#  index | status     |  wall (s) |  cpu (s) | out lines | err lines | command
+# ----------------------------------------------------------------------------
+#     20 | timeout    |     2.006 |    0.040 |         0 |         0 | /usr/bin/python -c 'import time; time.sleep(10)'
+#      3 | exit 0     |     0.171 |    0.042 |         1 |         0 | /usr/bin/python -c 'print("Process 3 done")'
+#      5 | exit 0     |     0.168 |    0.041 |         1 |         0 | /usr/bin/python -c 'print("Process 5 done")'
+# ... (18 faster commands not shown)
+# 21 commands in 2.350 s (9 commands/s, 8 at a time) | CPU 0.990 s | succeeded 20, failed 0, timed out 1, errors 0
@@ -0,0 +1,116 @@
+'''
+Benchmark of FileIndex (file_index.py) against walking the tree with Path.glob()/Path.rglob() on every search
+
+A temporary tree of --files files (json, csv, txt, no suffix) is created in nested directories, then:
+    + pathlib: each pattern searched with Path(root).glob(pattern) (files only), walking the tree every time
+    + index build: first refresh() of an empty index (parallel os.scandir walk), then saved to a pickle file
+    + index load / refresh: a new FileIndex loading the pickle file, then an incremental refresh() with nothing changed,
+      then again after a few files have been added to --changed-dirs directories
+    + first / repeated query: each pattern answered from the index, the first time then from the results kept
+It exits with an error if a result differs from pathlib, if the incremental refresh re-scans more than the changed
+directories, if the first queries are not faster than pathlib, or if the repeated queries are not at least
+--min-speedup times faster (all patterns together).
+
+Usage (must be in 01_Python_Basic first):
+    python benchmark_file_index.py
+    python benchmark_file_index.py --files 1000000 --files-per-dir 200
+'''
+
+from argparse import ArgumentParser
+from pathlib import Path
+import os, sys, tempfile, time
+
+from file_index import FileIndex
+
+PATTERNS = ["**/*.json", "*.txt", "d001/**/*.csv", "d0[0-4]*/**/file_?2.json", "**/file_1*"]
+SUFFIXES = [".json", ".csv", ".txt", ""]
+
+
+def build_tree(root, n_files, files_per_dir):
+    # root/dXXX/sXX/fileN.suffix (plus a few files in the root)
+    n_dirs = max(n_files // files_per_dir, 1)
+    for dir_id in range(n_dirs):
+        directory = os.path.join(root, f"d{dir_id // 50:03d}", f"s{dir_id % 50:02d}")
+        os.makedirs(directory, exist_ok=True)
+        for file_id in range(files_per_dir):
+            with open(os.path.join(directory, f"file_{file_id}{SUFFIXES[file_id % len(SUFFIXES)]}"), "w") as file_pointer:
+                file_pointer.write("x" * (file_id % 7))
+
+    for file_id in range(10):
+        Path(root, f"top_{file_id}{SUFFIXES[file_id % len(SUFFIXES)]}").write_text("top")
+
+
+def timed(function, *args):
+    t0 = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark FileIndex against Path.glob()/rglob() on a generated tree.")
+    parser.add_argument("--files", type=int, default=200_000, help="Number of files of the generated tree.")
+    parser.add_argument("--files-per-dir", type=int, default=100, help="Number of files per directory.")
+    parser.add_argument("--changed-dirs", type=int, default=5, help="Directories where files are added before the incremental refresh.")
+    parser.add_argument("--min-speedup", type=float, default=100.0, help="The repeated queries must be at least this many times faster than pathlib.")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        root, index_path = os.path.join(temporary_dir, "tree"), os.path.join(temporary_dir, "tree_index.pkl")
+        _, seconds = timed(build_tree, root, args.files, args.files_per_dir)
+        print(f"tree of {args.files} files created in {seconds:.1f} s")
+        time.sleep(2.1) # Past RACY_SECONDS: the mtimes of the new directories can be trusted by the index
+
+        index = FileIndex(root, index_path=index_path)
+        stats, seconds = timed(index.refresh)
+        print(f"index build              {seconds:8.3f} s | {stats['files']} files in {stats['directories']} directories")
+
+        index, seconds = timed(FileIndex, root, index_path)
+        print(f"index load               {seconds:8.3f} s")
+        stats, seconds = timed(index.refresh)
+        print(f"refresh (no change)      {seconds:8.3f} s | {stats['rescanned']} directories re-scanned")
+        if stats["rescanned"] != 0:
+            print(f"REGRESSION: {stats['rescanned']} directories re-scanned while nothing changed")
+            failed = True
+
+        changed_dirs = sorted({path.parent for path in index.rglob("file_0.json")})[:args.changed_dirs]
+        for directory in changed_dirs:
+            (directory / "file_new.json").write_text("new")
+        time.sleep(2.1)
+        stats, seconds = timed(index.refresh)
+        print(f"refresh ({len(changed_dirs)} dirs changed) {seconds:8.3f} s | {stats['rescanned']} directories re-scanned")
+        if stats["rescanned"] != len(changed_dirs):
+            print(f"REGRESSION: {stats['rescanned']} directories re-scanned, expected {len(changed_dirs)}")
+            failed = True
+
+        totals = {"pathlib": 0.0, "first": 0.0, "repeated": 0.0}
+        for pattern in PATTERNS:
+            expected, pathlib_seconds = timed(lambda: sorted(path for path in Path(root).glob(pattern) if path.is_file()))
+            first, first_seconds = timed(index.glob, pattern)
+            repeated, repeated_seconds = timed(index.glob, pattern)
+            totals["pathlib"] += pathlib_seconds
+            totals["first"] += first_seconds
+            totals["repeated"] += repeated_seconds
+
+            print(f"{pattern:<26} {len(expected):>7} files | pathlib {pathlib_seconds:7.3f} s | index first {first_seconds:7.4f} s"
+                  f" | repeated {repeated_seconds * 1e3:7.3f} ms")
+
+            if sorted(first) != expected or sorted(repeated) != expected:
+                print(f"MISMATCH: the index does not give the same files as pathlib for {pattern!r}")
+                failed = True
+
+        speedup = totals["pathlib"] / max(totals["repeated"], 1e-9)
+        print(f"all patterns: pathlib {totals['pathlib']:.3f} s | index first {totals['first']:.3f} s | repeated {totals['repeated'] * 1e3:.3f} ms | {speedup:.0f}x")
+        if totals["first"] >= totals["pathlib"]:
+            print("REGRESSION: the first queries from the index are not faster than walking the tree")
+            failed = True
+        if speedup < args.min_speedup:
+            print(f"REGRESSION: the repeated queries are {speedup:.0f}x faster, expected at least {args.min_speedup}x")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+'''
+Benchmark of the streaming JSON reader/writer (json_stream.py) against json.load()/json.dump() of the whole list
+
+A temporary file holding {"meta": {...}, "records": [...]} with --records records is written, then read back by:
+    + json.load: the whole document, then the records of "records"
+    + iter_json_array: the records one by one (path="records")
+    + iter_json_columns: the records as NumPy columns, by batches of --batch-size
+and written again by json.dump (the whole list built first) and by dump_json_array (from a generator).
+Each way runs in its own fresh process, so its peak memory (ru_maxrss) is measured alone.
+A last check reads integers beyond int64 (2**64 - 1, 2**70) as columns, which must keep their exact values.
+It exits with an error if the results differ, or if the streaming reader peaks above --max-memory-ratio of json.load.
+
+Usage (must be in 01_Python_Basic first):
+    python benchmark_json_stream.py
+    python benchmark_json_stream.py --records 5000000
+'''
+
+from argparse import ArgumentParser
+import json, multiprocessing, os, resource, sys, tempfile, time
+
+from json_stream import iter_json_array, iter_json_columns, dump_json_array
+
+
+def make_record(i):
+    return {"id": i, "tree": str(i % 50), "age": 1000 + i % 700, "circumference": (i * 7) % 250 / 1.5, "tags": ["oak", "old"] if i % 3 else []}
+
+
+def read_json_load(file_path, batch_size):
+    with open(file_path, "r", encoding="utf-8") as json_pointer:
+        records = json.load(json_pointer)["records"]
+    return len(records), sum(record["age"] for record in records)
+
+
+def read_iter_json_array(file_path, batch_size):
+    n_records, total_age = 0, 0
+    for record in iter_json_array(file_path, path="records"):
+        n_records += 1
+        total_age += record["age"]
+    return n_records, total_age
+
+
+def read_iter_json_columns(file_path, batch_size):
+    n_records, total_age = 0, 0
+    for columns in iter_json_columns(file_path, batch_size=batch_size, path="records", columns=["id", "age"]):
+        n_records += len(columns["id"])
+        total_age += int(columns["age"].sum())
+    return n_records, total_age
+
+
+def write_json_dump(file_path, n_records):
+    with open(file_path, "w", encoding="utf-8") as json_pointer:
+        json.dump([make_record(i) for i in range(n_records)], json_pointer)
+    return n_records, None
+
+
+def write_dump_json_array(file_path, n_records):
+    return dump_json_array((make_record(i) for i in range(n_records)), file_path), None
+
+
+def _run(function, args, queue):
+    t0 = time.perf_counter()
+    result = function(*args)
+    queue.put((result, time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)) # ru_maxrss in KB on Linux
+
+
+def measure(function, *args):
+    # Run function(*args) in a new process: (result, seconds, peak memory in MB)
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run, args=(function, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the streaming JSON reader/writer against json.load()/json.dump().")
+    parser.add_argument("--records", type=int, default=1_000_000, help="Number of records of the generated file.")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="Records per batch of iter_json_columns().")
+    parser.add_argument("--max-memory-ratio", type=float, default=0.5, help="iter_json_array() must peak below this fraction of the memory of json.load().")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        file_path = os.path.join(temporary_dir, "export.json")
+        with open(file_path, "w", encoding="utf-8") as json_pointer:
+            json_pointer.write('{"meta": {"source": "benchmark", "skipped": [' + ",".join(["1"] * 1000) + ']}, "records": [')
+            for i in range(args.records): # Written one by one, the list of records is never built here
+                json_pointer.write((", " if i > 0 else "") + json.dumps(make_record(i)))
+            json_pointer.write("]}")
+        print(f"file of {args.records} records: {os.path.getsize(file_path) / 1024 ** 2:.0f} MB")
+
+        results = {}
+        for name, function in [("json.load", read_json_load), ("iter_json_array", read_iter_json_array), ("iter_json_columns", read_iter_json_columns)]:
+            results[name], seconds, peak_mb = measure(function, file_path, args.batch_size)
+            print(f"read  {name:<18} {seconds:7.2f} s | peak {peak_mb:7.0f} MB | {results[name][0]} records")
+            results[name] = (*results[name], peak_mb)
+
+        for name, function in [("json.dump", write_json_dump), ("dump_json_array", write_dump_json_array)]:
+            output_path = os.path.join(temporary_dir, f"{name}.json")
+            _, seconds, peak_mb = measure(function, output_path, args.records)
+            print(f"write {name:<18} {seconds:7.2f} s | peak {peak_mb:7.0f} MB | {os.path.getsize(output_path) / 1024 ** 2:.0f} MB")
+
+        if not (results["json.load"][:2] == results["iter_json_array"][:2] == results["iter_json_columns"][:2]):
+            print(f"MISMATCH: {results}")
+            failed = True
+        if sum(1 for _ in iter_json_array(os.path.join(temporary_dir, "dump_json_array.json"))) != args.records:
+            print("MISMATCH: dump_json_array() did not write every record")
+            failed = True
+        # JSON integers beyond int64 (uint64, then exact Python ints) must not break the columns
+        big_path = os.path.join(temporary_dir, "big_integers.json")
+        big_records = [{"id": 18446744073709551615, "count": 2 ** 70}, {"id": 1, "count": -1}]
+        dump_json_array(iter(big_records), big_path)
+        big_columns = next(iter_json_columns(big_path, batch_size=10))
+        if (big_columns["id"].tolist(), big_columns["count"].tolist()) != ([18446744073709551615, 1], [2 ** 70, -1]):
+            print(f"MISMATCH: iter_json_columns() read the integers beyond int64 as {big_columns}")
+            failed = True
+        if results["iter_json_array"][2] > args.max_memory_ratio * results["json.load"][2]:
+            print(f"REGRESSION: iter_json_array peaks at {results['iter_json_array'][2]:.0f} MB, above {args.max_memory_ratio} x json.load")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
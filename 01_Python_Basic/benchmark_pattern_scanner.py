@@ -0,0 +1,136 @@
+'''
+Benchmark of scan_files() (pattern_scanner.py) against one re.finditer() pass per pattern
+
+A temporary corpus of --files text files (--mb MB in total) is written from random words, then scanned for
+--keywords keywords and a few regular expressions, twice: as whole words, then anywhere in the text (with keywords
+which are prefixes of others, "he" and "hello", so several keywords start at the same offset), by:
+    + one pass per pattern: re.finditer(r"\\bpattern\\b", text) (or re.finditer(pattern, text)) for each pattern,
+      like re.findall() in 12_re_RegularExpression_regex.py
+    + scan_files(): the keywords merged into one trie regex, memory-mapped files, by ranges of --chunk-mb MB
+      (in this process, then with --workers processes)
+The last checks scan with small ranges: runs of "a" for "a{2}" and "aa" (the pairs must line up with a scan of the whole file),
+and matches longer than max_match_bytes crossing the ranges ("BEGIN[^E]*END" over 1.5 KB blocks, "(?:ab)+b" over long runs of "ab").
+It exits with an error if the matches differ, or if scan_files() in this process is not at least --min-speedup times
+faster than the pass per pattern for the whole words.
+
+Usage (must be in 01_Python_Basic first):
+    python benchmark_pattern_scanner.py
+    python benchmark_pattern_scanner.py --mb 500 --keywords 1000 --workers 8
+'''
+
+from argparse import ArgumentParser
+import os, random, re, sys, tempfile, time
+
+from pattern_scanner import scan_files
+
+REGEXES = {"number": r"\d{2,4}", "email": r"[\w.]+@[\w.]+\.com", "capitalized_pair": r"[A-Z][a-z]+ [A-Z][a-z]+"}
+
+
+def make_corpus(directory, n_files, total_mb, vocabulary):
+    random.seed(0)
+    file_paths = []
+    for i in range(n_files):
+        file_path = os.path.join(directory, f"corpus_{i}.txt")
+        with open(file_path, "w", encoding="utf-8") as text_pointer:
+            written = 0
+            while written < total_mb * 1024 * 1024 / n_files:
+                words = random.choices(vocabulary, k=10_000)
+                words[::97] = [f"{random.randint(0, 99999)}" for _ in words[::97]]
+                words[::1013] = [f"user{random.randint(0, 999)}@mail.com" for _ in words[::1013]]
+                line = " ".join(words) + "\n"
+                written += text_pointer.write(line)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def one_pass_per_pattern(file_paths, patterns, whole_words):
+    matches = []
+    compiled = {pattern_id: re.compile(rb"\b(?:" + pattern.encode("utf-8") + rb")\b" if whole_words else pattern.encode("utf-8"))
+                for pattern_id, pattern in patterns.items()}
+    for file_path in file_paths:
+        with open(file_path, "rb") as text_pointer:
+            text = text_pointer.read()
+        for pattern_id, regex in compiled.items():
+            matches.extend((file_path, match.start(), pattern_id) for match in regex.finditer(text))
+    return matches
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark scan_files() against one re.finditer() pass per pattern.")
+    parser.add_argument("--files", type=int, default=8, help="Number of files of the corpus.")
+    parser.add_argument("--mb", type=float, default=10, help="Total size of the corpus in MB.")
+    parser.add_argument("--keywords", type=int, default=300, help="Number of keywords searched.")
+    parser.add_argument("--chunk-mb", type=float, default=4, help="Size of the byte ranges of scan_files() in MB.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes of the parallel scan_files().")
+    parser.add_argument("--min-speedup", type=float, default=3.0, help="scan_files() in this process must be at least this many times faster.")
+    args = parser.parse_args()
+
+    random.seed(1)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = list({"".join(random.choices(letters, k=random.randint(3, 10))) for _ in range(20_000)})
+    vocabulary += [word.capitalize() for word in vocabulary[:2000]]
+    keywords = random.sample(vocabulary, args.keywords)
+    prefixes = sorted({word[:length] for word in keywords[:args.keywords // 3] for length in (2, 4) if len(word) > length}) # "he" of "hello"
+
+    runs = [("whole words", True, keywords), ("anywhere", False, keywords[:args.keywords - len(prefixes)] + prefixes)]
+
+    failed = False
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        file_paths = make_corpus(temporary_dir, args.files, args.mb, vocabulary)
+        print(f"corpus: {args.files} files, {sum(map(os.path.getsize, file_paths)) / 1024 ** 2:.0f} MB | {args.keywords} keywords + {len(REGEXES)} regexes")
+
+        for name, whole_words, run_keywords in runs:
+            patterns = {f"keyword_{i}": word for i, word in enumerate(run_keywords)}
+            patterns.update(REGEXES)
+
+            t0 = time.perf_counter()
+            expected = sorted(one_pass_per_pattern(file_paths, patterns, whole_words))
+            baseline_seconds = time.perf_counter() - t0
+            print(f"{name:<11} | one pass per pattern      {baseline_seconds:7.2f} s | {len(expected)} matches")
+
+            for workers in sorted({1, args.workers}):
+                t0 = time.perf_counter()
+                matches = list(scan_files(file_paths, patterns, workers=workers, chunk_bytes=int(args.chunk_mb * 1024 * 1024), whole_words=whole_words))
+                seconds = time.perf_counter() - t0
+                print(f"{name:<11} | scan_files ({workers:>2} workers)   {seconds:7.2f} s | {len(matches)} matches | {baseline_seconds / seconds:5.2f}x")
+
+                if sorted(matches) != expected:
+                    print(f"MISMATCH: scan_files() ({name}) with {workers} workers found {len(matches)} matches, expected {len(expected)}")
+                    failed = True
+                if whole_words and workers == 1 and baseline_seconds / seconds < args.min_speedup:
+                    print(f"REGRESSION: scan_files() is {baseline_seconds / seconds:.2f}x faster, expected at least {args.min_speedup}x")
+                    failed = True
+
+        # Runs of "a" longer than the overlap: "a{2}" and "aa" must pair the bytes from the start of the file in every range
+        runs_path = os.path.join(temporary_dir, "runs.txt")
+        with open(runs_path, "wb") as runs_pointer:
+            runs_pointer.write(b"a" * 5000 + b" b " + b"a" * 4001)
+        patterns = {"pair_regex": "a{2}", "pair_keyword": "aa"}
+        expected = sorted(one_pass_per_pattern([runs_path], patterns, False))
+        for chunk_bytes in [7, 2000, 10 ** 9]:
+            matches = list(scan_files([runs_path], patterns, chunk_bytes=chunk_bytes, max_match_bytes=8))
+            print(f"runs of a   | ranges of {chunk_bytes:>10} bytes: {len(matches)} matches, expected {len(expected)}")
+            if sorted(matches) != expected:
+                print(f"MISMATCH: the matches in the runs of \"a\" differ from a scan of the whole file")
+                failed = True
+
+        # Matches longer than max_match_bytes and than the ranges: found whole, wherever the ranges cut them
+        long_path = os.path.join(temporary_dir, "long_matches.txt")
+        with open(long_path, "wb") as long_pointer:
+            long_pointer.write(b"".join(b"BEGIN " + b"x" * 1500 + b" END\n" for _ in range(40)))
+            long_pointer.write(b"".join(b"ab" * length + b"b " for length in [10, 300, 2500, 40, 5000]))
+        for patterns, max_match_bytes in [({"block": "BEGIN[^E]*END"}, 1024), ({"ab_run": "(?:ab)+b"}, 64)]:
+            expected = sorted(one_pass_per_pattern([long_path], patterns, False))
+            for chunk_bytes in [100, 4096, 10000]:
+                matches = list(scan_files([long_path], patterns, chunk_bytes=chunk_bytes, max_match_bytes=max_match_bytes))
+                print(f"long match  | {list(patterns.values())[0]:<13} ranges of {chunk_bytes:>5} bytes: {len(matches)} matches, expected {len(expected)}")
+                if sorted(matches) != expected:
+                    print(f"MISMATCH: the matches longer than max_match_bytes differ from a scan of the whole file")
+                    failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+'''
+Benchmark of ScrapeEngine (scrape_engine.py) against the one-page-at-a-time requests.get() of 32_beautifulsoup4_WebScraping.py
+
+A local http.server stands in for the website: it serves --pages generated HTML pages, each after --latency seconds
+(like a distant server), with an ETag, and answers "304 Not Modified" to a matching If-None-Match.
+The same links are extracted from every page by:
+    + sequential: requests.get(url) then BeautifulSoup(html, "html.parser"), one page after the other
+    + engine (cold): empty cache, pages fetched on --workers threads with keep-alive sessions
+    + engine (revalidated): same cache, max_age=0, so each page is a conditional request answered by 304
+    + engine (fresh): same cache, max_age=None, so no request at all
+It exits with an error if the extracted data differ, if the cached runs still download bodies,
+or if the cold engine is not at least --min-speedup times faster than the sequential loop.
+
+Usage (must be in 01_Python_Basic first):
+    python benchmark_scrape_engine.py
+    python benchmark_scrape_engine.py --pages 500 --latency 0.05 --workers 16
+'''
+
+from argparse import ArgumentParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import hashlib, sys, tempfile, threading, time
+
+import requests
+from bs4 import BeautifulSoup
+from scrape_engine import ScrapeEngine
+
+LATENCY = 0.02 # Set by main() from --latency
+N_DOWNLOADS = 0 # Number of 200 responses served (with a body)
+COUNTER_LOCK = threading.Lock()
+
+
+def page_html(page_id):
+    links = "".join(f'<li><a href="/page/{(page_id * 7 + k) % 1000}">link {k}</a></li>' for k in range(50))
+    paragraphs = "".join(f"<p>Paragraph {k} of page {page_id}, with some text to parse.</p>" for k in range(200))
+    return f"<html><head><title>Page {page_id}</title></head><body><h1>Page {page_id}</h1><ul>{links}</ul>{paragraphs}</body></html>"
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive connections
+
+    def do_GET(self):
+        global N_DOWNLOADS
+        time.sleep(LATENCY)
+
+        body = page_html(int(self.path.rsplit("/", 1)[-1])).encode("utf-8")
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with COUNTER_LOCK:
+            N_DOWNLOADS += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # Silent
+        pass
+
+
+def extract(soup):
+    return [a.get("href") for a in soup.find_all("a")]
+
+
+def sequential_scrape(urls):
+    results = {}
+    for url in urls:
+        req = requests.get(url)
+        results[url] = extract(BeautifulSoup(req.text, "html.parser"))
+    return results
+
+
+def engine_scrape(engine, urls):
+    results, from_cache = {}, set()
+    for result in engine.scrape(urls, extract=extract, parse_only="a"):
+        if result["error"] is not None:
+            raise RuntimeError(f"{result['url']}: {result['error']}")
+        results[result["url"]] = result["data"]
+        from_cache.add(result["from_cache"])
+    return results, from_cache
+
+
+def main():
+    global LATENCY, N_DOWNLOADS
+    parser = ArgumentParser(description="Benchmark ScrapeEngine against sequential requests.get() on a local http.server.")
+    parser.add_argument("--pages", type=int, default=200, help="Number of pages to scrape.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds the server waits before each response.")
+    parser.add_argument("--workers", type=int, default=8, help="Number of threads of the engine.")
+    parser.add_argument("--min-speedup", type=float, default=2.0, help="The cold engine must be at least this many times faster than the sequential loop.")
+    args = parser.parse_args()
+    LATENCY = args.latency
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_address[1]}/page/{page_id}" for page_id in range(args.pages)]
+
+    failed = False
+    try:
+        t0 = time.perf_counter()
+        expected = sequential_scrape(urls)
+        sequential_time = time.perf_counter() - t0
+        print(f"sequential           {sequential_time:7.3f} s {args.pages / sequential_time:8.1f} pages/s")
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for name, max_age in [("engine (cold)", 0), ("engine (revalidated)", 0), ("engine (fresh)", None)]:
+                N_DOWNLOADS = 0
+                with ScrapeEngine(cache_dir=cache_dir, max_workers=args.workers, max_age=max_age) as engine:
+                    t0 = time.perf_counter()
+                    results, from_cache = engine_scrape(engine, urls)
+                    engine_time = time.perf_counter() - t0
+
+                print(f"{name:<20} {engine_time:7.3f} s {args.pages / engine_time:8.1f} pages/s | {sequential_time / engine_time:6.2f}x"
+                      f" | bodies downloaded: {N_DOWNLOADS} | from_cache: {sorted(map(str, from_cache))}")
+
+                if results != expected:
+                    print(f"MISMATCH: {name} extracted different data than the sequential loop")
+                    failed = True
+                if (name != "engine (cold)") and (N_DOWNLOADS > 0):
+                    print(f"REGRESSION: {name} downloaded {N_DOWNLOADS} bodies, expected 0 from the cache")
+                    failed = True
+                if (name == "engine (cold)") and (sequential_time / engine_time < args.min_speedup):
+                    print(f"REGRESSION: the cold engine is {sequential_time / engine_time:.2f}x faster, expected at least {args.min_speedup}x")
+                    failed = True
+    finally:
+        server.shutdown()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+'''
+Benchmark of the shared memory transport (shared_memory_blocks.py) against the pickling path of multicore_process()
+
+The same float64 array is split into blocks of rows and calculated by a Pool, for several block sizes:
+    + pickling: the blocks are passed to pool.map() by value, the results are pickled back then concatenated
+      (like multicore_process() of 45_multi_processing.py)
+    + shared memory: the tasks only carry descriptors, the workers read and write the blocks in place
+
+The calculation (np.sqrt) is cheap on purpose, so the throughput mostly shows the cost of moving the data.
+It exits with an error if the results differ, or if the shared memory is not at least --min-speedup times faster
+than the pickling with the largest block size.
+
+Usage (must be in 01_Python_Basic first):
+    python benchmark_shared_memory.py
+    python benchmark_shared_memory.py --total-mb 512 --block-kb 64 1024 16384 131072 --processes 8
+'''
+
+from argparse import ArgumentParser
+from multiprocessing import Pool
+import math, sys, time
+
+import numpy as np
+from shared_memory_blocks import shared_multicore_process
+
+
+def pickling_multicore_process(target_function, input_array, block_rows, max_processes):
+    input_blocks = [input_array[start:start + block_rows] for start in range(0, len(input_array), block_rows)]
+
+    with Pool(processes=max_processes) as pool:
+        output_blocks = pool.map(func=target_function, iterable=input_blocks)
+
+    return np.concatenate(output_blocks)
+
+
+def measure(process, input_array, block_rows, max_processes, repeat):
+    best_time = math.inf
+
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        output_array = process(np.sqrt, input_array, block_rows=block_rows, max_processes=max_processes)
+        best_time = min(best_time, time.perf_counter() - t0)
+
+    return best_time, output_array
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the shared memory transport against pickling the NumPy blocks.")
+    parser.add_argument("--total-mb", type=int, default=128, help="Size of the input array, in MB of float64.")
+    parser.add_argument("--block-kb", nargs="+", type=int, default=[64, 1024, 8192, 65536], help="Sizes of the blocks of rows sent to the processes, in KB.")
+    parser.add_argument("--columns", type=int, default=8, help="Number of columns of the input array (a row is columns * 8 bytes).")
+    parser.add_argument("--processes", type=int, default=4, help="Number of processes of the Pool.")
+    parser.add_argument("--repeat", type=int, default=3, help="Each path is run this many times, the best time is kept.")
+    parser.add_argument("--min-speedup", type=float, default=1.0, help="With the largest blocks, the shared memory must be at least this many times faster.")
+    args = parser.parse_args()
+
+    n_rows = args.total_mb * 1024 * 1024 // (8 * args.columns)
+    input_array = np.random.default_rng(2025).random((n_rows, args.columns))
+    expected_array = np.sqrt(input_array)
+
+    failed = False
+    speedup = 0.0
+    for block_kb in sorted(args.block_kb):
+        block_rows = max(block_kb * 1024 // (8 * args.columns), 1)
+
+        pickling_time, pickling_output = measure(pickling_multicore_process, input_array, block_rows, args.processes, args.repeat)
+        shared_time, shared_output = measure(shared_multicore_process, input_array, block_rows, args.processes, args.repeat)
+        speedup = pickling_time / shared_time
+
+        print(
+            f"block {block_kb:>7} KB | pickling {pickling_time:7.3f} s {args.total_mb / pickling_time:8.0f} MB/s"
+            f" | shared memory {shared_time:7.3f} s {args.total_mb / shared_time:8.0f} MB/s | {speedup:5.2f}x"
+        )
+
+        if not (np.array_equal(pickling_output, expected_array) and np.array_equal(shared_output, expected_array)):
+            print(f"MISMATCH: the results with blocks of {block_kb} KB differ from np.sqrt of the whole array")
+            failed = True
+
+    if speedup < args.min_speedup:
+        print(f"REGRESSION: with the largest blocks, the shared memory is {speedup:.2f}x faster, expected at least {args.min_speedup}x")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+'''
+Benchmark of run_commands() (subprocess_fanout.py) against subprocess.run() one command at a time
+
+Two batches of external commands:
+    + short: --commands short commands (each "sleep --sleep", like a quick tool waiting on I/O)
+    + output: --output-commands commands printing --output-lines lines each, streamed to on_line() or to files
+For each batch, the sequential loop of 46_subprocess_sys.py (subprocess.run(..., capture_output=True)) is compared
+to run_commands() with --max-concurrency commands at a time.
+It exits with an error if a command fails, if a line count differs, or if run_commands() is not at least
+--min-speedup times faster than the sequential loop on the short batch.
+
+Usage (must be in 01_Python_Basic first):
+    python benchmark_subprocess_fanout.py
+    python benchmark_subprocess_fanout.py --commands 5000 --max-concurrency 64
+'''
+
+from argparse import ArgumentParser
+import os, subprocess, sys, tempfile, time
+
+from subprocess_fanout import run_commands, format_summary
+
+
+def sequential(commands):
+    t0 = time.perf_counter()
+    line_counts = []
+    for command in commands:
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{command} exited with {completed.returncode}")
+        line_counts.append(len(completed.stdout.splitlines()))
+    return time.perf_counter() - t0, line_counts
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark run_commands() against sequential subprocess.run().")
+    parser.add_argument("--commands", type=int, default=2000, help="Number of short commands.")
+    parser.add_argument("--sleep", type=float, default=0.01, help="Seconds each short command sleeps.")
+    parser.add_argument("--output-commands", type=int, default=50, help="Number of commands printing many lines.")
+    parser.add_argument("--output-lines", type=int, default=20_000, help="Lines printed by each of them.")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="Commands running at the same time.")
+    parser.add_argument("--min-speedup", type=float, default=2.0, help="run_commands() must be at least this many times faster on the short commands.")
+    args = parser.parse_args()
+
+    failed = False
+    short_commands = [["sleep", str(args.sleep)] for _ in range(args.commands)]
+    output_commands = [["seq", "1", str(args.output_lines)] for _ in range(args.output_commands)]
+
+    # 1. Short commands
+    sequential_seconds, _ = sequential(short_commands)
+    results, batch = run_commands(short_commands, max_concurrency=args.max_concurrency)
+    speedup = sequential_seconds / batch["wall_seconds"]
+    print(f"short  | sequential {sequential_seconds:7.2f} s {args.commands / sequential_seconds:7.0f} commands/s"
+          f" | run_commands {batch['wall_seconds']:7.2f} s {args.commands / batch['wall_seconds']:7.0f} commands/s | {speedup:5.2f}x")
+
+    if batch["succeeded"] != args.commands:
+        print(format_summary(results, batch, max_rows=5))
+        print(f"FAILED: {args.commands - batch['succeeded']} short commands did not succeed")
+        failed = True
+    if speedup < args.min_speedup:
+        print(f"REGRESSION: run_commands() is {speedup:.2f}x faster on the short commands, expected at least {args.min_speedup}x")
+        failed = True
+
+    # 2. Commands with a lot of output: a callback, then files
+    sequential_seconds, expected_counts = sequential(output_commands)
+    print(f"output | sequential {sequential_seconds:7.2f} s (all output kept in memory)")
+
+    n_lines = [0]
+    def count_line(index, stream, line):
+        n_lines[0] += 1
+
+    results, batch = run_commands(output_commands, max_concurrency=args.max_concurrency, on_line=count_line)
+    print(f"output | run_commands + on_line {batch['wall_seconds']:7.2f} s | {n_lines[0]} lines to the callback")
+    failed |= [result["stdout_lines"] for result in results] != expected_counts or n_lines[0] != sum(expected_counts)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        results, batch = run_commands(output_commands, max_concurrency=args.max_concurrency, output_dir=output_dir)
+        with open(os.path.join(output_dir, "0.stdout"), "r") as output_pointer:
+            n_file_lines = sum(1 for _ in output_pointer)
+        print(f"output | run_commands + files   {batch['wall_seconds']:7.2f} s | {n_file_lines} lines in 0.stdout")
+        failed |= [result["stdout_lines"] for result in results] != expected_counts or n_file_lines != expected_counts[0]
+
+    print(format_summary(results, batch, max_rows=3))
+    if failed:
+        print("FAILED: see above (line counts must match the sequential run)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+'''
+Read a LARGE .csv or .tsv file as typed columnar chunks, optionally parsed in parallel by a process pool
+
+csv.DictReader gives one dictionary of strings per row, which costs a lot of memory and time on files of several GBs.
+read_csv_chunks() yields each chunk as {column name: NumPy array} (or a pandas DataFrame) instead:
+    + Each column gets the narrowest dtype fitting its values: int64, then float64, else object (strings),
+      inferred from the first chunk. Missing values ("", "NA", "NaN", "null", ...) are NaN in a numeric column,
+      so an integer column having them becomes float64 (like pandas).
+    + With workers > 1, the file is split into byte ranges ending on a record boundary (a newline outside of any quoted field),
+      then each range is parsed by its own process.
+
+A quoted field may contain newlines: the boundaries are only set where the number of quote characters before the newline is even.
+This assumes the quotes are balanced, as written by csv.writer (RFC 4180), and an encoding where b"\\n" is always a newline (UTF-8, ASCII, Latin-1).
+
+Usage:
+    from csv_chunk_reader import read_csv_chunks
+
+    for chunk in read_csv_chunks("weather.tsv", delimiter="\\t", chunk_size=100_000, workers=4):
+        print(chunk["MaxTemp"].mean())
+'''
+
+from collections import deque
+from functools import partial
+from itertools import islice
+import csv, io, mmap, os
+
+import numpy as np
+
+NA_VALUES = frozenset(["", "NA", "N/A", "NaN", "nan", "NULL", "null", "None"])
+NA_TEXTS = {na_value: "nan" for na_value in NA_VALUES} # Each missing value -> a text which float() parses as NaN
+
+
+#------------------------------------------------------------------------------------------------------------#
+#----------------------------------- Convert the text columns to typed arrays -------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+def _to_int_column(texts):
+    return np.fromiter(map(int, texts), dtype=np.int64, count=len(texts)) # Parsed in C, no Python code per value
+
+
+def _to_float_column(texts):
+    try:
+        return np.fromiter(map(float, texts), dtype=np.float64, count=len(texts))
+    except ValueError: # Some missing values, replaced by "nan" with a dictionary lookup (still no Python code per value)
+        return np.fromiter(map(float, map(NA_TEXTS.get, texts, texts)), dtype=np.float64, count=len(texts))
+
+
+def _to_object_column(texts):
+    column = np.empty(len(texts), dtype=object)
+    column[:] = texts
+    return column
+
+
+CONVERTERS = {"int64": _to_int_column, "float64": _to_float_column, "object": _to_object_column}
+WIDER_DTYPES = {"int64": ["int64", "float64", "object"], "float64": ["float64", "object"], "object": ["object"]}
+
+
+def _convert_column(texts, dtype):
+    '''
+    Convert the texts to the given dtype, or to the next wider one if a value does not fit (e.g. "2.5" in an int64 column).
+    '''
+    for wider_dtype in WIDER_DTYPES[dtype]:
+        try:
+            return CONVERTERS[wider_dtype](texts)
+        except (ValueError, OverflowError):
+            continue
+
+
+def infer_dtypes(header, rows):
+    # The narrowest dtype of each column which all of its values fit: int64, then float64, else object
+    return {name: _convert_column(texts, "int64").dtype.name for name, texts in zip(header, _columns(header, rows))}
+
+
+def _columns(header, rows):
+    '''
+    Transpose the rows to columns. Blank rows are skipped (like csv.DictReader), short rows are filled with missing values
+    and the extra fields of long rows are dropped.
+    '''
+    if set(map(len, rows)) != {len(header)}: # Slow path, only for a chunk having blank, short or long rows
+        rows = [(row + [""] * (len(header) - len(row)))[:len(header)] for row in rows if len(row) > 0]
+
+    if len(rows) == 0:
+        return [() for _ in header]
+
+    return list(zip(*rows))
+
+
+def _to_chunk(header, rows, dtypes):
+    return {name: _convert_column(texts, dtypes[name]) for name, texts in zip(header, _columns(header, rows))}
+
+
+#------------------------------------------------------------------------------------------------------------#
+#----------------------------- Split the file into byte ranges of whole records -----------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+def _count_byte(buffer, byte, start, end, block_size=1 << 24): # buffer[start:end].count(byte), without copying more than one block
+    return sum(buffer[position:min(position + block_size, end)].count(byte) for position in range(start, end, block_size))
+
+
+def record_boundaries(buffer, start, range_bytes, quotechar='"', max_ranges=None):
+    '''
+    The byte offsets splitting buffer[start:] into ranges of about range_bytes (at most max_ranges, the last one holding the rest),
+    each ending after a newline outside of quoted fields. The first offset is start and the last one is len(buffer).
+    '''
+    quote = quotechar.encode() if quotechar else None
+    boundaries = [start]
+    counted_until, odd_quotes = start, False # The parity of the quotes in buffer[start:counted_until]
+    position = start + range_bytes - 1 # Where to look for the next newline
+
+    while (position < len(buffer)) and ((max_ranges is None) or (len(boundaries) < max_ranges)):
+        newline = buffer.find(b"\n", position)
+        if newline == -1: # The rest of the file is one range
+            break
+
+        if quote is not None:
+            odd_quotes ^= bool(_count_byte(buffer, quote, counted_until, newline) % 2)
+            counted_until = newline
+
+        if odd_quotes: # Inside a quoted field, try the next newline
+            position = newline + 1
+        else:
+            boundaries.append(newline + 1)
+            position = newline + range_bytes
+
+    if boundaries[-1] < len(buffer):
+        boundaries.append(len(buffer))
+
+    return boundaries
+
+
+def _parse_byte_range(byte_range, file_path, header, dtypes, chunk_size, encoding, csv_options):
+    '''
+    Parse the whole records of file_path[start:end] into columnar chunks (run by a worker process).
+    '''
+    start, end = byte_range
+    with open(file_path, "rb") as file_pointer:
+        file_pointer.seek(start)
+        text = file_pointer.read(end - start).decode(encoding)
+
+    reader = csv.reader(io.StringIO(text, newline=""), **csv_options)
+    chunks = []
+
+    while len(rows := list(islice(reader, chunk_size))) > 0:
+        chunks.append(_to_chunk(header, rows, dtypes))
+
+    return chunks
+
+
+#------------------------------------------------------------------------------------------------------------#
+#---------------------------------------- Define read_csv_chunks() ------------------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+def read_csv_chunks(file_path, chunk_size=100_000, delimiter=",", quotechar='"', dtypes=None, workers=1,
+                    range_bytes=32 * 1024 * 1024, as_dataframe=False, encoding="utf-8"):
+    '''
+    Generator yielding the rows of a .csv or .tsv file (having a header row) as columnar chunks of at most chunk_size rows.
+
+    Each chunk is {column name: NumPy array}, or a pandas DataFrame if as_dataframe=True.
+    The dtypes of the columns are inferred from the first chunk (or given as {column name: "int64" | "float64" | "object"}).
+    If a later chunk has a value which does not fit, only this chunk of the column gets the next wider dtype.
+
+    With workers > 1, the file is split into byte ranges of about range_bytes (ending on record boundaries),
+    parsed by a process pool, and the chunks are still yielded in the order of the file.
+    quotechar=None means the fields are never quoted (csv.QUOTE_NONE), so every newline ends a record.
+    '''
+    csv_options = {"delimiter": delimiter, "quotechar": quotechar, "quoting": csv.QUOTE_MINIMAL if quotechar else csv.QUOTE_NONE}
+
+    with open(file_path, "r", newline="", encoding=encoding) as file_pointer:
+        reader = csv.reader(file_pointer, **csv_options)
+        header = next(reader, None)
+        if header is None: # Empty file
+            return None
+
+        rows = list(islice(reader, chunk_size))
+        dtypes = {**infer_dtypes(header, rows), **(dtypes or {})}
+
+        if workers <= 1:
+            while len(rows) > 0:
+                yield _to_dataframe(_to_chunk(header, rows, dtypes)) if as_dataframe else _to_chunk(header, rows, dtypes)
+                rows = list(islice(reader, chunk_size))
+
+            return None
+
+    from multiprocessing import Pool # Only the parallel reading needs it
+
+    with open(file_path, "rb") as file_pointer, mmap.mmap(file_pointer.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        header_end = record_boundaries(buffer, 0, 1, quotechar, max_ranges=2)[1] # The first range is the header row
+        boundaries = record_boundaries(buffer, header_end, range_bytes, quotechar)
+        byte_ranges = list(zip(boundaries[:-1], boundaries[1:]))
+
+    if len(byte_ranges) == 0: # Only the header row
+        return None
+
+    parse_byte_range = partial(_parse_byte_range, file_path=os.fspath(file_path), header=header, dtypes=dtypes,
+                               chunk_size=chunk_size, encoding=encoding, csv_options=csv_options)
+
+    processes = min(workers, len(byte_ranges))
+    with Pool(processes=processes) as pool:
+        # In the order of the file, while the next ranges are being parsed (at most 2 per process, so the memory stays bounded)
+        for chunks in _bounded_imap(pool, parse_byte_range, byte_ranges, 2 * processes):
+            for chunk in chunks:
+                yield _to_dataframe(chunk) if as_dataframe else chunk
+
+
+def _bounded_imap(pool, function, items, window):
+    # Like pool.imap(), but at most window tasks in flight: a slow consumer never lets the parsed chunks pile up in memory
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(function, (item,)))
+    while len(pending) > 0:
+        yield pending.popleft().get()
+
+
+def _to_dataframe(chunk):
+    import pandas as pd # Optional, only needed for as_dataframe=True
+
+    return pd.DataFrame(chunk, copy=False)
@@ -0,0 +1,258 @@
+'''
+A persistent index of the files of a directory tree, to answer glob()/rglob() patterns without walking the tree again
+
+Path.rglob("*.json") (37_pathlib_glob_rglob_iterdir_walk_PatternSearch.py) lists every directory and matches every name
+on each call, so repeating it over a tree of millions of files costs seconds every time. FileIndex instead:
+    + walks the tree ONCE with os.scandir(), the directories of each level in parallel on a thread pool,
+      and keeps (path, size, mtime, suffix) of every file, saved to a pickle file for the next runs
+    + refresh(): re-scans only the directories whose mtime changed (a directory changes when a file is added,
+      removed or renamed in it), the others cost a single os.stat()
+    + glob()/rglob(): answered from the index, with the same patterns as pathlib ("*.json", "data/*.csv", "**/*.txt"),
+      the candidates narrowed by directory or by suffix when the pattern allows it, and the results of a pattern
+      kept until refresh() finds a change (a repeated search takes microseconds)
+
+NOTE: editing a file IN PLACE does not change the mtime of its directory, so its size and mtime in the index
+      stay the old ones until refresh(full=True). Only the files are indexed (not the directories), symlinks are not followed:
+      a pattern ending with "**" matches the files below, not the directories like Path.glob("**").
+
+Usage:
+    from file_index import FileIndex
+
+    index = FileIndex("/path/to/tree", index_path="tree_index.pkl") # Loads the saved index if there is one
+    index.refresh()                                                   # Incremental, saved if anything changed
+    json_files = index.rglob("*.json")                                # List of Path, like list(Path(...).rglob("*.json"))
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os, pickle, re, time
+
+INDEX_VERSION = 1
+RACY_SECONDS = 2.0 # A directory modified this recently may change again within the same mtime tick: re-scanned next time
+
+
+def _suffix(name): # Same as Path(name).suffix: "a.tar.gz" -> ".gz", ".bashrc" -> ""
+    return os.path.splitext(name)[1]
+
+
+def _last_dot(name): # Key of the suffix buckets, from the last "." ("*.json" also matches a file named ".json")
+    position = name.rfind(".")
+    return name[position:] if position >= 0 else ""
+
+
+#---------------------------------------------------------------------------#
+#---------------------- glob pattern -> regular expression ------------------#
+#---------------------------------------------------------------------------#
+
+def _translate_segment(segment):
+    # One segment of the path ("*.json", "[0-9]?_*"): the wildcards never match a "/"
+    regex, i = "", 0
+    while i < len(segment):
+        char = segment[i]
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[" and (end := segment.find("]", i + 2 if segment[i + 1:i + 2] in ("!", "]") else i + 1)) > 0:
+            content = segment[i + 1:end].replace("\\", "\\\\")
+            content = re.sub(r"([\[&~|])", r"\\\1", content) # Literal in glob: "[" (a nested set) and "&&", "~~", "||" (set operations) for re
+            if content.startswith("!"): # [!a-z] in glob is [^a-z] in regex
+                content = "^" + content[1:]
+            elif content.startswith("^"): # A literal "^" in glob
+                content = "\\" + content
+            regex += f"[{content}]"
+            i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def translate_pattern(pattern):
+    '''
+    A glob pattern relative to the root ("*.json", "data/**/*.csv") as a compiled regular expression matching
+    the relative paths of the files ("data/2024/a.csv", with "/" separators). "**" matches any number of directories.
+    '''
+    segments = [segment for segment in pattern.strip("/").split("/") if segment not in ("", ".")]
+    regex = ""
+
+    for position, segment in enumerate(segments):
+        last = position == len(segments) - 1
+        if segment == "**":
+            regex += ".*" if last else "(?:[^/]+/)*" # A final "**" matches every file below
+        else:
+            regex += _translate_segment(segment) + ("" if last else "/")
+
+    return re.compile(regex + r"\Z", re.DOTALL)
+
+
+def _has_magic(text):
+    return any(char in text for char in "*?[")
+
+
+#---------------------------------------------------------------------------#
+#------------------------------- File index --------------------------------#
+#---------------------------------------------------------------------------#
+
+def _scan_directory(root, relative_dir):
+    '''
+    One os.scandir() of a directory. Returns: (mtime_ns of the directory, tuple of its sub-directory names,
+    {file name: (size, mtime_ns)}), or None if it cannot be read (removed meanwhile, permission denied).
+    '''
+    directory = os.path.join(root, relative_dir)
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns # Before the listing: a change during the listing makes the next refresh re-scan it
+        subdirs, files = [], {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False): # From the directory listing itself (no system call on most file systems)
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                except OSError: # Removed between the listing and the stat()
+                    continue
+    except OSError:
+        return None
+
+    if time.time_ns() - mtime_ns < RACY_SECONDS * 1e9:
+        mtime_ns = None # Cannot be trusted yet: always re-scanned by the next refresh()
+
+    return mtime_ns, tuple(subdirs), files
+
+
+class FileIndex:
+    '''
+    root: directory tree to index
+    index_path: pickle file where the index is saved by refresh() and loaded back by the next FileIndex (None = memory only)
+    max_workers: threads scanning the directories of a level at the same time (os.scandir/os.stat release the GIL)
+    '''
+    def __init__(self, root, index_path=None, max_workers=8):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path
+        self.max_workers = max_workers
+        self._dirs = {} # relative dir ("" for the root, "a/b") -> (mtime_ns, subdir names, {file name: (size, mtime_ns)})
+        self._reset_views()
+
+        if (index_path is not None) and os.path.exists(index_path):
+            self.load()
+
+    def _reset_views(self):
+        # Views derived from self._dirs, rebuilt lazily after each change
+        self._paths = None     # All relative file paths
+        self._by_suffix = None # _last_dot(name) -> relative file paths
+        self._results = {}     # pattern -> tuple of Path, until the next change of the index
+
+    #------------------------------ Persistence ------------------------------#
+
+    def load(self):
+        with open(self.index_path, "rb") as index_pointer:
+            saved = pickle.load(index_pointer)
+
+        if (saved.get("version") == INDEX_VERSION) and (saved.get("root") == self.root): # Otherwise ignored, rebuilt by refresh()
+            self._dirs = saved["dirs"]
+            self._reset_views()
+
+    def save(self):
+        temporary_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as index_pointer:
+            pickle.dump({"version": INDEX_VERSION, "root": self.root, "dirs": self._dirs}, index_pointer, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self.index_path) # Never a half-written index
+
+    #-------------------------------- Refresh --------------------------------#
+
+    def _refresh_directory(self, relative_dir, full):
+        cached = self._dirs.get(relative_dir)
+        if (not full) and (cached is not None) and (cached[0] is not None):
+            try:
+                if os.stat(os.path.join(self.root, relative_dir)).st_mtime_ns == cached[0]:
+                    return relative_dir, cached, False # Unchanged: its files are reused (its sub-directories are still checked)
+            except OSError:
+                return relative_dir, None, False
+
+        return relative_dir, _scan_directory(self.root, relative_dir), True
+
+    def refresh(self, full=False):
+        '''
+        Bring the index up to date, level by level from the root: only the new directories and those whose mtime changed
+        are scanned again (all of them if full=True), the removed ones are dropped. If anything changed, the index is saved (if index_path).
+        Returns: {"directories", "rescanned", "files", "seconds"}
+        '''
+        t0 = time.perf_counter()
+        new_dirs, n_rescanned = {}, 0
+        level = [""]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(level) > 0:
+                next_level = []
+                for relative_dir, entry, rescanned in executor.map(lambda relative_dir: self._refresh_directory(relative_dir, full), level):
+                    if entry is None:
+                        continue
+                    new_dirs[relative_dir] = entry
+                    n_rescanned += rescanned
+                    next_level.extend(f"{relative_dir}/{name}" if relative_dir else name for name in entry[1])
+                level = next_level
+
+        if (n_rescanned > 0) or (new_dirs.keys() != self._dirs.keys()): # Nothing changed: the saved index and the results are kept
+            self._dirs = new_dirs
+            self._reset_views()
+            if self.index_path is not None:
+                self.save()
+
+        return {"directories": len(new_dirs), "rescanned": n_rescanned, "files": sum(len(entry[2]) for entry in new_dirs.values()),
+                "seconds": time.perf_counter() - t0}
+
+    #-------------------------------- Queries --------------------------------#
+
+    def _all_paths(self):
+        if self._paths is None:
+            self._paths = [f"{relative_dir}/{name}" if relative_dir else name
+                           for relative_dir, (_, _, files) in self._dirs.items() for name in files]
+        return self._paths
+
+    def _suffix_bucket(self, key):
+        if self._by_suffix is None:
+            self._by_suffix = {}
+            for relative_path in self._all_paths():
+                self._by_suffix.setdefault(_last_dot(relative_path.rsplit("/", 1)[-1]), []).append(relative_path)
+        return self._by_suffix.get(key, [])
+
+    def _candidates(self, pattern):
+        # The relative paths which may match, narrowed down without testing every file when possible
+        dir_part, _, name_part = pattern.strip("/").rpartition("/")
+
+        if not _has_magic(dir_part) and name_part != "**": # A fixed directory ("data/*.csv"): only its files
+            dir_part = "/".join(segment for segment in dir_part.split("/") if segment not in ("", "."))
+            entry = self._dirs.get(dir_part)
+            return [f"{dir_part}/{name}" if dir_part else name for name in entry[2]] if entry is not None else []
+
+        if name_part.startswith("*") and not _has_magic(name_part[1:]) and "." in name_part: # "*.json": files ending with ".json" only
+            return self._suffix_bucket(_last_dot(name_part))
+
+        return self._all_paths()
+
+    def glob(self, pattern):
+        '''
+        Files (not directories) matching a glob pattern relative to the root, like list(Path(root).glob(pattern)).
+        Only the files are indexed, so a final "**" matches every file below ("**" = "**/*"), while Path.glob("**")
+        gives the directories only (and the files too since Python 3.13).
+        Returns: a new list of Path on every call (a repeated pattern copies the kept results, until refresh() finds a change)
+        '''
+        if pattern not in self._results:
+            matcher = translate_pattern(pattern).match
+            self._results[pattern] = tuple(Path(self.root, relative_path) for relative_path in self._candidates(pattern) if matcher(relative_path))
+        return list(self._results[pattern]) # Changing the returned list never changes the next results
+
+    def rglob(self, pattern): # Like Path.rglob(): the pattern is searched in every directory of the tree
+        return self.glob(f"**/{pattern}")
+
+    def records(self, pattern="**"):
+        # Generator of (path, size, mtime_ns, suffix) of the files matching the pattern (all files by default)
+        for path in self.glob(pattern):
+            relative_dir = os.path.relpath(path.parent, self.root).replace(os.sep, "/")
+            size, mtime_ns = self._dirs["" if relative_dir == "." else relative_dir][2][path.name]
+            yield path, size, mtime_ns, _suffix(path.name)
+
+    def __len__(self):
+        return sum(len(entry[2]) for entry in self._dirs.values())
@@ -0,0 +1,323 @@
+'''
+Read and write LARGE JSON arrays of records without holding the whole document in memory
+
+json.load() (30_JSON_load_dump.py) builds the whole document as Python objects before returning it:
+a JSON file of several GBs needs several times its size in memory. Here instead:
+    + iter_json_array(): reads the file by chunks of text and decodes the elements of the array ONE BY ONE
+      with json.JSONDecoder.raw_decode() (the C decoder of the json module), so only the current chunk and
+      the current element are in memory. The array can be the top-level value, or nested in objects/arrays
+      (path=["data", "records"] for {"data": {"records": [...]}}): the values before it are skipped without being decoded.
+    + iter_json_batches() / iter_json_columns(): the elements by lists of batch_size, or as columns
+      {key: NumPy array} (or pandas DataFrames) for arrays of records (objects)
+    + JsonArrayWriter / dump_json_array(): write the records one by one as a valid JSON array, without building the list
+
+Usage:
+    from json_stream import iter_json_array, iter_json_columns, dump_json_array
+
+    for record in iter_json_array("export.json", path=["data", "records"]):
+        print(record["age"])
+
+    for columns in iter_json_columns("export.json", batch_size=100_000):
+        print(columns["age"].mean())
+
+    dump_json_array((record for record in iter_json_array("export.json") if record["age"] > 1000), "old_trees.json")
+'''
+
+from itertools import islice
+import json, os, re
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 20 # Characters read at a time
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+SKIP_OUTSIDE_STRING = re.compile(r'[^"\[\]{}]*') # Nothing to track until the next quote or bracket
+SKIP_INSIDE_STRING = re.compile(r'[^"\\]*')     # Nothing to track until the closing quote or a backslash
+SEPARATOR = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*") # Between 2 elements of an array, or at its end
+NUMBER_CHARACTERS = frozenset("0123456789.eE+-") # A number followed by one of them may continue in the next chunk ("12" of "12.5")
+
+
+class _JsonReader:
+    '''
+    A text buffer over the file, refilled by chunks: pos is the position of the next character to read in the buffer.
+    The characters already read are dropped from time to time, so the buffer stays about one chunk (or one element) long.
+    '''
+    def __init__(self, file_pointer, chunk_size):
+        self.file_pointer = file_pointer
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer, self.pos, self.eof = "", 0, False
+
+    def read_more(self, size=None):
+        if self.eof:
+            return False
+        if self.pos > 0: # Drop what has been read already
+            self.buffer, self.pos = self.buffer[self.pos:], 0
+
+        text = self.file_pointer.read(size or self.chunk_size)
+        self.eof = text == ""
+        self.buffer += text
+        return not self.eof
+
+    def peek(self): # Next non-whitespace character ("" at the end of the file), without consuming it
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.read_more():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, characters):
+        char = self.peek()
+        if char == "" or char not in characters:
+            raise ValueError(f"Expected one of {characters!r} but found {char or 'the end of the file'!r} (around character {self.pos} of the buffer)")
+        self.pos += 1
+        return char
+
+    def decode_value(self):
+        '''
+        Decode the next value. A value ending at the end of the buffer may be truncated ("12" of "12.5", or an unfinished
+        object): more text is read until the value is followed by a character which cannot continue it, or the file ends.
+        '''
+        read_size = self.chunk_size
+        while True:
+            self.peek()
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                if (end < len(self.buffer) and self.buffer[end] not in NUMBER_CHARACTERS) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read_more(read_size)
+            read_size *= 2 # A very large value: fewer retries of the decoding
+
+    def iter_elements(self):
+        '''
+        Generator of the elements of the array whose "[" has just been read, until its "]".
+        Fast path: an element and its separator found entirely in the buffer are decoded directly (a "," or "]" after
+        the element also proves a number was not cut by the end of the chunk). Otherwise (near the end of the buffer,
+        or an invalid document), the careful decode_value() and expect() read more text or raise the error.
+        '''
+        if self.peek() == "]": # Empty array
+            self.pos += 1
+            return
+
+        decode, separator = self.decoder.raw_decode, SEPARATOR.match
+        while True:
+            try:
+                value, end = decode(self.buffer, self.pos)
+                match = separator(self.buffer, end)
+            except json.JSONDecodeError:
+                match = None
+
+            if match is not None:
+                self.pos = match.end()
+                yield value
+                if match.group(1) == "]":
+                    return
+            else:
+                value = self.decode_value()
+                closing = self.expect(",]") == "]"
+                yield value
+                if closing:
+                    return
+                self.peek() # Skip the whitespace after the ",": the next element can take the fast path again
+
+    def skip_value(self):
+        # Skip the next value without building it (only its brackets and strings are tracked)
+        char = self.peek()
+        if char not in "[{\"":
+            self.decode_value() # A number, true, false or null: short
+            return
+
+        depth, in_string = 0, False
+        while True:
+            if self.pos >= len(self.buffer):
+                if not self.read_more():
+                    raise ValueError("Unexpected end of the file inside a value")
+                continue
+
+            if in_string:
+                self.pos = SKIP_INSIDE_STRING.match(self.buffer, self.pos).end()
+                if self.pos >= len(self.buffer):
+                    continue
+                if self.buffer[self.pos] == "\\":
+                    if self.pos + 1 >= len(self.buffer) and not self.read_more(): # The escaped character is in the next chunk
+                        raise ValueError("Unexpected end of the file inside a string")
+                    self.pos += 2
+                    continue
+                in_string = False
+            else:
+                self.pos = SKIP_OUTSIDE_STRING.match(self.buffer, self.pos).end()
+                if self.pos >= len(self.buffer):
+                    continue
+                char = self.buffer[self.pos]
+                if char == '"':
+                    in_string = True
+                elif char in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+
+            self.pos += 1
+            if depth == 0 and not in_string:
+                return
+
+
+def _enter_path(reader, path):
+    # Move the reader just after the "[" of the array at path (a list of object keys and array indices)
+    for step in path:
+        if isinstance(step, int): # The step-th element of an array
+            reader.expect("[")
+            for _ in range(step):
+                reader.skip_value()
+                reader.expect(",")
+            continue
+
+        reader.expect("{")
+        if reader.peek() == "}":
+            raise KeyError(f"Key {step!r} not found in the JSON object")
+
+        while True:
+            key = reader.decode_value()
+            reader.expect(":")
+            if key == step:
+                break
+            reader.skip_value() # The value of another key, not decoded
+            if reader.expect(",}") == "}":
+                raise KeyError(f"Key {step!r} not found in the JSON object")
+
+    reader.expect("[")
+
+
+def _parse_path(path):
+    # "data.records" -> ["data", "records"], "data.0.records" -> ["data", 0, "records"]
+    if path is None:
+        return []
+    if isinstance(path, str):
+        return [int(step) if step.isdigit() else step for step in path.split(".") if step != ""]
+    return list(path)
+
+
+#---------------------------------------------------------------------------#
+#----------------------------- Streaming reader ----------------------------#
+#---------------------------------------------------------------------------#
+
+def iter_json_array(file_path, path=None, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+    '''
+    Generator of the elements of a JSON array, decoded one by one.
+        path: where the array is: None for a top-level array, a list of object keys and array indices
+              (["data", "records"], ["results", 0, "items"]), or the same as a dotted string ("data.records")
+        chunk_size: number of characters read from the file at a time
+    Raises ValueError (json.JSONDecodeError) on an invalid or truncated document, KeyError if a key of path is missing.
+    '''
+    with open(file_path, "r", encoding=encoding) as file_pointer:
+        reader = _JsonReader(file_pointer, chunk_size)
+        _enter_path(reader, _parse_path(path))
+        yield from reader.iter_elements()
+
+
+def iter_json_batches(file_path, batch_size=10_000, path=None, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+    # Generator of lists of at most batch_size elements of the array (see iter_json_array())
+    elements = iter_json_array(file_path, path, chunk_size, encoding)
+    while len(batch := list(islice(elements, batch_size))) > 0:
+        yield batch
+
+
+def _to_array(values):
+    # The narrowest NumPy array of a column: int64 (uint64 above it), float64 (None -> NaN), bool, else object
+    # (strings, nested values, mixes, and integers beyond 64 bits, kept exact as Python ints)
+    types = set(map(type, values))
+    if types <= {int}:
+        for dtype in [np.int64, np.uint64]:
+            try:
+                return np.array(values, dtype=dtype)
+            except OverflowError: # JSON integers have no limit, e.g. 18446744073709551615 (2**64 - 1) needs uint64
+                continue
+    elif types <= {int, float, type(None)}:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64) if type(None) in types else np.array(values, dtype=np.float64)
+    elif types == {bool}:
+        return np.array(values, dtype=bool)
+
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def iter_json_columns(file_path, batch_size=10_000, path=None, columns=None, as_dataframe=False, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+    '''
+    Generator of the records (JSON objects) of an array, by batches of batch_size converted to columns:
+    {key: NumPy array} (or a pandas DataFrame if as_dataframe=True). A key missing from a record is None (NaN if numeric).
+        columns: the keys to keep (by default: the keys of the first batch, in the order they first appear)
+    '''
+    for batch in iter_json_batches(file_path, batch_size, path, chunk_size, encoding):
+        if columns is None:
+            columns = list({key: None for record in batch for key in record})
+
+        chunk = {column: _to_array([record.get(column) for record in batch]) for column in columns}
+        yield _to_dataframe(chunk) if as_dataframe else chunk
+
+
+def _to_dataframe(chunk):
+    import pandas as pd # Optional, only needed for as_dataframe=True
+
+    return pd.DataFrame(chunk, copy=False)
+
+
+#---------------------------------------------------------------------------#
+#----------------------------- Streaming writer ----------------------------#
+#---------------------------------------------------------------------------#
+
+class JsonArrayWriter:
+    '''
+    Write a JSON array element by element: "[" at the start, "," between the elements, "]" at close().
+    The elements are written to a temporary file, renamed to file_path by close() only: if an exception stops the writing
+    (with-block), the temporary file is removed and file_path is left as it was, never a truncated array.
+        one_per_line: each element on its own line (still a single valid JSON array, easy to read and to split)
+        json_options: passed to json.dumps() for each element (ensure_ascii, default, sort_keys, ...)
+    '''
+    def __init__(self, file_path, one_per_line=True, encoding="utf-8", **json_options):
+        self.file_path = file_path
+        self.temporary_path = f"{file_path}.{os.getpid()}.tmp"
+        self.separator = ",\n" if one_per_line else ","
+        self.json_options = json_options
+        self.n_elements = 0
+
+        self.file_pointer = open(self.temporary_path, "w", encoding=encoding)
+        self.file_pointer.write("[\n" if one_per_line else "[")
+
+    def write(self, element):
+        text = json.dumps(element, **self.json_options) # Before writing anything: an element which cannot be serialized writes nothing
+        if self.n_elements > 0:
+            self.file_pointer.write(self.separator)
+        self.file_pointer.write(text)
+        self.n_elements += 1
+
+    def write_many(self, elements):
+        for element in elements:
+            self.write(element)
+
+    def close(self):
+        self.file_pointer.write("\n]\n" if self.separator == ",\n" else "]")
+        self.file_pointer.close()
+        os.replace(self.temporary_path, self.file_path)
+
+    def abort(self):
+        self.file_pointer.close()
+        os.remove(self.temporary_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def dump_json_array(elements, file_path, one_per_line=True, encoding="utf-8", **json_options):
+    # Write an iterable (e.g. a generator) of elements as a JSON array, and return the number of elements written
+    with JsonArrayWriter(file_path, one_per_line, encoding, **json_options) as writer:
+        writer.write_many(elements)
+
+    return writer.n_elements
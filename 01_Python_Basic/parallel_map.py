@@ -0,0 +1,162 @@
+'''
+One parallel_map() instead of guessing between multithread_process() (44_multi_threading.py)
+and multicore_process() (45_multi_processing.py)
+
+Before running all the blocks, a short calibration runs the target function on a sample of them:
+    + Serially, comparing the CPU time to the wall time:
+      a function mostly WAITING (I/O, sleep, network) uses little CPU time => a thread pool
+    + Then on a few threads at once:
+      a CPU-heavy function which releases the GIL (NumPy, hashlib, zlib, ...) runs faster on several threads => a thread pool
+      pure-Python CPU work does not (the GIL runs one thread at a time) => a process pool,
+      unless the work is too short to pay the start of the processes (or cannot be pickled, or there is only one CPU) => serially
+The blocks are then sent in chunks lasting about TARGET_TASK_SECONDS each, so the short tasks do not pay the overhead one by one.
+
+The results keep the order of the input blocks (including the ones of the calibration, which are not calculated twice),
+the first exception of the target function is raised again in the main program,
+and a tqdm progress bar shows the progress (if tqdm is installed).
+
+Usage:
+    from parallel_map import parallel_map
+
+    output_blocks = parallel_map(target_function, input_blocks) # Same as [target_function(block) for block in input_blocks]
+'''
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+import math, os, pickle, time
+
+MODES = ["auto", "threads", "processes", "serial"]
+TARGET_TASK_SECONDS = 0.05 # Each task (chunk of blocks) should last about this long
+PROCESS_START_SECONDS = 0.2 # Rough cost of starting a process pool and pickling to it, not worth it for shorter work
+IO_BOUND_CPU_RATIO = 0.5 # Less CPU time than this fraction of the wall time means the function is mostly waiting
+GIL_RELEASE_SPEEDUP = 1.5 # A CPU-heavy function at least this much faster on several threads releases the GIL
+
+
+def _available_cpus():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+
+def _default_workers(mode): # Like ThreadPoolExecutor: more threads than CPUs, as they are often waiting
+    return min(32, _available_cpus() + 4) if mode == "threads" else _available_cpus()
+
+
+def _can_be_pickled(*objects):
+    try:
+        pickle.dumps(objects)
+        return True
+    except Exception: # A lambda, a local function, an open file, ...
+        return False
+
+
+def _run_chunk(target_function, chunk): # One task: a chunk of blocks, run in a thread or in a process
+    return [target_function(single_block) for single_block in chunk]
+
+
+def calibrate(target_function, input_blocks, max_workers=None):
+    '''
+    Run target_function on a sample of input_blocks and choose how to run the rest of them.
+
+    Returns: (plan, sample_results)
+        plan: {"mode", "workers", "chunk_size", "seconds_per_block", "cpu_ratio", "thread_speedup"}
+        sample_results: the results of the first len(sample_results) blocks, already calculated
+    '''
+    plan = {"mode": "serial", "workers": 1, "chunk_size": 1, "seconds_per_block": 0.0, "cpu_ratio": None, "thread_speedup": None}
+
+    # 1. Serially, on up to 2 blocks (the first one may also pay some warm-up, like imports or caches)
+    n_serial = min(len(input_blocks), 2)
+    t0, cpu_t0 = time.perf_counter(), time.thread_time()
+    sample_results = _run_chunk(target_function, input_blocks[:n_serial])
+    wall_seconds, cpu_seconds = time.perf_counter() - t0, time.thread_time() - cpu_t0
+
+    plan["seconds_per_block"] = wall_seconds / max(n_serial, 1)
+    plan["cpu_ratio"] = cpu_seconds / wall_seconds if wall_seconds > 0 else 1.0
+    n_remaining = len(input_blocks) - len(sample_results)
+
+    if (n_remaining == 0) or (max_workers == 1):
+        return plan, sample_results
+
+    if plan["cpu_ratio"] < IO_BOUND_CPU_RATIO: # Mostly waiting: the threads wait at the same time, even on one CPU
+        plan["mode"], plan["workers"] = "threads", min(max_workers or _default_workers("threads"), n_remaining)
+
+    elif _available_cpus() > 1:
+        # 2. CPU-heavy: run a few blocks on as many threads at once, faster only if the function releases the GIL
+        n_threads = min(n_remaining, max_workers or _available_cpus(), 4)
+
+        if n_threads >= 2:
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                sample_results.extend(executor.map(target_function, input_blocks[len(sample_results):len(sample_results) + n_threads]))
+            plan["thread_speedup"] = plan["seconds_per_block"] * n_threads / max(time.perf_counter() - t0, 1e-9)
+            n_remaining -= n_threads
+
+        if (plan["thread_speedup"] or 0.0) >= GIL_RELEASE_SPEEDUP:
+            plan["mode"], plan["workers"] = "threads", min(max_workers or _available_cpus(), max(n_remaining, 1))
+
+        elif (plan["seconds_per_block"] * n_remaining > PROCESS_START_SECONDS) and _can_be_pickled(target_function, input_blocks[0]):
+            plan["mode"], plan["workers"] = "processes", min(max_workers or _available_cpus(), max(n_remaining, 1))
+
+    # Chunks of about TARGET_TASK_SECONDS, but at least 4 chunks per worker so they all stay busy until the end
+    if plan["mode"] != "serial":
+        chunk_size = math.ceil(TARGET_TASK_SECONDS / max(plan["seconds_per_block"], 1e-9))
+        plan["chunk_size"] = max(1, min(chunk_size, math.ceil(n_remaining / (4 * plan["workers"]))))
+
+    return plan, sample_results
+
+
+def parallel_map(target_function, input_blocks, max_workers=None, mode="auto", chunk_size=None, progress=True, desc="parallel_map"):
+    '''
+    target_function: the function to run on each block (must be of the module level to run in processes)
+    input_blocks: list (or iterable) of input blocks
+    max_workers: maximum number of threads or processes (by default: the number of CPUs, plus 4 threads for a mostly waiting function)
+    mode: "auto" (calibrated), or forced to "threads", "processes" or "serial"
+    chunk_size: number of blocks per task (tuned by the calibration by default)
+    progress: show a tqdm progress bar (ignored if tqdm is not installed)
+    Returns: List of output blocks corresponding to input blocks (same order)
+    '''
+    assert mode in MODES, f"mode must be one of {MODES}"
+
+    input_blocks = list(input_blocks)
+
+    if mode == "auto":
+        plan, output_blocks = calibrate(target_function, input_blocks, max_workers)
+    else:
+        plan, output_blocks = {"mode": mode, "workers": 1 if mode == "serial" else (max_workers or _default_workers(mode)), "chunk_size": 1}, []
+
+    chunk_size = chunk_size or plan["chunk_size"]
+    remaining_blocks = input_blocks[len(output_blocks):]
+    chunks = [remaining_blocks[start:start + chunk_size] for start in range(0, len(remaining_blocks), chunk_size)]
+
+    progress_bar = None
+    if progress:
+        try:
+            from tqdm import tqdm # Optional, only for the progress bar
+            progress_bar = tqdm(total=len(input_blocks), initial=len(output_blocks), desc=f"{desc} [{plan['mode']} x{plan['workers']}, chunk {chunk_size}]")
+        except ImportError:
+            pass
+
+    run_chunk = partial(_run_chunk, target_function)
+    executor = None
+
+    try:
+        match plan["mode"]:
+            case "serial":
+                results = map(run_chunk, chunks)
+            case "threads":
+                executor = ThreadPoolExecutor(max_workers=plan["workers"])
+                results = executor.map(run_chunk, chunks)
+            case "processes":
+                executor = ProcessPoolExecutor(max_workers=plan["workers"])
+                results = executor.map(run_chunk, chunks)
+
+        for chunk_results in results: # In the order of the blocks, raising the first exception of the target function
+            output_blocks.extend(chunk_results)
+            if progress_bar is not None:
+                progress_bar.update(len(chunk_results))
+
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True) # Do not start the remaining chunks after an exception
+        if progress_bar is not None:
+            progress_bar.close()
+
+    return output_blocks
@@ -0,0 +1,359 @@
+'''
+Scan LARGE text files for hundreds of patterns at once
+
+re.findall(pattern, text) (12_re_RegularExpression_regex.py) reads the whole text once PER pattern,
+and compiles (or looks up) the pattern string on every call. For hundreds of patterns over GBs of text:
+    + compile_patterns(): the pattern set is compiled ONCE, and kept in a cache (functools.lru_cache) keyed by the patterns,
+      so each process of the pool compiles it only once too
+    + the literal keywords (patterns without any regex special character) are merged into ONE regular expression
+      shaped like a trie ("apple", "apply", "ape" -> ap(?:pl[ey]|e)), which the re engine follows byte by byte
+      in a single pass, instead of one pass per keyword. Only the real regular expressions get a pass each
+    + scan_files(): each file is memory-mapped (nothing is read in advance, nothing copied) and cut into byte ranges
+      of chunk_bytes, scanned in parallel by a process pool. A match starting in a range is searched in the rest of
+      the file (the keywords a few bytes only), so a match crossing the end of the range is still found whole
+    + the output is a stream of (file, offset, pattern_id), in the order of the files and of the offsets
+
+The matches are the same as one re.finditer() pass per pattern over each whole file would give:
+    + a keyword match reports every keyword ending along the matched trie path ("he" and "hello" in "hello"),
+      and a keyword overlapping its own previous match is skipped ("aa" in "aaa" is found once), like re.finditer()
+    + a regular expression cannot know where its previous match ended in the previous range: the main process follows
+      the ranges in order, and re-scans the start of a range itself when the matches found by the worker do not line up
+      (e.g. "a{2}" over a long run of "a": a full scan pairs the bytes from the start of the file)
+
+The files are scanned as bytes: the offsets are byte offsets, the patterns are encoded to UTF-8,
+ignore_case and whole_words (\\b) only know the ASCII letters. A pattern matching an empty string ("", "a*") is rejected.
+A regular expression is searched from max_match_bytes before its range (a better chance to line up with the previous range)
+and past its end until its next match: with no more match in the file, each range reads up to the end of the file for it.
+
+Usage:
+    from pattern_scanner import scan_files
+
+    patterns = {"rain": "rain", "humpty": "Humpty", "score": r"\\b\\d{2,3}\\b"}
+    for file_path, offset, pattern_id in scan_files(Path("demo_data/txt_files").glob("*.txt"), patterns, workers=4):
+        print(file_path, offset, pattern_id)
+'''
+
+from collections import deque
+from functools import lru_cache, partial
+from multiprocessing import Pool
+import mmap, os, re
+
+REGEX_SPECIAL_CHARACTERS = frozenset(".^$*+?{}[]\\|()")
+WORD_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_") # The \w of a bytes pattern
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def is_keyword(pattern): # A pattern without any special character is a plain literal
+    return not any(char in REGEX_SPECIAL_CHARACTERS for char in pattern)
+
+
+#---------------------------------------------------------------------------#
+#----------------------- Keywords -> one trie regex ------------------------#
+#---------------------------------------------------------------------------#
+
+def _trie_regex(node):
+    # Regex (bytes) of a trie node {byte: child node, None: True if a keyword ends here}, the longest branches tried first
+    children = sorted((byte, child) for byte, child in node.items() if byte is not None)
+    leaves = [byte for byte, child in children if list(child) == [None]] # A keyword ends right after this byte
+    branches = [re.escape(bytes([byte])) + _trie_regex(child) for byte, child in children if list(child) != [None]]
+
+    if len(leaves) == 1:
+        branches.append(re.escape(bytes([leaves[0]])))
+    elif len(leaves) > 1: # Several last bytes: one character set [ey]
+        branches.append(b"[" + b"".join(re.escape(bytes([byte])) for byte in leaves) + b"]")
+
+    if len(branches) == 0:
+        return b""
+    regex = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+    if None in node: # A keyword also ends at this node: the rest is optional (greedy, so the longer keyword wins)
+        regex = b"(?:" + regex + b")?"
+    return regex
+
+
+def keywords_regex(keywords, ignore_case=False, whole_words=False):
+    '''
+    One compiled regular expression (bytes) finding the keywords (bytes) in a single pass.
+    Each match is a zero-width lookahead with the LONGEST keyword starting at this offset in group 1,
+    so overlapping keywords are all found (the shorter keywords of the same offset are its prefixes, see PatternSet).
+    '''
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for byte in (keyword.lower() if ignore_case else keyword):
+            node = node.setdefault(byte, {})
+        node[None] = True
+
+    regex = _trie_regex(trie)
+    if whole_words:
+        regex = rb"\b" + regex + rb"\b"
+    return re.compile(b"(?=(" + regex + b"))", re.IGNORECASE if ignore_case else 0)
+
+
+#---------------------------------------------------------------------------#
+#--------------------------- Compiled pattern set --------------------------#
+#---------------------------------------------------------------------------#
+
+class PatternSet:
+    '''
+    patterns: tuple of (pattern_id, pattern string), see compile_patterns()
+    Attributes: keyword_regex (None if no keyword), keyword_ids {keyword bytes: [pattern ids]},
+                keyword_hits {keyword bytes: [ids of this keyword and of the shorter keywords matching at the same offset]},
+                regexes [(pattern_id, compiled)], overlap (bytes scanned beyond the end of a range by the keywords,
+                and before its start by the regexes)
+    '''
+    def __init__(self, patterns, ignore_case=False, whole_words=False, max_match_bytes=1024):
+        self.ignore_case = ignore_case
+        self.keyword_ids = {}
+        self.keyword_lengths = {} # pattern_id -> length of its keyword in bytes
+        self.regexes = []
+        flags = re.IGNORECASE if ignore_case else 0
+
+        for pattern_id, pattern in patterns:
+            encoded = pattern.encode("utf-8")
+            if is_keyword(pattern) and encoded != b"":
+                self.keyword_ids.setdefault(encoded.lower() if ignore_case else encoded, []).append(pattern_id)
+                self.keyword_lengths[pattern_id] = len(encoded)
+                continue
+
+            if re.compile(encoded, flags).match(b"") is not None: # "" or "a*" would match at every byte
+                raise ValueError(f"Pattern {pattern_id!r} ({pattern!r}) matches an empty string")
+            self.regexes.append((pattern_id, re.compile(rb"\b(?:" + encoded + rb")\b" if whole_words else encoded, flags)))
+
+        # The regex only gives the longest keyword of an offset: the keywords which are its prefixes match there too
+        # (with whole_words, only those ending at a word boundary inside it: "new" in "new york", not "he" in "hello")
+        self.keyword_hits = {}
+        for keyword in self.keyword_ids:
+            self.keyword_hits[keyword] = [pattern_id for length in range(1, len(keyword) + 1)
+                                          if keyword[:length] in self.keyword_ids
+                                          and (not whole_words or length == len(keyword) or (keyword[length - 1] in WORD_BYTES) != (keyword[length] in WORD_BYTES))
+                                          for pattern_id in self.keyword_ids[keyword[:length]]]
+
+        self.keyword_regex = keywords_regex(self.keyword_ids, ignore_case, whole_words) if self.keyword_ids else None
+        longest_keyword = max(map(len, self.keyword_ids), default=0)
+        self.overlap = max(longest_keyword, max_match_bytes if self.regexes else 0) + 1 # +1: the byte after a match, for \b
+
+    def keyword_matches(self, buffer, start, end, window_end):
+        # (offset, pattern_id) of every keyword starting in [start, end), overlapping ones included, by offset
+        matches = []
+        if self.keyword_regex is None:
+            return matches
+
+        keyword_hits = self.keyword_hits
+        for match in self.keyword_regex.finditer(buffer, start, window_end):
+            offset = match.start()
+            if offset >= end:
+                break
+            keyword = match.group(1)
+            for pattern_id in keyword_hits[keyword.lower() if self.ignore_case else keyword]:
+                matches.append((offset, pattern_id))
+        return matches
+
+    def accept_keywords(self, keyword_matches, keyword_ends):
+        # Drop the matches overlapping the previous match of the same keyword (keyword_ends: pattern_id -> end), like re.finditer()
+        accepted = []
+        keyword_lengths = self.keyword_lengths
+        for offset, pattern_id in keyword_matches:
+            if offset >= keyword_ends.get(pattern_id, 0):
+                keyword_ends[pattern_id] = offset + keyword_lengths[pattern_id]
+                accepted.append((offset, pattern_id))
+        return accepted
+
+    def regex_spans(self, index, buffer, search_from, end):
+        # (start, end) of the matches of the index-th regex, by re.finditer() from search_from, starting before end.
+        # Not limited to a window: a match starting before end is only found whole with the rest of the buffer
+        spans = []
+        for match in self.regexes[index][1].finditer(buffer, search_from):
+            if match.start() >= end:
+                break
+            spans.append(match.span())
+        return spans
+
+    def scan(self, buffer, start=0, end=None):
+        '''
+        Matches STARTING in buffer[start:end] (bytes, mmap, ...) of a scan starting at start, the keywords looking up to
+        self.overlap bytes beyond end, the regexes the rest of the buffer. Returns: sorted list of (offset, pattern_id)
+        '''
+        end = len(buffer) if end is None else end
+        window_end = min(end + self.overlap, len(buffer))
+
+        matches = self.accept_keywords(self.keyword_matches(buffer, start, end, window_end), {})
+        for index, (pattern_id, _) in enumerate(self.regexes):
+            matches.extend((match_start, pattern_id) for match_start, _ in self.regex_spans(index, buffer, start, end))
+
+        matches.sort(key=lambda match: match[0]) # Stable: at one offset, the keywords first, then the regexes in their order
+        return matches
+
+
+@lru_cache(maxsize=32)
+def compile_patterns(patterns, ignore_case=False, whole_words=False, max_match_bytes=1024):
+    '''
+    patterns: tuple of (pattern_id, pattern string) pairs (hashable, so it can be the key of the cache).
+    Returns the PatternSet, compiled only the first time for the same arguments (in each process).
+    Raises ValueError for a pattern matching an empty string, re.error for an invalid regular expression.
+    '''
+    return PatternSet(patterns, ignore_case, whole_words, max_match_bytes)
+
+
+def _pattern_items(patterns):
+    # {id: pattern} or [pattern, ...] (ids = positions) -> tuple of (id, pattern)
+    return tuple(patterns.items()) if isinstance(patterns, dict) else tuple(enumerate(patterns))
+
+
+#---------------------------------------------------------------------------#
+#------------------------------- Scan files --------------------------------#
+#---------------------------------------------------------------------------#
+
+def _open_buffer(file_path): # Read-only memory map of the whole file
+    with open(file_path, "rb") as file_pointer:
+        return mmap.mmap(file_pointer.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _scan_range(byte_range, pattern_options):
+    '''
+    One task (in a process of the pool, or serially): the candidate matches of the bytes [start, end) of a file.
+    Returns (keyword matches, regex runs): every keyword occurrence starting in the range, and for each regex
+    (search_from, spans), its matches found by re.finditer() from overlap bytes before the range.
+    '''
+    file_path, start, end = byte_range
+    pattern_set = compile_patterns(*pattern_options) # From the cache of this process after its first task
+
+    with _open_buffer(file_path) as buffer:
+        window_end = min(end + pattern_set.overlap, len(buffer))
+        search_from = max(start - pattern_set.overlap, 0) # Earlier than start: more chances to line up with the previous range
+        keyword_matches = pattern_set.keyword_matches(buffer, start, end, window_end)
+        regex_runs = [(search_from, pattern_set.regex_spans(index, buffer, search_from, end)) for index in range(len(pattern_set.regexes))]
+
+    return keyword_matches, regex_runs
+
+
+class _FileScan:
+    '''
+    The state of the scan of one file, followed range after range in the main process: the end of the last match of
+    each keyword, and the state of each regex (search position, after an empty match) as ONE re.finditer() over
+    the whole file would have it. The file is only opened here if a regex needs a re-scan.
+    '''
+    def __init__(self, file_path, pattern_set):
+        self.file_path = file_path
+        self.pattern_set = pattern_set
+        self.keyword_ends = {}
+        self.regex_states = [(0, False)] * len(pattern_set.regexes)
+        self.size = os.path.getsize(file_path)
+        self._buffer = None
+
+    def close(self):
+        if self._buffer is not None:
+            self._buffer.close()
+
+    def matches(self, start, end, keyword_matches, regex_runs):
+        # Sorted (offset, pattern_id) of the range, from the candidates of _scan_range()
+        matches = self.pattern_set.accept_keywords(keyword_matches, self.keyword_ends)
+        for index, (search_from, spans) in enumerate(regex_runs):
+            pattern_id = self.pattern_set.regexes[index][0]
+            matches.extend((match_start, pattern_id) for match_start, _ in self._follow_regex(index, start, end, search_from, spans))
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def _follow_regex(self, index, start, end, search_from, spans):
+        '''
+        The spans of the index-th regex starting in [start, end) of the single scan of the file: the spans of the worker
+        from the first one it has in common with the single scan, the ones before re-scanned here.
+        '''
+        position, after_empty = self.regex_states[index] # After an empty match, re.finditer() needs a non-empty one at position
+        kept = []
+        k, rescan = 0, None
+        while True:
+            while k < len(spans) and spans[k][0] < position: # Worker matches before position: not in the single scan
+                k += 1
+            # The worker searched its k-th match from (q, q_after_empty), and found no match starting between q and it:
+            # a search from position, between q and the k-th match, finds the same one
+            q, q_after_empty = (search_from, False) if k == 0 else (spans[k - 1][1], spans[k - 1][0] == spans[k - 1][1])
+            if k < len(spans):
+                in_line = q <= position and (position < spans[k][0] or after_empty == (q_after_empty and q == position))
+            else: # No more worker match in the range
+                in_line = q < position or (q == position and (after_empty or not q_after_empty))
+            if in_line or position >= end:
+                kept.extend(spans[k:])
+                break
+
+            if rescan is None: # One match of the single scan at a time, until it lines up with the worker's
+                if self._buffer is None:
+                    self._buffer = _open_buffer(self.file_path)
+                rescan = self.pattern_set.regexes[index][1].finditer(self._buffer, position)
+                match = next(rescan, None)
+                if after_empty and match is not None and match.span() == (position, position): # Not allowed right after an empty match
+                    match = next(rescan, None)
+            else:
+                match = next(rescan, None)
+
+            if match is None or match.start() >= end:
+                break
+            kept.append(match.span())
+            position, after_empty = match.end(), match.start() == match.end()
+
+        if len(kept) > 0:
+            position, after_empty = kept[-1][1], kept[-1][0] == kept[-1][1]
+        if position < end: # No match starts in [position, end): searching from end finds the same next match
+            position, after_empty = end, False
+        self.regex_states[index] = (position, after_empty)
+
+        return kept
+
+
+def scan_files(file_paths, patterns, workers=1, chunk_bytes=CHUNK_BYTES, ignore_case=False, whole_words=False, max_match_bytes=1024):
+    '''
+    Generator of (file path, byte offset, pattern_id) of all the matches of the patterns in the files, the same as
+    one re.finditer() pass per pattern over each whole file would give.
+        patterns: {pattern_id: pattern} or a list of patterns (pattern_id = position). A pattern without any regex special
+                  character is a keyword (merged with the others into a single pass), the others are regular expressions
+        workers: number of processes scanning the byte ranges at the same time (1 = in this process)
+        chunk_bytes: size of the byte ranges each file is cut into
+        ignore_case, whole_words: for all patterns (ASCII only)
+        max_match_bytes: bytes searched before each range by the regular expressions, to line up with the previous range
+                         (a longer match crossing into the range is re-scanned by the main process, slower, but never missed)
+    Raises ValueError for a pattern matching an empty string.
+    '''
+    pattern_options = (_pattern_items(patterns), ignore_case, whole_words, max_match_bytes)
+    pattern_set = compile_patterns(*pattern_options) # Invalid patterns fail here, before any task
+
+    byte_ranges = []
+    for file_path in map(str, file_paths):
+        size = os.path.getsize(file_path)
+        byte_ranges.extend((file_path, start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)) # An empty file: no range
+
+    scan_range = partial(_scan_range, pattern_options=pattern_options)
+    if workers <= 1 or len(byte_ranges) <= 1:
+        yield from _follow_files(byte_ranges, map(scan_range, byte_ranges), pattern_set)
+        return
+
+    processes = min(workers, len(byte_ranges))
+    with Pool(processes=processes) as pool:
+        # In the order of the ranges, while the next ones are being scanned
+        yield from _follow_files(byte_ranges, _bounded_imap(pool, scan_range, byte_ranges, 2 * processes), pattern_set)
+
+
+def _bounded_imap(pool, function, items, window):
+    # Like pool.imap(), but at most window tasks in flight: a slow consumer never lets the results pile up in memory
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(function, (item,)))
+    while len(pending) > 0:
+        yield pending.popleft().get()
+
+
+def _follow_files(byte_ranges, candidates, pattern_set):
+    file_scan = None
+    try:
+        for (file_path, start, end), (keyword_matches, regex_runs) in zip(byte_ranges, candidates):
+            if file_scan is None or file_scan.file_path != file_path: # The first range of a new file
+                if file_scan is not None:
+                    file_scan.close()
+                file_scan = _FileScan(file_path, pattern_set)
+
+            for offset, pattern_id in file_scan.matches(start, end, keyword_matches, regex_runs):
+                yield file_path, offset, pattern_id
+    finally:
+        if file_scan is not None:
+            file_scan.close()
@@ -0,0 +1,263 @@
+'''
+A reusable scraping engine behind the BeautifulSoup workflow of 32_beautifulsoup4_WebScraping.py
+
+requests.get(url) opens a new connection for every page, one page at a time, and a rerun downloads everything again.
+For thousands of pages, ScrapeEngine instead:
+    + keeps the connections alive: one requests.Session per thread, with a connection pool per host
+      (and retries with backoff on 429/5xx responses)
+    + fetches the pages concurrently on a thread pool, with a minimum interval between the requests to the SAME host
+    + caches the responses on disk, keyed by URL: a page younger than max_age is read from the disk without any request,
+      an older one is revalidated with its ETag / Last-Modified (a "304 Not Modified" response has no body to download)
+    + parses with lxml when it is installed (several times faster than "html.parser"),
+      and can parse only the tags needed (SoupStrainer), which skips building the rest of the tree
+
+Usage:
+    from scrape_engine import ScrapeEngine
+
+    def extract(soup):
+        return [a.get("href") for a in soup.find_all("a")]
+
+    with ScrapeEngine(cache_dir="scrape_cache", max_workers=8, min_interval=0.25) as engine:
+        for result in engine.scrape(urls, extract=extract, parse_only="a"):
+            print(result["url"], result["status"], result["from_cache"], result["data"])
+'''
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlsplit
+import hashlib, json, os, threading, time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def default_parser():
+    # "lxml" if it is installed, else the built-in "html.parser" (slower, but always available)
+    try:
+        import lxml # noqa: F401 (optional, only checked)
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+def make_soup(markup, parser=None, parse_only=None):
+    '''
+    markup: HTML string (or bytes)
+    parser: "lxml", "html.parser", "html5lib", ... (default_parser() by default)
+    parse_only: a SoupStrainer, or the tag name(s) to keep ("a", ["h1", "a"]): only these tags are built into the tree
+    '''
+    if (parse_only is not None) and not isinstance(parse_only, SoupStrainer):
+        parse_only = SoupStrainer(parse_only)
+
+    return BeautifulSoup(markup, parser or default_parser(), parse_only=parse_only)
+
+
+#---------------------------------------------------------------------------#
+#------------------------ On-disk cache of responses -----------------------#
+#---------------------------------------------------------------------------#
+
+class ResponseCache:
+    '''
+    Each response is stored as 2 files named by the SHA-256 of its URL, in a sub-directory of its first 2 characters
+    (so no directory holds too many files): <key>.body (the raw bytes) and <key>.json (url, status, encoding,
+    etag, last_modified, fetched_at). The files are written to a temporary name then renamed, so a crash
+    (or 2 threads writing the same URL) never leaves a half-written entry.
+    '''
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        directory = os.path.join(self.cache_dir, key[:2])
+        return directory, os.path.join(directory, f"{key}.body"), os.path.join(directory, f"{key}.json")
+
+    def get(self, url):
+        # Returns: (metadata, body bytes), or (None, None) if the URL is not cached
+        _, body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as meta_pointer:
+                metadata = json.load(meta_pointer)
+            with open(body_path, "rb") as body_pointer:
+                return metadata, body_pointer.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, None
+
+    def put(self, url, metadata, body):
+        directory, body_path, meta_path = self._paths(url)
+        os.makedirs(directory, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(body_path + suffix, "wb") as body_pointer:
+            body_pointer.write(body)
+        os.replace(body_path + suffix, body_path)
+
+        with open(meta_path + suffix, "w", encoding="utf-8") as meta_pointer: # Written last: an entry is complete once it exists
+            json.dump(metadata, meta_pointer)
+        os.replace(meta_path + suffix, meta_path)
+
+    def touch(self, url, metadata): # Revalidated ("304 Not Modified"): only the metadata changes
+        directory, _, meta_path = self._paths(url)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(meta_path + suffix, "w", encoding="utf-8") as meta_pointer:
+            json.dump(metadata, meta_pointer)
+        os.replace(meta_path + suffix, meta_path)
+
+
+#---------------------------------------------------------------------------#
+#------------------------- Per-host rate limiting --------------------------#
+#---------------------------------------------------------------------------#
+
+class HostRateLimiter:
+    '''
+    At least min_interval seconds between the starts of 2 requests to the same host (0 = no limit).
+    Each thread reserves the next free time slot of the host under a lock, then sleeps OUTSIDE of the lock,
+    so the threads waiting for a host never block the ones going to other hosts.
+    '''
+    def __init__(self, min_interval=0.0):
+        self.min_interval = min_interval
+        self._next_start = {} # host -> earliest time.monotonic() of its next request
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if self.min_interval <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.min_interval
+
+        if start > now:
+            time.sleep(start - now)
+
+
+#---------------------------------------------------------------------------#
+#------------------------------ Scrape engine ------------------------------#
+#---------------------------------------------------------------------------#
+
+class ScrapeEngine:
+    '''
+    cache_dir: directory of the response cache (None = no cache)
+    max_workers: number of threads fetching at the same time
+    min_interval: minimum seconds between 2 requests to the same host
+    max_age: seconds during which a cached page is used without any request (0 = always revalidate, None = never expires)
+    timeout: seconds of each request (connect and read)
+    retries: retries on connection errors and 429/500/502/503/504 responses, with an exponential backoff
+    headers: extra headers of every request (e.g. {"User-Agent": ...})
+    parser: parser of BeautifulSoup (default_parser() by default)
+    '''
+    def __init__(self, cache_dir=None, max_workers=8, min_interval=0.0, max_age=0, timeout=10, retries=3, headers=None, parser=None):
+        self.cache = ResponseCache(cache_dir) if cache_dir is not None else None
+        self.max_workers = max_workers
+        self.rate_limiter = HostRateLimiter(min_interval)
+        self.max_age = max_age
+        self.timeout = timeout
+        self.retries = retries
+        self.headers = headers or {}
+        self.parser = parser or default_parser()
+
+        self._local = threading.local() # One session per thread (a requests.Session is not guaranteed thread-safe)
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            retry = Retry(total=self.retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], respect_retry_after_header=True)
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.max_workers, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(self.headers)
+
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+
+        return session
+
+    def fetch(self, url):
+        '''
+        Returns: {"url", "status", "from_cache", "text"}
+            from_cache: "fresh" (younger than max_age, no request), "revalidated" (304 Not Modified) or False (downloaded)
+        Raises the exceptions of requests (timeout, connection error, ...), and requests.HTTPError for a status >= 400.
+        '''
+        metadata, body = self.cache.get(url) if self.cache is not None else (None, None)
+
+        if (metadata is not None) and (self.max_age is None or time.time() - metadata["fetched_at"] < self.max_age):
+            return {"url": url, "status": metadata["status"], "from_cache": "fresh", "text": body.decode(metadata["encoding"], errors="replace")}
+
+        headers = {}
+        if metadata is not None: # Conditional request: the server answers 304 without the body if the page has not changed
+            if metadata.get("etag"):
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("last_modified"):
+                headers["If-Modified-Since"] = metadata["last_modified"]
+
+        self.rate_limiter.wait(urlsplit(url).netloc)
+        response = self._session().get(url, headers=headers, timeout=self.timeout)
+
+        if (response.status_code == 304) and (metadata is not None):
+            metadata["fetched_at"] = time.time()
+            self.cache.touch(url, metadata)
+            return {"url": url, "status": metadata["status"], "from_cache": "revalidated", "text": body.decode(metadata["encoding"], errors="replace")}
+
+        response.raise_for_status()
+        encoding = response.encoding or response.apparent_encoding or "utf-8"
+
+        if self.cache is not None:
+            metadata = {"url": url, "status": response.status_code, "encoding": encoding, "fetched_at": time.time(),
+                        "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            self.cache.put(url, metadata, response.content)
+
+        return {"url": url, "status": response.status_code, "from_cache": False, "text": response.content.decode(encoding, errors="replace")}
+
+    def soup(self, url, parse_only=None):
+        return make_soup(self.fetch(url)["text"], self.parser, parse_only)
+
+    def _scrape_one(self, url, extract, parse_only):
+        try:
+            page = self.fetch(url)
+            data = extract(make_soup(page["text"], self.parser, parse_only)) if extract is not None else page["text"]
+            return {"url": url, "status": page["status"], "from_cache": page["from_cache"], "data": data, "error": None}
+        except Exception as error: # One failed page must not stop the others
+            status = error.response.status_code if getattr(error, "response", None) is not None else None
+            return {"url": url, "status": status, "from_cache": False, "data": None, "error": repr(error)}
+
+    def scrape(self, urls, extract=None, parse_only=None):
+        '''
+        Generator of {"url", "status", "from_cache", "data", "error"} for each URL, in the order they COMPLETE.
+            extract: function(soup) -> data, run in the threads (None: data is the HTML text, not parsed)
+            parse_only: see make_soup()
+        A failed page gives its exception as "error" (and "data" None) instead of stopping the others.
+        At most 4 * max_workers pages are in flight, so a very long (or lazy) list of URLs is not submitted all at once.
+        '''
+        urls = iter(urls)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            while True:
+                for url in urls:
+                    pending.add(executor.submit(self._scrape_one, url, extract, parse_only))
+                    if len(pending) >= 4 * self.max_workers:
+                        break
+
+                if len(pending) == 0:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
@@ -0,0 +1,98 @@
+'''
+Send LARGE NumPy arrays to the processes of a Pool through shared memory, instead of pickling them
+
+multicore_process() of 45_multi_processing.py passes every input block to pool.map() by value:
+each block is pickled into its task, copied to a worker process, and its result is pickled back the same way.
+For NumPy blocks of MBs, this copying costs more than the calculation itself.
+
+shared_multicore_process() copies the input array ONCE into a multiprocessing.shared_memory segment,
+and creates a second segment for the output. The tasks only carry a descriptor (name, shape, dtype, start, stop):
+each worker maps both segments, calculates its rows and writes the result IN PLACE, so nothing is pickled back.
+The segments are always closed and unlinked (freed) at the end, even if a task fails.
+
+NOTE: threads (44_multi_threading.py) already share the memory of their process, so they never pickle anything,
+      and NumPy releases the GIL during most calculations. The shared memory is only needed between processes.
+
+Usage:
+    from shared_memory_blocks import shared_multicore_process
+
+    outputs = shared_multicore_process(np.sqrt, inputs, block_rows=100_000, max_processes=4) # np.sqrt(inputs), in blocks of rows
+'''
+
+from functools import partial
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+
+class SharedNDArray:
+    '''
+    A NumPy array stored in a shared memory segment, usable as a context manager which frees the segment when leaving the "with" block.
+    '''
+
+    def __init__(self, shape, dtype):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._segment = shared_memory.SharedMemory(create=True, size=max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)) # A segment cannot be empty
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._segment.buf)
+
+    @classmethod
+    def from_array(cls, array): # The only copy of the input data
+        shared_array = cls(array.shape, array.dtype)
+        shared_array.array[...] = array
+        return shared_array
+
+    def descriptor(self, start, stop):
+        # Everything a worker needs to map the rows [start:stop] of this array, small enough to be pickled in every task
+        return (self._segment.name, self.shape, self.dtype.str, start, stop)
+
+    def close(self):
+        self.array = None # The buffer cannot be released while an array still uses it
+        self._segment.close()
+        self._segment.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_attached_segments = {} # Segment name -> SharedMemory mapped by this worker process, so each task does not map it again
+
+
+def attach_block(descriptor):
+    '''
+    The rows [start:stop] of a shared array, as a NumPy view (no copy) in the worker process.
+    '''
+    name, shape, dtype, start, stop = descriptor
+
+    if name not in _attached_segments:
+        _attached_segments[name] = shared_memory.SharedMemory(name=name)
+
+    return np.ndarray(shape, dtype=dtype, buffer=_attached_segments[name].buf)[start:stop]
+
+
+def _shared_target(descriptors, target_function):
+    input_descriptor, output_descriptor = descriptors
+    attach_block(output_descriptor)[...] = target_function(attach_block(input_descriptor)) # Written in place, only None is sent back
+
+
+def shared_multicore_process(target_function, input_array, block_rows=100_000, max_processes=4, output_dtype=None):
+    '''
+    target_function: a function of the module level (so it can be pickled), taking a block of rows of input_array
+                     and returning an array of the same shape (e.g. np.sqrt)
+    input_array: the NumPy array to split into blocks of block_rows rows (along the first axis)
+    output_dtype: the dtype of the output array (the dtype of input_array by default)
+    Returns: the output array, as a normal NumPy array (copied once out of the shared memory)
+    '''
+    input_array = np.asarray(input_array)
+    blocks = [(start, min(start + block_rows, len(input_array))) for start in range(0, len(input_array), block_rows)]
+
+    with SharedNDArray.from_array(input_array) as shared_input, SharedNDArray(input_array.shape, output_dtype or input_array.dtype) as shared_output:
+        descriptors = [(shared_input.descriptor(start, stop), shared_output.descriptor(start, stop)) for start, stop in blocks]
+
+        with Pool(processes=max_processes) as pool:
+            pool.map(func=partial(_shared_target, target_function=target_function), iterable=descriptors)
+
+        return shared_output.array.copy() # Copied before the segment is freed
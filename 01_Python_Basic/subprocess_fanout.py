@@ -0,0 +1,272 @@
+'''
+Run THOUSANDS of external commands concurrently with asyncio, streaming their output line by line
+
+subprocess.run() (46_subprocess_sys.py) runs one command at a time, and the Popen loop of that file starts all of them
+at once and keeps all their output in memory. run_commands() instead:
+    + starts the commands with subprocess.Popen() and follows their pipes and their exit in the asyncio event loop,
+      at most max_concurrency at the same time:
+      max_concurrency worker coroutines take the next command from the queue, so thousands of queued commands
+      do not mean thousands of tasks or open pipes
+    + kills a command running longer than its timeout (with its whole process group on Linux/Mac)
+      and the running commands when the batch stops early (Ctrl-C, the coroutine cancelled, or on_line raising an exception)
+    + reads stdout and stderr by blocks as they come, split into lines, and gives each line to a callback on_line(index, stream, line)
+      and/or appends it to output_dir/<index>.stdout / .stderr: only the last tail_lines lines of stderr are kept in memory
+    + returns one result per command (in the order of the commands): exit status, timed out or not, wall time, CPU time,
+      number of lines, and format_summary() turns them into a summary table
+
+CPU time: asyncio.create_subprocess_exec() reaps the processes with os.waitpid(), which loses their resource usage.
+Each process is reaped here with os.wait4() instead, which gives its EXACT CPU time (user + system, with the children
+it waited for) however short it was: as soon as its pidfd is readable (Linux), else in a thread of the executor.
+The summary also gives the total CPU time of all the commands of the batch (resource.RUSAGE_CHILDREN).
+On Windows (no os.wait4()), cpu_seconds is None.
+
+Usage:
+    from subprocess_fanout import run_commands, format_summary
+
+    results, batch = run_commands([["gzip", "-k", path] for path in paths], max_concurrency=8, timeout=60)
+    print(format_summary(results, batch))
+'''
+
+from collections import deque
+import asyncio, os, shlex, signal, subprocess, sys, time
+
+try:
+    import resource # Unix only
+except ImportError:
+    resource = None
+
+READ_SIZE = 1 << 16 # Bytes read from a pipe at a time, then split into lines (much faster than one readline() per line)
+
+
+def _children_cpu_seconds():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _kill(process):
+    # The whole process group (a shell script and its children), else only the process
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError: # Exited meanwhile
+        pass
+
+
+async def _reap(process):
+    # Wait for the exit of the process and reap it: (returncode, cpu_seconds), cpu_seconds None if not available
+    loop = asyncio.get_running_loop()
+    if not hasattr(os, "wait4"): # Windows
+        return await loop.run_in_executor(None, process.wait), None
+
+    if hasattr(os, "pidfd_open"): # Linux: readable when the process exits, no thread needed
+        exited = loop.create_future()
+        pidfd = os.pidfd_open(process.pid)
+        try:
+            loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+        _, status, usage = os.wait4(process.pid, 0) # Already exited: does not block
+    else:
+        _, status, usage = await loop.run_in_executor(None, os.wait4, process.pid, 0)
+
+    process.returncode = os.waitstatus_to_exitcode(status) # Popen must not try to reap it again
+    return process.returncode, usage.ru_utime + usage.ru_stime
+
+
+async def _open_reader(pipe):
+    # asyncio.StreamReader over a pipe of the process (closed by the transport at the end of the output)
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=READ_SIZE, loop=loop)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), pipe)
+    return reader
+
+
+#---------------------------------------------------------------------------#
+#--------------------------- Run one command -------------------------------#
+#---------------------------------------------------------------------------#
+
+def _handle_lines(text, stream_name, result, on_line, output_pointer, tail):
+    # text: complete lines, without the last "\n"
+    lines = text.split("\n")
+    result[f"{stream_name}_lines"] += len(lines)
+    if on_line is not None:
+        for line in lines:
+            on_line(result["index"], stream_name, line.rstrip("\r"))
+    if output_pointer is not None:
+        output_pointer.write(text + "\n") # The whole block at once
+    if tail is not None:
+        tail.extend(lines)
+
+
+async def _read_lines(stream, stream_name, result, on_line, output_pointer, tail):
+    # Read by blocks of READ_SIZE bytes: only the lines of the block and the unfinished last line are in memory
+    pending = b""
+    while len(block := await stream.read(READ_SIZE)) > 0:
+        block = pending + block
+        end = block.rfind(b"\n")
+        if end < 0: # No complete line yet
+            pending = block
+            continue
+        pending = block[end + 1:] # Cut at a newline: a UTF-8 character is never split
+        _handle_lines(block[:end].decode("utf-8", errors="replace"), stream_name, result, on_line, output_pointer, tail)
+
+    if len(pending) > 0: # Last line without "\n"
+        _handle_lines(pending.decode("utf-8", errors="replace"), stream_name, result, on_line, output_pointer, tail)
+
+
+async def _run_command(index, command, timeout, on_line, output_dir, tail_lines, cwd, env):
+    result = {"index": index, "command": command, "returncode": None, "timed_out": False, "wall_seconds": None, "cpu_seconds": None,
+              "stdout_lines": 0, "stderr_lines": 0, "stderr_tail": [], "error": None}
+    output_pointers = {"stdout": None, "stderr": None}
+    t0 = time.perf_counter()
+
+    try:
+        if output_dir is not None:
+            for stream_name in output_pointers:
+                output_pointers[stream_name] = open(os.path.join(output_dir, f"{index}.{stream_name}"), "w", encoding="utf-8")
+
+        process = subprocess.Popen(
+            command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=cwd, env=env, start_new_session=hasattr(os, "killpg"), # Own process group, to be killed as a whole
+        )
+        reaper = asyncio.ensure_future(_reap(process))
+
+        stderr_tail = deque(maxlen=tail_lines)
+        reader_tasks = []
+        readers = None
+        try:
+            stdout_reader, stderr_reader = await _open_reader(process.stdout), await _open_reader(process.stderr)
+            reader_tasks = [asyncio.ensure_future(_read_lines(stdout_reader, "stdout", result, on_line, output_pointers["stdout"], None)),
+                            asyncio.ensure_future(_read_lines(stderr_reader, "stderr", result, on_line, output_pointers["stderr"], stderr_tail))]
+            readers = asyncio.gather(*reader_tasks)
+            await asyncio.wait_for(asyncio.shield(readers), timeout)
+            grace = None if timeout is None else max(timeout - (time.perf_counter() - t0), 1.0) # At least a short grace to exit after its output
+            await asyncio.wait_for(asyncio.shield(reaper), grace)
+        except asyncio.TimeoutError:
+            result["timed_out"] = True
+            _kill(process)
+            await reaper
+            await readers # The pipes are closed by the kill: the readers end
+        except BaseException: # Cancelled (Ctrl-C, the batch cancelled) or on_line raised: the command must not outlive the batch
+            _kill(process) # In its own session, so Ctrl-C at the terminal never reached it
+            for task in reader_tasks:
+                task.cancel()
+            await asyncio.gather(*reader_tasks, return_exceptions=True)
+            if (readers is not None) and not readers.cancelled():
+                readers.exception() # Retrieved, so asyncio does not log it as never retrieved
+            await asyncio.wait([reaper]) # Reaped: cancelling this task again meanwhile would not cancel the reaper
+            raise
+
+        result["returncode"], result["cpu_seconds"] = reaper.result()
+        result["stderr_tail"] = list(stderr_tail)
+
+    except OSError as error: # Command not found, not executable, ...
+        result["error"] = repr(error)
+
+    finally:
+        result["wall_seconds"] = time.perf_counter() - t0
+        for output_pointer in output_pointers.values():
+            if output_pointer is not None:
+                output_pointer.close()
+
+    return result
+
+
+#---------------------------------------------------------------------------#
+#------------------------------ Run them all -------------------------------#
+#---------------------------------------------------------------------------#
+
+async def run_commands_async(commands, max_concurrency=None, timeout=None, on_line=None, output_dir=None, tail_lines=10, cwd=None, env=None):
+    '''
+    Coroutine version of run_commands() (to be awaited inside a running event loop).
+    '''
+    commands = [shlex.split(command) if isinstance(command, str) else list(command) for command in commands]
+    max_concurrency = max_concurrency or 4 * (os.cpu_count() or 1)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results = [None] * len(commands)
+    queue = iter(enumerate(commands)) # Shared by the workers: each next() gives a command to exactly one of them
+
+    async def worker():
+        for index, command in queue:
+            results[index] = await _run_command(index, command, timeout, on_line, output_dir, tail_lines, cwd, env)
+
+    cpu_t0, t0 = _children_cpu_seconds(), time.perf_counter()
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(max_concurrency, max(len(commands), 1)))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException: # One worker failed (on_line raised) or the batch is cancelled: the others stop too, with their commands
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+    cpu_t1 = _children_cpu_seconds()
+
+    batch = {"commands": len(commands), "max_concurrency": max_concurrency, "wall_seconds": time.perf_counter() - t0,
+             "cpu_seconds": None if cpu_t0 is None else cpu_t1 - cpu_t0,
+             "succeeded": sum(1 for result in results if result["returncode"] == 0 and not result["timed_out"]),
+             "failed": sum(1 for result in results if result["returncode"] not in (0, None) and not result["timed_out"]),
+             "timed_out": sum(1 for result in results if result["timed_out"]),
+             "errors": sum(1 for result in results if result["error"] is not None)}
+
+    return results, batch
+
+
+def run_commands(commands, max_concurrency=None, timeout=None, on_line=None, output_dir=None, tail_lines=10, cwd=None, env=None):
+    '''
+    commands: list of commands, each a list of arguments (["ls", "-l"]) or a string split like a shell would ("ls -l", no shell features)
+    max_concurrency: maximum number of commands running at the same time (4 per CPU by default)
+    timeout: seconds after which a command is killed (None = no limit)
+    on_line: function(index, stream, line) called for each line of output (stream is "stdout" or "stderr"), in the event loop:
+             it should be quick (no blocking calls)
+    output_dir: if given, the lines are also written to output_dir/<index>.stdout and output_dir/<index>.stderr
+    tail_lines: number of the last lines of stderr kept in each result
+    cwd, env: working directory and environment variables of the commands
+
+    Returns: (results, batch)
+        results: one dictionary per command, in the order of the commands: {"index", "command", "returncode", "timed_out",
+                 "wall_seconds", "cpu_seconds", "stdout_lines", "stderr_lines", "stderr_tail", "error"}
+        batch: {"commands", "max_concurrency", "wall_seconds", "cpu_seconds" (exact total of the batch), "succeeded", "failed", "timed_out", "errors"}
+    '''
+    return asyncio.run(run_commands_async(commands, max_concurrency, timeout, on_line, output_dir, tail_lines, cwd, env))
+
+
+def format_summary(results, batch=None, max_rows=20):
+    # Summary table of the results: the slowest max_rows commands first, then the totals of the batch
+    header = f"{'index':>6} | {'status':<10} | {'wall (s)':>9} | {'cpu (s)':>8} | {'out lines':>9} | {'err lines':>9} | command"
+    lines = [header, "-" * len(header)]
+
+    for result in sorted(results, key=lambda result: -result["wall_seconds"])[:max_rows]:
+        status = "error" if result["error"] else "timeout" if result["timed_out"] else f"exit {result['returncode']}"
+        cpu = f"{result['cpu_seconds']:8.3f}" if result["cpu_seconds"] is not None else f"{'-':>8}"
+        command = shlex.join(result["command"])
+        lines.append(f"{result['index']:>6} | {status:<10} | {result['wall_seconds']:9.3f} | {cpu} | {result['stdout_lines']:>9} | {result['stderr_lines']:>9} | "
+                     f"{command if len(command) <= 60 else command[:57] + '...'}")
+
+    if len(results) > max_rows:
+        lines.append(f"... ({len(results) - max_rows} faster commands not shown)")
+
+    if batch is not None:
+        cpu = f"{batch['cpu_seconds']:.3f} s" if batch["cpu_seconds"] is not None else "-"
+        lines.append(f"{batch['commands']} commands in {batch['wall_seconds']:.3f} s ({batch['commands'] / max(batch['wall_seconds'], 1e-9):.0f} commands/s,"
+                     f" {batch['max_concurrency']} at a time) | CPU {cpu} | succeeded {batch['succeeded']}, failed {batch['failed']},"
+                     f" timed out {batch['timed_out']}, errors {batch['errors']}")
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Quick demo: python subprocess_fanout.py
+    demo_commands = [[sys.executable, "-c", f"import time; print('command {i}'); time.sleep({i % 3} * 0.1)"] for i in range(12)]
+    demo_commands.append([sys.executable, "-c", "import time; time.sleep(5)"])
+    demo_commands.append(["command_not_found_xyz"])
+
+    demo_results, demo_batch = run_commands(demo_commands, max_concurrency=4, timeout=1, on_line=lambda index, stream, line: print(f"[{index} {stream}] {line}"))
+    print(format_summary(demo_results, demo_batch))
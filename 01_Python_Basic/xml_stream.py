@@ -0,0 +1,189 @@
+'''
+Summarize and flatten LARGE XML files while streaming them with ET.iterparse()
+
+ET.parse() builds the whole tree in memory before anything can be read, so the memory grows with the size of the file,
+and a recursive function like summarize_xml_structure() (31_XML_parse_create_write.py) can hit the recursion limit on deep documents.
+
+Here, ET.iterparse() gives the elements while the file is being read. Each element is removed from its parent
+as soon as it has been used, so only the elements still open (one per level) and the current record stay in memory:
+    + summarize_xml_stream(): statistics of each tag path (count, elements having text, attribute names), without recursion
+    + iter_xml_records(): each record element (e.g. <food> in food.xml) as a flat dictionary {"name": ..., "price": ...}
+    + iter_xml_chunks(): the records as columnar chunks {column: [values]}
+    + xml_to_csv(): the records written straight to a .csv file
+
+The tags and attributes are used without their namespace ("{http://...}food" -> "food").
+
+Usage:
+    from xml_stream import summarize_xml_stream, print_xml_summary, xml_to_csv
+
+    print_xml_summary(summarize_xml_stream("food.xml"))
+    xml_to_csv("food.xml", record_tag="food", csv_path="food.csv")
+'''
+
+from collections import Counter
+from itertools import islice
+import csv
+import xml.etree.ElementTree as ET
+
+
+def _local_name(tag): # "{namespace}food" -> "food"
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_events(file_path):
+    '''
+    Generator of (event, path, element, parent) for the "start" and "end" of each element of the XML file.
+    path is the tag path from the root ("breakfast_menu/food/name"), parent is None for the root (and for the "start" events).
+    The text and the children of an element are only complete at its "end".
+    '''
+    paths, open_elements = [], []
+    local_names = {} # Tag -> tag without its namespace, computed once per distinct tag
+
+    for event, element in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            tag = local_names.get(element.tag)
+            if tag is None:
+                tag = local_names[element.tag] = _local_name(element.tag)
+            paths.append(f"{paths[-1]}/{tag}" if len(paths) > 0 else tag)
+            open_elements.append(element)
+            yield event, paths[-1], element, None
+
+        else:
+            yield event, paths[-1], element, open_elements[-2] if len(open_elements) >= 2 else None
+            paths.pop()
+            open_elements.pop()
+
+
+def _release(element, parent):
+    # Free an element which has been used. It is the first child left in its parent (the previous ones were released already)
+    element.clear()
+    if parent is not None:
+        parent.remove(element)
+
+
+#---------------------------------------------------------------------------#
+#------------------------- Summarize the tag paths -------------------------#
+#---------------------------------------------------------------------------#
+
+def summarize_xml_stream(file_path):
+    '''
+    Returns: {tag path: {"count": number of elements, "with_text": number of them having a (non-blank) text,
+                         "attributes": Counter of their attribute names}}, in the order of the document
+    '''
+    summary = {}
+
+    for event, path, element, parent in _iter_events(file_path):
+        if event == "start":
+            if path not in summary:
+                summary[path] = {"count": 0, "with_text": 0, "attributes": Counter()}
+            continue
+
+        path_stats = summary[path]
+        path_stats["count"] += 1
+        if element.text and not element.text.isspace():
+            path_stats["with_text"] += 1
+        if element.attrib:
+            path_stats["attributes"].update(map(_local_name, element.attrib)) # The names only (a dictionary would add its values)
+
+        _release(element, parent)
+
+    return summary
+
+
+def print_xml_summary(summary):
+    for path, path_stats in summary.items():
+        indent = "  " * path.count("/")
+        attributes = f", attributes: {dict(path_stats['attributes'])}" if len(path_stats["attributes"]) > 0 else ""
+        print(f"{indent}{path.rsplit('/', 1)[-1]} (x{path_stats['count']}, with text: {path_stats['with_text']}{attributes})")
+
+
+#---------------------------------------------------------------------------#
+#------------------------ Flatten the record elements ----------------------#
+#---------------------------------------------------------------------------#
+
+def _add_value(row, column, value):
+    row[column] = f"{row[column]} | {value}" if column in row else value # A repeated child: its values are joined
+
+
+def _flatten_record(record):
+    '''
+    One record element as a flat dictionary: its attributes as "@name", the text of its descendants by their relative path
+    ("name", "address/city") and their attributes as "path@name". Walked with a stack, so a deep record needs no recursion.
+    '''
+    row = {f"@{_local_name(name)}": value for name, value in record.attrib.items()}
+    stack = [(child, _local_name(child.tag)) for child in reversed(record)]
+
+    while len(stack) > 0:
+        element, path = stack.pop()
+
+        text = (element.text or "").strip()
+        if text != "":
+            _add_value(row, path, text)
+        for name, value in element.attrib.items():
+            _add_value(row, f"{path}@{_local_name(name)}", value)
+
+        stack.extend((child, f"{path}/{_local_name(child.tag)}") for child in reversed(element))
+
+    return row
+
+
+def iter_xml_records(file_path, record_tag):
+    '''
+    Generator of the elements named record_tag (e.g. "food"), each as a flat dictionary (see _flatten_record()).
+    A record_tag element inside another one is flattened into the outer record.
+    '''
+    record_path = None # The path of the record being read
+
+    for event, path, element, parent in _iter_events(file_path):
+        if event == "start":
+            if (record_path is None) and (_local_name(element.tag) == record_tag):
+                record_path = path
+            continue
+
+        if path == record_path:
+            yield _flatten_record(element)
+            record_path = None
+            _release(element, parent)
+
+        elif record_path is None: # Outside of the records (their children are released with them)
+            _release(element, parent)
+
+
+def xml_record_columns(file_path, record_tag):
+    # All columns of the records, in the order they first appear (one more streaming pass, only the column names are kept)
+    columns = {}
+    for row in iter_xml_records(file_path, record_tag):
+        columns.update(dict.fromkeys(row))
+
+    return list(columns)
+
+
+def iter_xml_chunks(file_path, record_tag, chunk_size=10_000, columns=None):
+    '''
+    Generator of columnar chunks {column: [values]} of at most chunk_size records (None for a missing value).
+    If the columns are not given, they are found by a first streaming pass over the file.
+    '''
+    columns = columns or xml_record_columns(file_path, record_tag)
+    records = iter_xml_records(file_path, record_tag)
+
+    while len(rows := list(islice(records, chunk_size))) > 0:
+        yield {column: [row.get(column) for row in rows] for column in columns}
+
+
+def xml_to_csv(file_path, record_tag, csv_path, columns=None):
+    '''
+    Write the records straight to a .csv file, one row per record, and return the number of rows.
+    If the columns are not given, they are found by a first streaming pass over the file (the other values are ignored).
+    '''
+    columns = columns or xml_record_columns(file_path, record_tag)
+    n_rows = 0
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as csv_pointer:
+        writer = csv.DictWriter(csv_pointer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+
+        for row in iter_xml_records(file_path, record_tag):
+            writer.writerow(row)
+            n_rows += 1
+
+    return n_rows
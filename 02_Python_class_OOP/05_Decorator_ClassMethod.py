@@ -27,7 +27,9 @@ print(Employee.demo_class_method()) # Execute a class method
                                     # This is a demo class method of the class Item
                                     # None (this is because we did not define the return value for the demo method)
 
-csv_path = "/home/longdpt/Documents/Academic/DataScience_MachineLearning_Python_SQL/01_Python_Basic/class_OOP/class_method_employees.csv"
+from pathlib import Path
+
+csv_path = Path(__file__).parent / "class_method_employees.csv" # The .csv file next to this lesson
 
 lst_employees = Employee.construct_from_csv(file_path=csv_path)
 print(lst_employees)
@@ -35,4 +37,23 @@ print(lst_employees)
 # {'Name': 'Bob', 'Age': '25', 'City': 'Los Angeles'}
 # {'Name': 'Charlie', 'Age': '35', 'City': 'Chicago'}
 
+### For a LARGE .csv file (millions of rows), list(reader) keeps every row as a dictionary in memory at once
+### A bulk class method can stream the file chunk by chunk and convert whole columns at once instead,
+### like Item.construct_from_csv() in item.py, which fills the columnar Item.store without creating one object per row
+
+### NOTE: Item.construct_from_csv() returns a tuple (rows, bad_rows), NOT the list of dictionaries of list(reader) above:
+###       rows = the rows of the loaded items in the store, bad_rows = [(line number, error message), ...] of the skipped rows
+
+from item import Item, ItemStore
+
+inventory_path = Path(__file__).parent / "inventory.csv" # Sample file next to this lesson, columns: name, price, quantity
+
+inventory_store = ItemStore()
+rows, bad_rows = Item.construct_from_csv(file_path=inventory_path, chunk_size=10_000, store=inventory_store)
+
+print(len(inventory_store)) # 5 (the number of valid items)
+print(inventory_store.total_price()) # 3720.0 (sum of price * quantity of all items, computed at once)
+print(bad_rows) # [(6, 'Price must be greater than zero'), (7, "Quantity must be a number, got 'two'")]
+print(inventory_store.items(Item)[:2]) # [Item(Phone, 100.0, 1), Item(Laptop, 1000.0, 3)] (the prices of a .csv file are read as float)
+
 ### NOT RECOMMEND: class methods can be called from an instance, but should not do so
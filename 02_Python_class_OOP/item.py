@@ -1,33 +1,374 @@
 # Create the Item class in a separate file named item.py
 
 import csv
+import itertools
+import numbers
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+
+class ItemStore:
+    '''
+    Keep the name, price and quantity of many items in columns (typed NumPy arrays),
+    instead of one full object (with its own __dict__) per item.
+
+    Each item only costs a few bytes plus its name, and the total price or a discount
+    is computed for the whole store at once.
+
+    Prices and quantities are kept in float64 columns, with a flag telling if the value was an int,
+    so Item("x", 100, 3) still reads back 100 and 3, and Item("x", 1.5, 2.7) keeps its quantity 2.7
+    (ints are exact up to 2**53).
+
+    The store keeps a strong reference to each Item by default, like the old Item.all_items list: all_items lists
+    every item ever created, in creation order. With weak_registry=True, it only keeps weak references:
+    the row of an Item is released (and later reused) when the Item object is garbage collected, so an
+    Item(...) not assigned to a variable drops out of all_items.
+
+    Why Item.store is NOT weak by default: the existing Item API promises that Item.all_items lists every item created,
+    and code written for the old list (Item("Phone", 100, 1) without keeping the object, then Item.all_items)
+    would silently lose its items. The memory is released explicitly instead: the items of a "with Item.scoped_store():"
+    block go to their own weak store, dropped after the block, and Item.store = ItemStore(weak_registry=True)
+    makes the whole class weak. Even with strong references, an item only costs its row plus a small __slots__ view.
+    '''
+
+    COLUMNS = ["prices", "quantities", "price_is_int", "quantity_is_int", "alive", "created", "generations"]
+
+    def __init__(self, capacity: int = 1024, weak_registry: bool = False):
+        self.names = []
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.quantities = np.zeros(capacity, dtype=np.float64)
+        self.price_is_int = np.zeros(capacity, dtype=bool)
+        self.quantity_is_int = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.created = np.zeros(capacity, dtype=np.int64) # Creation order of the item in each row (rows are reused)
+        self.generations = np.zeros(capacity, dtype=np.int64) # Incremented when a row is released, to detect stale views
+        self.weak_registry = weak_registry
+        self._size = 0 # Number of rows used so far (alive or free)
+        self._n_created = 0
+        self._free_rows = []
+        self._owners = {} # row -> the Item object owning this row (a weak reference with weak_registry=True)
+
+    def __len__(self):
+        return self._size - len(self._free_rows)
+
+    def _reserve(self, n_rows: int): # Grow the columns (doubling) to fit n_rows more rows
+        capacity = len(self.prices)
+        if self._size + n_rows <= capacity:
+            return None
+
+        capacity = max(2 * capacity, self._size + n_rows)
+        for column in self.COLUMNS:
+            old_values = getattr(self, column)
+            new_values = np.zeros(capacity, dtype=old_values.dtype)
+            new_values[:self._size] = old_values[:self._size]
+            setattr(self, column, new_values)
+
+    def set_price(self, row: int, price: float):
+        self.prices[row] = price
+        self.price_is_int[row] = isinstance(price, numbers.Integral)
+
+    def set_quantity(self, row: int, quantity: int):
+        self.quantities[row] = quantity
+        self.quantity_is_int[row] = isinstance(quantity, numbers.Integral)
+
+    def get_price(self, row: int):
+        return int(self.prices[row]) if self.price_is_int[row] else float(self.prices[row])
+
+    def get_quantity(self, row: int):
+        return int(self.quantities[row]) if self.quantity_is_int[row] else float(self.quantities[row])
+
+    def add(self, name: str, price: float, quantity: int): # One row, already validated by Item.__init__()
+        if len(self._free_rows) > 0:
+            row = self._free_rows.pop()
+            self.names[row] = name
+        else:
+            self._reserve(1)
+            row = self._size
+            self._size += 1
+            self.names.append(name)
+
+        self.set_price(row, price)
+        self.set_quantity(row, quantity)
+        self.alive[row] = True
+        self.created[row] = self._n_created
+        self._n_created += 1
+
+        return row
+
+    def extend(self, names, prices, quantities, price_is_int=None, quantity_is_int=None):
+        '''
+        Add many items at once, validated like Item.__init__() but for the whole columns.
+        A column of integers (int dtype) reads back as int, any other column as float,
+        unless price_is_int / quantity_is_int give the flag of each row.
+        Return the rows of the new items.
+        '''
+        names = list(names)
+        prices = np.asarray(prices)
+        quantities = np.asarray(quantities)
+
+        assert all(map(isinstance, names, itertools.repeat(str))), "Name must be a string"
+        assert (prices >= 0).all(), "Price must be greater than zero"
+        assert (quantities >= 0).all(), "Quantity must be greater than or equal to zero"
+
+        self._reserve(len(names))
+        rows = np.arange(self._size, self._size + len(names))
+        self.prices[rows] = prices
+        self.quantities[rows] = quantities
+        self.price_is_int[rows] = prices.dtype.kind in "iu" if price_is_int is None else price_is_int
+        self.quantity_is_int[rows] = quantities.dtype.kind in "iu" if quantity_is_int is None else quantity_is_int
+        self.alive[rows] = True
+        self.created[rows] = np.arange(self._n_created, self._n_created + len(names))
+        self._n_created += len(names)
+        self.names.extend(names)
+        self._size += len(names)
+
+        return rows
+
+    def remove(self, row: int):
+        self.names[row] = None # Release the name string
+        self.prices[row] = 0.0 # So the free rows never count in total_price()
+        self.quantities[row] = 0
+        self.alive[row] = False
+        self.generations[row] += 1 # The views still pointing to this row become stale
+        self._owners.pop(row, None)
+        self._free_rows.append(row)
+
+    def register(self, row: int, item):
+        if self.weak_registry: # The row is released when the Item object is garbage collected
+            self._owners[row] = weakref.ref(item, lambda _, row=row: self.remove(row))
+        else:
+            self._owners[row] = item
+
+    def items(self, item_class):
+        # The registered Item objects, and a new item_class view for the rows added in bulk, in creation order
+        rows = np.flatnonzero(self.alive[:self._size])
+        items = []
+        for row in rows[np.argsort(self.created[rows], kind="stable")].tolist():
+            owner = self._owners.get(row)
+            if owner is None: # Added in bulk
+                items.append(item_class._from_row(self, row))
+                continue
+
+            item = owner() if self.weak_registry else owner
+            if item is not None: # Else garbage collected, its row is being released
+                items.append(item)
+
+        return items
+
+    def total_prices(self): # price * quantity of every row, computed at once
+        return self.prices[:self._size] * self.quantities[:self._size]
+
+    def total_price(self): # Sum of price * quantity of all items
+        return float(self.total_prices().sum())
+
+    def apply_discount(self, rate: float, rows=None): # Discount the prices of all items (or only the given rows) at once
+        assert 0 <= rate <= 1, "Discount rate must be between 0 and 1"
+
+        if rows is None:
+            self.prices[:self._size] *= 1 - rate
+            self.price_is_int[:self._size] = False
+        else:
+            self.prices[rows] *= 1 - rate
+            self.price_is_int[rows] = False
+
+
+class _StoreItems: # Item.all_items: a list of the items of Item.store, built when it is accessed
+    def __get__(self, instance, owner):
+        return owner.store.items(Item)
+
 
 class Item:
 
-    all_items = []
+    __slots__ = ("_store", "_row", "_generation", "__weakref__") # No __dict__: an Item object is only a view on one row of Item.store
+
+    store = ItemStore() # Name, price and quantity of all items, in columns (strong registry, see ItemStore for why)
+    all_items = _StoreItems() # All the items, in creation order (see ItemStore for the weak_registry option)
 
     def __init__(self, name: str, price: float, quantity: int):
         assert isinstance(name, str), "Name must be a string"
         assert price >= 0, "Price must be greater than zero"
         assert quantity >= 0, "Quantity must be greater than or equal to zero"
 
-        self.name = name          
-        self.price = price        
-        self.quantity = quantity
+        self._store = Item.store
+        self._row = self._store.add(name, price, quantity)
+        self._generation = int(self._store.generations[self._row])
+        self._store.register(self._row, self)
+
+    @classmethod
+    def _from_row(cls, store: ItemStore, row: int): # A view on an existing row, which does not own it
+        item = cls.__new__(cls)
+        item._store = store
+        item._row = row
+        item._generation = int(store.generations[row])
+        return item
+
+    @classmethod
+    @contextmanager
+    def scoped_store(cls, store: ItemStore = None):
+        # The items created inside the "with" block go to their own store (weak: released with them after the block)
+        previous_store = Item.store
+        Item.store = ItemStore(weak_registry=True) if store is None else store
+        try:
+            yield Item.store
+        finally:
+            Item.store = previous_store
+
+    def _live_row(self): # The row of this item, unless it has been released (and maybe reused by another item) since
+        if self._store.generations[self._row] != self._generation:
+            raise ReferenceError(f"Row {self._row} of the store has been removed, this item no longer exists")
+        return self._row
+
+    @property
+    def name(self):
+        return self._store.names[self._live_row()]
+
+    @name.setter
+    def name(self, name: str):
+        self._store.names[self._live_row()] = name
+
+    @property
+    def price(self):
+        return self._store.get_price(self._live_row())
+
+    @price.setter
+    def price(self, price: float):
+        self._store.set_price(self._live_row(), price)
+
+    @property
+    def quantity(self):
+        return self._store.get_quantity(self._live_row())
 
-        Item.all_items.append(self)
+    @quantity.setter
+    def quantity(self, quantity: int):
+        self._store.set_quantity(self._live_row(), quantity)
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.name}, {self.price}, {self.quantity})"
         # Use self.__class__.name__ to get the class name dynamically
-      
+
     def calculate_total_price(self):
         return self.price * self.quantity
-    
+
     @classmethod
-    def construct_from_csv(cls, file_path: str): #A function to construct an instance of the class from a .csv file
-        with open(file_path, 'r') as f:
-            reader = csv.DictReader(f) # Read .csv file as a dictionary
-            items = list(reader)
+    def construct_from_csv(cls, file_path: str, chunk_size: int = 10_000, store: ItemStore = None): #A function to construct the items from a .csv file
+        '''
+        Load the items of a .csv file having the "name", "price" and "quantity" columns straight into the store (Item.store by default),
+        without creating one Item object per row.
+
+        The file is streamed chunk_size rows at a time, so the memory for reading stays the same whatever the size of the file.
+        The price and quantity columns of a chunk are converted to numbers at once, then validated like __init__().
+        The prices read back as float, the quantities as int ("2") or float ("2.0", "2.7") like Item(..., quantity=2.7).
+        The bad rows are skipped and reported with their line number in the file.
+
+        Return (rows, bad_rows): the rows of the loaded items in the store, and a list of (line number, error message).
+        NOTE: it used to return the list of the rows as dictionaries (list(csv.DictReader(f))), callers of the old version must be updated.
+        '''
+        store = Item.store if store is None else store
+        loaded_rows, bad_rows = [], []
+
+        with open(file_path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = [column.strip().lower() for column in next(reader, [])]
+
+            missing_columns = [column for column in ["name", "price", "quantity"] if column not in header]
+            if len(missing_columns) > 0:
+                raise ValueError(f"{file_path} has no column named {', '.join(missing_columns)}")
+
+            name_idx, price_idx, quantity_idx = header.index("name"), header.index("price"), header.index("quantity")
+
+            line_num = reader.line_num # The line of the header
+            while True:
+                rows = list(itertools.islice(reader, chunk_size)) # Parsed in C, no Python code per row
+                if len(rows) == 0: # End of the file
+                    break
+
+                line_numbers = Item._csv_line_numbers(rows, line_num, reader.line_num)
+                line_num = reader.line_num
+
+                if set(map(len, rows)) != {len(header)}: # Slow path, only for a chunk having blank or incomplete rows
+                    complete = [len(row) == len(header) for row in rows]
+                    bad_rows.extend(
+                        (line_number, f"Expected {len(header)} fields, got {len(row)}")
+                        for row, line_number, is_complete in zip(rows, line_numbers.tolist(), complete)
+                        if (not is_complete) and (len(row) > 0) # Blank lines are skipped, like csv.DictReader does
+                    )
+                    rows = [row for row, is_complete in zip(rows, complete) if is_complete]
+                    line_numbers = line_numbers[np.array(complete, dtype=bool)]
+
+                    if len(rows) == 0:
+                        continue
+
+                columns = list(zip(*rows))
+                valid, prices, quantities, quantity_is_int = cls._convert_csv_columns(columns[price_idx], columns[quantity_idx], line_numbers, bad_rows)
+
+                names = columns[name_idx] if valid.all() else itertools.compress(columns[name_idx], valid.tolist())
+                loaded_rows.append(store.extend(names, prices[valid], quantities[valid], quantity_is_int=quantity_is_int[valid]))
+
+        bad_rows.sort()
+        rows = np.concatenate(loaded_rows) if len(loaded_rows) > 0 else np.array([], dtype=np.int64)
+
+        return rows, bad_rows
+
+    @staticmethod
+    def _csv_line_numbers(rows, first_line, last_line): # The line number in the file where each row ends
+        if last_line - first_line == len(rows): # One line per row, the usual case
+            return np.arange(first_line + 1, last_line + 1)
+
+        # Some quoted fields span several lines, each of their newlines adds one line
+        return first_line + np.cumsum([1 + sum(field.count("\n") for field in row) for row in rows])
+
+    @staticmethod
+    def _convert_csv_columns(prices, quantities, line_numbers, bad_rows): # Convert and validate one chunk, record the bad rows
+        prices, price_converted = Item._convert_csv_column(prices, np.float64, float, "Price", line_numbers, bad_rows)
+        quantities, quantity_converted, quantity_is_int = Item._convert_csv_quantities(quantities, line_numbers, bad_rows)
+
+        # The same rules as the assertions of __init__(), for the whole chunk at once (NaN fails ">= 0" too)
+        valid = price_converted & quantity_converted
+        for message, is_bad in [
+            ("Price must be greater than zero", valid & ~(prices >= 0)),
+            ("Quantity must be greater than or equal to zero", valid & ~(quantities >= 0))
+        ]:
+            bad_rows.extend((int(line_numbers[idx]), message) for idx in np.flatnonzero(is_bad).tolist())
+            valid &= ~is_bad
+
+        return valid, prices, quantities, quantity_is_int
+
+    @staticmethod
+    def _convert_csv_quantities(texts, line_numbers, bad_rows): # float64 values plus an is-int flag per row, like ItemStore keeps them
+        try: # Usually a column of whole numbers only
+            quantities = np.fromiter(map(int, texts), dtype=np.int64, count=len(texts))
+            return quantities.astype(np.float64), np.ones(len(texts), dtype=bool), np.ones(len(texts), dtype=bool)
+        except (ValueError, OverflowError): # Some floats ("2.7") or bad values, the flag is found row by row (slow path, only for this chunk)
+            pass
+
+        quantities, converted = Item._convert_csv_column(texts, np.float64, float, "Quantity", line_numbers, bad_rows)
+        is_int = np.zeros(len(texts), dtype=bool)
+
+        for idx, text in enumerate(texts):
+            try:
+                int(text)
+                is_int[idx] = True
+            except ValueError:
+                pass
+
+        return quantities, converted, is_int & converted
+
+    @staticmethod
+    def _convert_csv_column(texts, dtype, convert, column, line_numbers, bad_rows): # Return the values and the mask of the converted ones
+        try:
+            return np.fromiter(map(convert, texts), dtype=dtype, count=len(texts)), np.ones(len(texts), dtype=bool)
+        except (ValueError, OverflowError): # At least one value is not a number, find which ones (slow path, only for this chunk)
+            pass
+
+        values = np.zeros(len(texts), dtype=dtype)
+        converted = np.zeros(len(texts), dtype=bool)
+
+        for idx, (text, line_number) in enumerate(zip(texts, line_numbers.tolist())):
+            try:
+                values[idx] = convert(text)
+                converted[idx] = True
+            except (ValueError, OverflowError):
+                bad_rows.append((line_number, f"{column} must be a number, got {text!r}"))
 
-        return items
\ No newline at end of file
+        return values, converted
\ No newline at end of file
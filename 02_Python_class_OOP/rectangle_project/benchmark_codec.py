@@ -0,0 +1,95 @@
+'''
+Benchmark of the JSON codec (RectangleCodec) against the original decoding path of the rectangle_module.py
+
+The original path parses with json.load(...).values(), then validates each value with a regex on str(value).
+The codec decodes with orjson or msgspec (if installed) and validates the floats and integers without the str() round trip.
+
+The records of a generated dataset are decoded from memory, so only the decoding and the validation are measured.
+It exits with an error if a codec does not give exactly the same (length, width) as the original path for every record.
+
+Usage (must be in 02_Python_class_OOP/rectangle_project first):
+    python benchmark_codec.py
+    python benchmark_codec.py --count 1000000 --corruption-rate 0.05 --repeat 5
+'''
+
+from argparse import ArgumentParser
+import json, math, random, re, sys, time
+
+from data.data_generator import generate_rectangle
+from rectangle_module import RectangleCodec
+
+
+def original_decode(content):
+    '''
+    The decoding path of the rectangle_module.py before the codec: json, then a regex on str() of each value.
+    '''
+    length, width = json.loads(content).values()
+    numbers = []
+
+    for number in [length, width]:
+        numbers.append(float(number) if re.match(r"^\+?\d+\.?\d*$", str(number)) else None)
+
+    return tuple(numbers)
+
+
+def same_numbers(numbers, other_numbers):
+    for number, other_number in zip(numbers, other_numbers):
+        if (number is None) != (other_number is None):
+            return False
+
+        if (number is not None) and ((number != other_number) or (math.copysign(1.0, number) != math.copysign(1.0, other_number))):
+            return False
+
+    return True
+
+
+def measure(decode, contents, repeat):
+    best_time = math.inf
+
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = [decode(content) for content in contents]
+        best_time = min(best_time, time.perf_counter() - t0)
+
+    return best_time, results
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the JSON codec against the original decoding path.")
+    parser.add_argument("--count", type=int, default=200_000, help="Number of rectangle records.")
+    parser.add_argument("--corruption-rate", type=float, default=0.1, help="The fraction of corrupted records.")
+    parser.add_argument("--repeat", type=int, default=3, help="Each path is run this many times, the best time is kept.")
+    parser.add_argument("--seed", type=int, default=2025, help="Seed of the record generator.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    contents = [
+        json.dumps(generate_rectangle(rng, rng.random() < args.corruption_rate), indent=4).encode() # Like the input JSON files
+        for _ in range(args.count)
+    ]
+
+    original_time, original_results = measure(original_decode, contents, args.repeat)
+    print(f"{'original (json + regex)':>26} | {original_time:8.3f} s | {args.count / original_time:12.0f} records/s")
+
+    failed = False
+    for backend in RectangleCodec.BACKENDS:
+        codec = RectangleCodec(backend)
+
+        if codec.backend != backend: # Not installed, already measured as another backend
+            print(f"{backend:>26} | not installed")
+            continue
+
+        codec_time, codec_results = measure(codec.decode, contents, args.repeat)
+        print(f"{'codec ' + backend:>26} | {codec_time:8.3f} s | {args.count / codec_time:12.0f} records/s | {original_time / codec_time:5.2f}x")
+
+        mismatches = sum(1 for numbers, other_numbers in zip(original_results, codec_results) if not same_numbers(numbers, other_numbers))
+        if mismatches > 0:
+            print(f"MISMATCH: the {backend} codec gives other results than the original path for {mismatches} records")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
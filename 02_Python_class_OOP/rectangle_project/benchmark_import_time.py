@@ -0,0 +1,126 @@
+'''
+Import-time budget check for the rectangle_module.py
+
+Services import rectangle_module and call process_paths() per request, so the import must stay cheap:
+loguru, termcolor, numpy, shutil, multiprocessing and argparse are only imported when they are used.
+
+This script imports rectangle_module in fresh interpreters (with the bytecode already cached, like in production),
+reads the import times from "python -X importtime", and compares, in the same run:
+    + the baseline: the standard modules imported at the top of rectangle_module (pathlib, json, re, ...),
+      which any code using them pays for, and whose cost depends on the machine
+    + the own cost of rectangle_module: its import once these standard modules are already imported
+The interpreters run with -S, so the modules imported by site (the .pth files of the environment) change nothing.
+It exits with an error if the median own cost exceeds --budget-ratio times the median baseline
+(or if the total exceeds --budget-ms, when given), or if one of the deferred modules is imported too early.
+
+Usage (must be in 02_Python_class_OOP/rectangle_project first):
+    python benchmark_import_time.py
+    python benchmark_import_time.py --runs 20 --budget-ratio 0.1 --budget-ms 40
+'''
+
+from argparse import ArgumentParser
+from pathlib import Path
+import ast, os, statistics, subprocess, sys, tempfile
+
+
+PROJECT_DIR = Path(__file__).parent
+DEFERRED_MODULES = ["loguru", "termcolor", "numpy", "multiprocessing", "argparse"] # shutil is often imported by site already
+
+
+def eager_imports():
+    # The modules imported at the top level of rectangle_module.py (not the ones imported inside functions)
+    tree = ast.parse((PROJECT_DIR / "rectangle_module.py").read_text(encoding="utf-8"))
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names.append(node.module)
+
+    return list(dict.fromkeys(names))
+
+
+def run_importtime(code, pycache_dir):
+    # Run code in a new interpreter (-S: without site) and return ([(cumulative ms, depth, module name), ...], stdout)
+    environment = {**os.environ, "PYTHONPYCACHEPREFIX": str(pycache_dir)} # Cache the bytecode outside of the repository
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    completed = subprocess.run(
+        [sys.executable, "-S", "-X", "importtime", "-c", code],
+        cwd=PROJECT_DIR, env=environment, capture_output=True, text=True, check=True
+    )
+
+    # Each line of -X importtime: "import time: self [us] | cumulative | imported package" (indented by depth)
+    imports = []
+    for line in completed.stderr.splitlines():
+        fields = line.split("|")
+        if (len(fields) == 3) and fields[1].strip().isdigit():
+            name = fields[2].rstrip()
+            imports.append((int(fields[1]) / 1000, len(name) - len(name.lstrip()) - 1, name.strip()))
+
+    return imports, completed.stdout
+
+
+def measure_import(pycache_dir, standard_modules):
+    '''
+    Return (baseline ms, own ms, deferred modules imported anyway), each from a new interpreter:
+    the cumulative import time of the standard modules, then the one of rectangle_module once they are imported.
+    '''
+    imports, _ = run_importtime(f"import {', '.join(standard_modules)}", pycache_dir)
+    baseline_ms = sum(cumulative_ms for cumulative_ms, depth, _ in imports if depth == 0)
+
+    code = (
+        f"import {', '.join(standard_modules)}\n"
+        "import rectangle_module\n"
+        f"print(','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+    )
+    imports, stdout = run_importtime(code, pycache_dir)
+    own_ms = next((cumulative_ms for cumulative_ms, depth, name in imports if name == "rectangle_module"), None)
+    if own_ms is None:
+        raise RuntimeError("rectangle_module was not found in the output of -X importtime")
+
+    imported_early = [name for name in stdout.strip().split(",") if name != ""]
+
+    return baseline_ms, own_ms, imported_early
+
+
+def main():
+    parser = ArgumentParser(description="Check that importing rectangle_module stays within a time budget.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters to import rectangle_module in.")
+    parser.add_argument("--budget-ratio", type=float, default=0.25, help="Allowed median own import time, as a fraction of the median import time of its standard modules.")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Allowed median total import time (standard modules + own), in milliseconds (not checked by default).")
+    args = parser.parse_args()
+
+    standard_modules = eager_imports()
+    with tempfile.TemporaryDirectory() as pycache_dir:
+        measure_import(pycache_dir, standard_modules) # Warm-up run, which compiles and caches the bytecode
+        measurements = [measure_import(pycache_dir, standard_modules) for _ in range(args.runs)]
+
+    baseline_ms = statistics.median(baseline for baseline, _, _ in measurements)
+    own_times = [own for _, own, _ in measurements]
+    own_ms = statistics.median(own_times)
+    imported_early = sorted({name for _, _, names in measurements for name in names})
+
+    print(f"import {', '.join(standard_modules)}: median {baseline_ms:.2f} ms (baseline)")
+    print(f"import rectangle_module (own cost): median {own_ms:.2f} ms, min {min(own_times):.2f} ms, max {max(own_times):.2f} ms over {args.runs} runs"
+          f" = {own_ms / baseline_ms:.2f} x the baseline | total {baseline_ms + own_ms:.2f} ms")
+
+    failed = False
+    if len(imported_early) > 0:
+        print(f"REGRESSION: these modules should only be imported when they are used: {', '.join(imported_early)}")
+        failed = True
+
+    if own_ms > args.budget_ratio * baseline_ms:
+        print(f"REGRESSION: the own import time exceeds the budget of {args.budget_ratio} x the baseline ({args.budget_ratio * baseline_ms:.2f} ms)")
+        failed = True
+
+    if (args.budget_ms is not None) and (baseline_ms + own_ms > args.budget_ms):
+        print(f"REGRESSION: the total import time exceeds the budget of {args.budget_ms} ms")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+'''
+Regression benchmark for the output path handling of the rectangle_module.py
+
+In a multiple-files run, the output directory is validated once, then every result path is only a join.
+So the setup of the output directory and the cost of handling one input file must both stay FLAT,
+no matter how many files the output directory already has.
+
+This script fills an output directory with 1k, 10k, 100k (or more) result files, then measures the setup
+(the validation of the output directory, in incremental mode so the files are kept) and the time of processing
+the same input files against it.
+It exits with an error if the setup time or the time per file grows more than --max-ratio times from the smallest
+to the largest size (the setup times are compared from --setup-floor-ms, below which they are only noise).
+
+NOTE: without --incremental, a run clears the output directory first: walking it and deleting its files
+      is linear in its size by design, once per run. The incremental mode keeps the files and never walks it here.
+
+Usage (must be in 02_Python_class_OOP/rectangle_project first):
+    python benchmark_output_paths.py
+    python benchmark_output_paths.py --sizes 1000 10000 100000 1000000
+
+Measured with --sizes 1000 10000 100000 1000000:
+          1000 files in output | setup:     0.096 ms | per input file:    764.04 us
+         10000 files in output | setup:     0.067 ms | per input file:    248.18 us
+        100000 files in output | setup:     0.057 ms | per input file:    434.06 us
+       1000000 files in output | setup:     0.058 ms | per input file:    258.88 us
+'''
+
+from argparse import ArgumentParser
+from pathlib import Path
+import json, sys, tempfile, time
+
+from loguru import logger
+from rectangle_module import RectangleCalculator
+
+
+def prepare_inputs(input_dir, n_inputs):
+    input_dir.mkdir(parents=True, exist_ok=True)
+
+    for idx in range(1, n_inputs + 1):
+        with open(input_dir.joinpath(f"rectangle_{idx}.json"), "w") as json_pointer:
+            json.dump({"length": idx + 0.5, "width": idx + 1.5}, json_pointer)
+
+    return [f"rectangle_{idx}.json" for idx in range(1, n_inputs + 1)]
+
+
+def fill_output_directory(output_dir, n_outputs):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    existing = sum(1 for _ in output_dir.iterdir())
+
+    for idx in range(existing, n_outputs): # Grow the same directory from one size to the next
+        output_dir.joinpath(f"old_result_{idx}.json").touch()
+
+
+def measure_per_file(input_dir, output_dir, input_json_files, n_json_files):
+    calculator = RectangleCalculator()
+    calculator._input = input_dir
+    calculator._output = output_dir
+    calculator._json_count = n_json_files
+    calculator._incremental = True # Keep the existing files, which is the costly case for the validation
+
+    t0 = time.perf_counter()
+    calculator._RectangleCalculator__validate_output_directory()
+    setup_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for json_rectangle_file in input_json_files:
+        calculator._single_workflow(json_rectangle_file)
+    per_file_time = (time.perf_counter() - t0) / len(input_json_files)
+
+    return setup_time, per_file_time
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the output path handling against large output directories.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000], help="Numbers of files already in the output directory.")
+    parser.add_argument("--inputs", type=int, default=500, help="Number of input files processed at each size.")
+    parser.add_argument("--max-ratio", type=float, default=3.0, help="Allowed growth of the setup time and of the time per file from the smallest to the largest size.")
+    parser.add_argument("--setup-floor-ms", type=float, default=1.0, help="Setup times below this are compared as this value (timer noise).")
+    args = parser.parse_args()
+
+    logger.remove() # Only the benchmark report is printed
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir).joinpath("data")
+        output_dir = Path(temp_dir).joinpath("result")
+        input_json_files = prepare_inputs(input_dir, args.inputs)
+
+        report = []
+        for size in sorted(args.sizes):
+            fill_output_directory(output_dir, size)
+            setup_time, per_file_time = measure_per_file(input_dir, output_dir, input_json_files, size)
+            report.append({"output_files": size, "setup_seconds": setup_time, "per_file_microseconds": per_file_time * 1e6})
+            print(f"{size:>10} files in output | setup: {setup_time * 1e3:9.3f} ms | per input file: {per_file_time * 1e6:9.2f} us")
+
+    floor = args.setup_floor_ms / 1e3
+    setup_ratio = max(report[-1]["setup_seconds"], floor) / max(report[0]["setup_seconds"], floor)
+    ratio = report[-1]["per_file_microseconds"] / report[0]["per_file_microseconds"]
+    print(f"\nSetup grows {setup_ratio:.2f}x, time per file grows {ratio:.2f}x from {report[0]['output_files']} to {report[-1]['output_files']} output files")
+
+    failed = False
+    if setup_ratio > args.max_ratio:
+        print(f"REGRESSION: the setup of the output directory should stay flat (allowed up to {args.max_ratio}x)")
+        failed = True
+    if ratio > args.max_ratio:
+        print(f"REGRESSION: the time per file should stay flat (allowed up to {args.max_ratio}x)")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
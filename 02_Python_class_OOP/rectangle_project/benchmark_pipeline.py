@@ -0,0 +1,107 @@
+'''
+Benchmark of the threaded I/O pipeline (--read-threads / --write-threads) on high-latency storage
+
+A network filesystem is simulated by a delay shim: every open() of the rectangle_module.py sleeps --delay-ms first.
+The same dataset is then calculated by the CPU cores (each one opening its own files, one at a time)
+and by the pipeline (reader threads -> batched calculation -> writer threads), and the results are compared file by file.
+
+It exits with an error if the results differ, or if the pipeline is not at least --min-speedup times faster.
+
+Usage (must be in 02_Python_class_OOP/rectangle_project first):
+    python benchmark_pipeline.py
+    python benchmark_pipeline.py --files 5000 --delay-ms 10 --cores 4 --threads 8 32 64
+'''
+
+from argparse import ArgumentParser
+from pathlib import Path
+import builtins, filecmp, multiprocessing, sys, tempfile, time
+
+from loguru import logger
+from data.data_generator import generate_dataset
+import rectangle_module
+from rectangle_module import RectangleCalculator
+
+
+def install_delay_shim(delay_seconds):
+    '''
+    Make every open() of the rectangle_module.py wait delay_seconds, like the round trip of a network filesystem.
+    The module global shadows the builtin, and the forked CPU cores inherit it.
+    '''
+    def delayed_open(*args, **kwargs):
+        time.sleep(delay_seconds)
+        return builtins.open(*args, **kwargs)
+
+    rectangle_module.open = delayed_open
+
+
+def run_directory(input_dir, output_dir, cores, threads):
+    calculator = RectangleCalculator()
+    calculator._input = input_dir
+    calculator._output = output_dir
+    calculator._cores = cores
+    calculator._read_threads = threads
+    calculator._write_threads = threads
+    calculator._quiet = True
+
+    input_json_files = [entry.name for entry in input_dir.glob("*.json")]
+    calculator._json_count = len(input_json_files)
+    calculator._RectangleCalculator__validate_output_directory()
+
+    t0 = time.perf_counter()
+    run_summary = getattr(rectangle_module, "__run_multiple_files")(calculator, input_json_files)
+
+    return time.perf_counter() - t0, run_summary
+
+
+def same_results(output_dir, other_output_dir):
+    comparison = filecmp.dircmp(output_dir, other_output_dir)
+    _, mismatch, errors = filecmp.cmpfiles(output_dir, other_output_dir, comparison.common_files, shallow=False)
+
+    return (len(comparison.left_only) == 0) and (len(comparison.right_only) == 0) and (len(mismatch) == 0) and (len(errors) == 0)
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the threaded I/O pipeline against the CPU cores on simulated high-latency storage.")
+    parser.add_argument("--files", type=int, default=2000, help="Number of rectangle JSON files.")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="Artificial latency of every open(), in milliseconds.")
+    parser.add_argument("--cores", type=int, default=2, help="Number of CPU cores of the baseline run.")
+    parser.add_argument("--threads", nargs="+", type=int, default=[8, 32], help="Numbers of reader (and writer) threads of the pipeline runs.")
+    parser.add_argument("--min-speedup", type=float, default=2.0, help="The best pipeline run must be at least this many times faster than the baseline.")
+    args = parser.parse_args()
+
+    logger.remove() # Only the benchmark report is printed
+    multiprocessing.set_start_method("fork", force=True) # The CPU cores must inherit the delay shim
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir).joinpath("data")
+        generate_dataset(input_dir, args.files, corruption_rate=0.1, file_format="json", seed=2025)
+        install_delay_shim(args.delay_ms / 1000)
+
+        baseline_dir = Path(temp_dir).joinpath("result_cores")
+        baseline_time, baseline_summary = run_directory(input_dir, baseline_dir, args.cores, 0)
+        print(f"{'CPU cores':>18} | {args.cores:>3} | {baseline_time:8.3f} s | {args.files / baseline_time:10.0f} files/s | {baseline_summary['saved']} saved")
+
+        failed = False
+        best_speedup = 0.0
+        for threads in args.threads:
+            pipeline_dir = Path(temp_dir).joinpath(f"result_pipeline_{threads}")
+            pipeline_time, pipeline_summary = run_directory(input_dir, pipeline_dir, args.cores, threads)
+            speedup = baseline_time / pipeline_time
+            best_speedup = max(best_speedup, speedup)
+
+            print(f"{'pipeline threads':>18} | {threads:>3} | {pipeline_time:8.3f} s | {args.files / pipeline_time:10.0f} files/s | {pipeline_summary['saved']} saved | {speedup:5.2f}x")
+
+            if not same_results(baseline_dir, pipeline_dir):
+                print(f"MISMATCH: the pipeline with {threads} threads does not save the same results as the CPU cores")
+                failed = True
+
+    if best_speedup < args.min_speedup:
+        print(f"REGRESSION: the best pipeline run is {best_speedup:.2f}x faster, expected at least {args.min_speedup}x")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
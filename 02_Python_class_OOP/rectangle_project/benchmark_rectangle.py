@@ -0,0 +1,153 @@
+'''
+Throughput benchmark suite for the rectangle_module.py
+
+For every dataset size, CPU cores count and input/output mode, a synthetic dataset is generated (fixed seed)
+then the rectangle_module.py command line is run on it in a separate process.
+The vectorized library API (RectangleCalculator.compute_batch) is also measured on the same datasets.
+
+The report is a JSON document (files/sec, peak RSS and per-stage timings of every case, from --stats-json),
+so the results of two versions can be compared to catch performance regressions.
+
+Usage (must be in 02_Python_class_OOP/rectangle_project first):
+    python benchmark_rectangle.py
+    python benchmark_rectangle.py --sizes 1000 100000 --cores 1 2 4 8 --modes json jsonl columnar --report bench.json
+'''
+
+from argparse import ArgumentParser
+from pathlib import Path
+import json, os, platform, subprocess, sys, tempfile, time
+
+from data.data_generator import generate_dataset
+from rectangle_module import RectangleCalculator
+
+
+MODULE_PATH = Path(__file__).parent.joinpath("rectangle_module.py")
+
+
+def run_command_line(arguments, working_dir):
+    '''
+    Run the rectangle_module.py with the given arguments,
+    return the exit code, the wall time and the peak RSS (MB) of the process and its CPU cores.
+    '''
+    t0 = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(MODULE_PATH), *arguments],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        cwd=working_dir
+    )
+    _, status, rusage = os.wait4(process.pid, 0) # Unlike process.wait(), also returns the resource usage of the process
+    wall_time = time.perf_counter() - t0
+
+    peak_rss_mb = rusage.ru_maxrss / 1024 if platform.system() != "Darwin" else rusage.ru_maxrss / 1024**2 # KB on Linux, bytes on macOS
+
+    return os.waitstatus_to_exitcode(status), wall_time, peak_rss_mb
+
+
+def benchmark_command_line(dataset_dir, size, cores, mode, working_dir):
+    output_dir = Path(working_dir).joinpath(f"result_{mode}_{size}_{cores}")
+
+    match mode:
+        case "jsonl":
+            arguments = ["-i", str(dataset_dir.joinpath("rectangles.jsonl")), "-o", str(output_dir.joinpath("result.jsonl")), "-c", str(cores)]
+
+        case "columnar":
+            arguments = ["-i", str(dataset_dir), "-o", str(output_dir), "-c", str(cores), "-f", "columnar"]
+
+        case _:
+            arguments = ["-i", str(dataset_dir), "-o", str(output_dir), "-c", str(cores)]
+
+    stats_path = Path(working_dir).joinpath(f"stats_{mode}_{size}_{cores}.json")
+    exit_code, wall_time, peak_rss_mb = run_command_line([*arguments, "--stats-json", str(stats_path)], working_dir)
+
+    stages = {"run_seconds": wall_time}
+    if stats_path.exists(): # Time of each stage inside the run, summed over all CPU cores
+        with open(stats_path, "r") as json_pointer:
+            stages.update({f"{stage_name}_seconds": seconds for stage_name, seconds in json.load(json_pointer)["stage_seconds"].items()})
+
+    return {
+        "mode": mode,
+        "size": size,
+        "cores": cores,
+        "exit_code": exit_code,
+        "files_per_second": size / wall_time,
+        "peak_rss_mb": peak_rss_mb,
+        "stages": stages
+    }
+
+
+def benchmark_library(dataset_dir, size):
+    t0 = time.perf_counter()
+    lengths, widths = [], []
+    for json_file in dataset_dir.glob("*.json"):
+        with open(json_file, "r") as json_pointer:
+            record = json.load(json_pointer)
+        lengths.append(record.get("length"))
+        widths.append(record.get("width"))
+    load_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    RectangleCalculator.compute_batch(lengths, widths)
+    compute_time = time.perf_counter() - t0
+
+    return {
+        "mode": "compute_batch",
+        "size": size,
+        "cores": 1,
+        "files_per_second": size / (load_time + compute_time),
+        "stages": {"load_seconds": load_time, "compute_seconds": compute_time}
+    }
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the rectangle_module.py across dataset sizes, CPU cores and modes.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000], help="Numbers of rectangles in the generated datasets.")
+    parser.add_argument("--cores", nargs="+", type=int, default=[1, 2, 4], help="Numbers of CPU cores passed to -c (--cores).")
+    parser.add_argument("--modes", nargs="+", default=["json", "jsonl", "columnar"], choices=["json", "jsonl", "columnar"], help="Input/output modes to run.")
+    parser.add_argument("--corruption-rate", type=float, default=0.1, help="The fraction of corrupted rectangles in the datasets.")
+    parser.add_argument("--seed", type=int, default=2025, help="Seed of the dataset generator.")
+    parser.add_argument("--report", default="", help="Path of the JSON report (printed out if not given).")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "cases": []
+    }
+
+    with tempfile.TemporaryDirectory() as working_dir:
+        for size in args.sizes:
+            dataset_dir = Path(working_dir).joinpath(f"data_{size}")
+
+            t0 = time.perf_counter()
+            generate_dataset(dataset_dir, size, args.corruption_rate, "json", args.seed)
+            if "jsonl" in args.modes:
+                generate_dataset(dataset_dir, size, args.corruption_rate, "jsonl", args.seed)
+            generate_time = time.perf_counter() - t0
+
+            case = benchmark_library(dataset_dir, size)
+            case["stages"]["generate_seconds"] = generate_time
+            report["cases"].append(case)
+            print(f"{case['mode']:>14} | {size:>9} rectangles | 1 core  | {case['files_per_second']:>12.0f} files/s", file=sys.stderr)
+
+            for mode in args.modes:
+                for cores in args.cores:
+                    case = benchmark_command_line(dataset_dir, size, cores, mode, working_dir)
+                    case["stages"]["generate_seconds"] = generate_time
+                    report["cases"].append(case)
+                    print(
+                        f"{mode:>14} | {size:>9} rectangles | {cores} cores | {case['files_per_second']:>12.0f} files/s | "
+                        f"peak RSS {case['peak_rss_mb']:.1f} MB | exit code {case['exit_code']}",
+                        file=sys.stderr
+                    )
+
+    if args.report == "":
+        print(json.dumps(report, indent=4))
+
+    else:
+        with open(args.report, "w") as json_pointer:
+            json.dump(report, json_pointer, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
+'''
+Generate rectangle input files for the rectangle_module.py, some of them are corrupted on purpose.
+
+Usage (the default reproduces the original 200 files with 20 corrupted, saved next to this script):
+    python data/data_generator.py
+    python data/data_generator.py --count 100000 --corruption-rate 0.05 --seed 42 --output /tmp/rectangles
+    python data/data_generator.py --count 1000000 --format jsonl --output /tmp/rectangles
+'''
+
 import json
 import random
+from argparse import ArgumentParser
 from pathlib import Path
 from loguru import logger
 
-# Randomly select 20 file numbers to be corrupted
-corrupted_indices = random.sample(range(1, 201), 20)
-logger.info(f"Corrupted files will be: {sorted(corrupted_indices)}")
-
 corruption_types = [
     lambda x: str(x),  # Convert number to string
     lambda x: "abc",   # Non-numeric string
@@ -20,49 +26,88 @@ corruption_types = [
     lambda x: "NaN",   # Not a Number string
 ]
 
-# Generate all 200 files
-for i in range(1, 201):
+
+def generate_rectangle(rng, corrupted=False):
     # Generate random dimensions between 1.0 and 100.0
-    length = round(random.uniform(1.0, 100.0), 1)
-    width = round(random.uniform(1.0, 100.0), 1)
-    
-    # Check if this file should be corrupted
-    if i in corrupted_indices:
+    length = round(rng.uniform(1.0, 100.0), 1)
+    width = round(rng.uniform(1.0, 100.0), 1)
+
+    # Check if this rectangle should be corrupted
+    if corrupted:
         # Decide which field(s) to corrupt
-        corrupt_length = random.choice([True, False])
-        corrupt_width = random.choice([True, False])
-        
+        corrupt_length = rng.choice([True, False])
+        corrupt_width = rng.choice([True, False])
+
         # Ensure at least one field is corrupted
         if not corrupt_length and not corrupt_width:
             corrupt_length = True
-        
+
         if corrupt_length:
-            corruption_func = random.choice(corruption_types)
+            corruption_func = rng.choice(corruption_types)
             length = corruption_func(length)
-        
+
         if corrupt_width:
-            corruption_func = random.choice(corruption_types)
+            corruption_func = rng.choice(corruption_types)
             width = corruption_func(width)
-    
-    data = {
+
+    return {
         "length": length,
         "width": width
     }
-    
-    filename = f"rectangle_{i}.json"
-    filepath = Path("02_Python_class_OOP/rectanble_project/data").joinpath(filename)
-    
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=4)
-
-logger.info(f"Generated 200 rectangle files (180 valid, 20 corrupted)")
-logger.info("Corrupted files are randomly distributed among rectangle_1.json to rectangle_200.json")
-
-# Print some examples of corrupted files
-logger.info("\nExamples of some corrupted files:")
-sample_corrupted = random.sample(corrupted_indices, min(5, len(corrupted_indices)))
-for i in sample_corrupted:
-    filepath = Path("02_Python_class_OOP/rectanble_project/data").joinpath(f'rectangle_{i}.json')
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    logger.error(f"rectangle_{i}.json: {data}")
+
+
+def generate_dataset(output_dir, count=200, corruption_rate=0.1, file_format="json", seed=None):
+    '''
+    output_dir: the directory to save the generated files
+    count: the number of rectangles
+    corruption_rate: the fraction of corrupted rectangles (between 0 and 1)
+    file_format: "json" (one rectangle_N.json file per rectangle) or "jsonl" (one rectangles.jsonl file, one rectangle per line)
+    seed: fix the random generator, so the same dataset is generated every time
+
+    Return the sorted indices (starting from 1) of the corrupted rectangles.
+    '''
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Randomly select the rectangle numbers to be corrupted
+    corrupted_indices = set(rng.sample(range(1, count + 1), round(count * corruption_rate)))
+
+    match file_format:
+        case "jsonl":
+            with open(output_dir.joinpath("rectangles.jsonl"), "w") as f:
+                for i in range(1, count + 1):
+                    f.write(json.dumps(generate_rectangle(rng, i in corrupted_indices)) + "\n")
+
+        case _:
+            for i in range(1, count + 1):
+                with open(output_dir.joinpath(f"rectangle_{i}.json"), "w") as f:
+                    json.dump(generate_rectangle(rng, i in corrupted_indices), f, indent=4)
+
+    return sorted(corrupted_indices)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Generate rectangle input files, some of them are corrupted on purpose.")
+    parser.add_argument("-n", "--count", type=int, default=200, help="The number of rectangles.")
+    parser.add_argument("-r", "--corruption-rate", type=float, default=0.1, help="The fraction of corrupted rectangles.")
+    parser.add_argument("-f", "--format", default="json", choices=["json", "jsonl"], help="One JSON file per rectangle, or one JSON Lines file.")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Fix the random generator to reproduce the same dataset.")
+    parser.add_argument("-o", "--output", default=Path(__file__).parent, help="The output directory (default: the directory of this script).")
+    args = parser.parse_args()
+
+    corrupted_indices = generate_dataset(args.output, args.count, args.corruption_rate, args.format, args.seed)
+
+    logger.info(f"Generated {args.count} rectangles ({args.count - len(corrupted_indices)} valid, {len(corrupted_indices)} corrupted) in {args.output}")
+
+    if args.format == "json":
+        logger.info(f"Corrupted files are randomly distributed among rectangle_1.json to rectangle_{args.count}.json")
+
+        # Print some examples of corrupted files
+        logger.info("\nExamples of some corrupted files:")
+        sample_corrupted = random.sample(corrupted_indices, min(5, len(corrupted_indices)))
+        for i in sample_corrupted:
+            filepath = Path(args.output).joinpath(f'rectangle_{i}.json')
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+            logger.error(f"rectangle_{i}.json: {data}")
@@ -145,6 +145,43 @@ print(rectangle.summary())
 # ++ Perimeter = 2 * (33 + 25.5) = 117.0
 # ++ Area = 33 * 25.5 = 841.5
 
+#---------------------------------------------------------------------------------------------------------------------------#
+#-------------------------------- Vectorized calculation of many rectangles at once (NumPy) --------------------------------#
+#---------------------------------------------------------------------------------------------------------------------------#
+
+import numpy as np
+
+lengths = np.array([355, 55, "33.2", "abc", -2])
+widths = np.array([263, 23, 25.5, 10, 4], dtype=object)
+
+results = RectangleCalculator.compute_batch(lengths, widths)
+
+print(results["perimeter"]) # [1236.   156.   117.4    nan    nan]
+print(results["area"]) # [93365.   1265.    846.6     nan     nan]
+print(results["valid"]) # [ True  True  True False False]
+
+# A DataFrame having the "length" and "width" columns can also be passed directly
+import pandas as pd
+
+df_rectangles = pd.DataFrame({"length": [355, "1.2.3"], "width": [263, 4]})
+print(RectangleCalculator.compute_batch(df_rectangles)["valid"]) # [ True False]
+
+#---------------------------------------------------------------------------------------------------------------------------#
+#-------------------------------- Library API: process JSON files without the command line ---------------------------------#
+#---------------------------------------------------------------------------------------------------------------------------#
+
+# Never asks for confirmation, never deletes files, and returns the results in memory
+from rectangle_module import process_paths
+
+results = process_paths("data") # A directory, a JSON file, or a list of both
+print(len(results)) # 200
+print(results[0])
+# {'source': 'data/rectangle_1.json', 'length': 68.7, 'width': 80.2, 'perimeter': 297.8, 'area': 5509.740000000001, 'valid': True, 'error': None}
+
+# Also save one JSON result file per valid rectangle, using 4 CPU cores
+results = process_paths(["data", "data_single"], output="result_library", workers=4)
+print(sum(result["valid"] for result in results)) # The number of valid rectangles
+
 #---------------------------------------------------------------------------------------------------------------------------#
 #--------------------------- Display everything of the RectangleCalculator (attributes and methods) ------------------------#
 #---------------------------------------------------------------------------------------------------------------------------#
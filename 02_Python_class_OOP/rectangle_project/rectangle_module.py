@@ -1,9 +1,61 @@
-from loguru import logger
 from pathlib import Path
-from argparse import ArgumentParser, HelpFormatter
-import json, re, shutil
-from termcolor import colored
-import multiprocessing
+import json, re, math, sys, os, time, signal
+from collections import deque
+from itertools import batched
+from functools import partial
+from contextlib import contextmanager, nullcontext
+from importlib import import_module
+
+
+#-----------------------------------------------------------------------------------------------------------#
+#--------------------------------- Define lazy imports -----------------------------------------------------#
+#-----------------------------------------------------------------------------------------------------------#
+
+class LazyImport:
+    '''
+    This class stands in for a module (or one of its attributes) until it is used for the first time,
+    then imports it and replaces itself in the namespace of rectangle_module.py by the real object.
+
+    So "import rectangle_module" stays cheap: loguru, termcolor, numpy, shutil and multiprocessing
+    are only imported by the code paths that really need them (e.g. not by process_paths() with 1 worker).
+    '''
+
+
+    def __init__(self, global_name, module_name, attribute_name=None):
+        '''
+        global_name: the name of the placeholder in rectangle_module.py, e.g. "np"
+        module_name: the module to import, e.g. "numpy"
+        attribute_name: the attribute of the module to use instead of the module itself, e.g. "logger" of "loguru"
+        '''
+        self._global_name = global_name
+        self._module_name = module_name
+        self._attribute_name = attribute_name
+
+
+    def _load(self):
+        loaded = import_module(self._module_name)
+
+        if self._attribute_name is not None:
+            loaded = getattr(loaded, self._attribute_name)
+        
+        globals()[self._global_name] = loaded # The next uses skip this placeholder
+
+        return loaded
+
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+
+logger = LazyImport("logger", "loguru", "logger")
+colored = LazyImport("colored", "termcolor", "colored")
+np = LazyImport("np", "numpy")
+shutil = LazyImport("shutil", "shutil")
+multiprocessing = LazyImport("multiprocessing", "multiprocessing")
 
 
 #-----------------------------------------------------------------------------------------------------------#
@@ -15,9 +67,10 @@ class RectangleCalculator:
     This class will takes the length and width of a rectangle as inputs, 
     then return the corresponding perimeter and area as outputs.
 
-    It can also read inputs from multiple JSON files.
-    The results can be returned in a specified JSON file.
-    The class supports multicore computing.
+    It can also read inputs from multiple JSON files, or stream them from a JSON Lines file.
+    The results can be returned in a specified JSON file, or all together in one columnar file (Parquet or NumPy .npy).
+    The class supports multicore computing,
+    and vectorized calculation of many rectangles at once with NumPy arrays.
     '''
 
 
@@ -28,6 +81,14 @@ class RectangleCalculator:
         length: the length of the rectangle (for inplace calculating)
         width: the width of the rectangle (for inplace calculating)
         cores: the number of CPU cores using for parallel computing
+        chunk_size: the number of JSON files sent to a CPU core at once (0 means automatically chosen)
+        codec: the RectangleCodec decoding the JSON inputs (orjson or msgspec if installed, else the json module)
+        incremental: keep the output directory and only recalculate the new or changed JSON files
+        output_format: "json" (one JSON file per rectangle), or "columnar", "parquet", "npy" (one file for all rectangles)
+        stats: a RunStats object to record the time of each stage and the bytes read/written (None means disabled)
+        quiet: bulk processing, the per-file messages are collapsed into one summary at the end of a run
+        read_threads: the number of threads reading the JSON files ahead of the calculation (0 means the CPU cores read their own files)
+        write_threads: the number of threads saving the results when read_threads is set (0 means as many as read_threads)
         '''
         self._input = ''
         self._output = ''
@@ -36,7 +97,16 @@ class RectangleCalculator:
         self.__length = None
         self.__width = None
         self._cores = 2
+        self._chunk_size = 0
+        self._codec = RectangleCodec()
+        self._incremental = False
+        self._output_format = "json"
+        self._stats = None
+        self._quiet = False
+        self._read_threads = 0
+        self._write_threads = 0
         self._single_output_path = None
+        self._output_dir = None # The output directory validated once for a whole multiple-files run
         self._json_count = 0
 
 
@@ -55,12 +125,13 @@ class RectangleCalculator:
                 else:
                     self._output = Path(self._output)
                 
-                non_json_count = sum([1 for _ in self._output.rglob("*[!.json]")]) # Ensure the directory contains only json file
-                
-                if (self._output.is_dir()) and (non_json_count == 0):
+                # Keep the previous results in incremental mode, without walking the directory (the setup stays flat whatever its size).
+                # Otherwise it is cleared, if it contains only json files: walking and deleting them are linear by design
+                if (not self._incremental) and (self._output.is_dir()) and (not any(True for _ in self._output.rglob("*[!.json]"))):
                     shutil.rmtree(self._output)
                 
                 self._output.mkdir(exist_ok=True, parents=True)
+                self._output_dir = self._output # Shared with all CPU cores, so each result path is only a join
         
         return self._output
 
@@ -85,9 +156,9 @@ class RectangleCalculator:
         
         
         if json_output_file.suffix == "":
-            non_json_count = sum([1 for _ in json_output_file.rglob("*[!.json]")]) # Ensure the directory contains only json file
+            only_json = not any(True for _ in json_output_file.rglob("*[!.json]")) # Ensure the directory contains only json file, stop at the first other file
             
-            if (json_output_file.is_dir()) and (non_json_count == 0):
+            if (json_output_file.is_dir()) and only_json:
                 shutil.rmtree(json_output_file)
                 json_output_file.mkdir(exist_ok=True)
             
@@ -110,17 +181,29 @@ class RectangleCalculator:
 
     @staticmethod
     def __valiate_input_number(*numbers): # Internal use only, cannot call out when the module is being imported
-        numeric_pattern = r"^\+?\d+\.?\d*$"
-        numbers = list(numbers)
-        
-        for idx, number in enumerate(numbers):
-            if re.match(numeric_pattern, str(number)):
-                numbers[idx] = float(number)
-            
-            else:
-                numbers[idx] = None
-        
-        return numbers
+        return [RectangleCodec.to_number(number) for number in numbers]
+
+
+    @staticmethod
+    def __log_corrupted_inputs(json_rectangle_source): # Internal use only, the colored message is only built if an ERROR sink is listening
+        logger.opt(lazy=True, depth=1).error(
+            "CORRUPTED inputs are detected in {}{}\n",
+            lambda: colored(str(json_rectangle_source), "yellow", attrs=['bold']),
+            lambda: colored("! They are expected to be POSITIVE NUMBERS (greater than zero)", "red", attrs = ['bold'])
+        )
+
+
+    @staticmethod
+    def __log_prioritized_inputs(rectangle_output_name): # Internal use only, the inputs given by -l and -w are overridden by a valid file
+        logger.opt(lazy=True, depth=1).warning(
+            "Detected valid inputs in {}{}\n",
+            lambda: colored(str(rectangle_output_name), (139, 0, 0), attrs=["bold"]),
+            lambda: colored(", prioritize them for calculation.", "yellow", attrs=['bold'])
+        )
+
+
+    def __stage(self, stage_name): # Internal use only, time a stage only when the instrumentation is enabled
+        return nullcontext() if self._stats is None else self._stats.stage(stage_name)
 
 
     def __load_rectangle_inputs(self, json_rectangle_file): # Internal use only, cannot call out when the module is being imported
@@ -130,14 +213,21 @@ class RectangleCalculator:
         else:
             json_file_path = self._input.joinpath(json_rectangle_file)
         
-        with open(json_file_path, "r") as json_pointer:
-            length, width = json.load(json_pointer).values()
-            length, width = RectangleCalculator.__valiate_input_number(length, width)
+        with self.__stage("load"), open(json_file_path, "rb") as json_pointer:
+            json_content = json_pointer.read()
+
+            if self._stats is not None:
+                self._stats.counts["bytes_read"] += len(json_content)
         
-        if None in [length, width]:
-            json_rectangle_file = colored(json_rectangle_file, "yellow", attrs=['bold'])
-            datatype_hint = colored("! They are expected to be POSITIVE NUMBERS (greater than zero)", "red", attrs = ['bold'])
-            logger.error(f"CORRUPTED inputs are detected in {json_rectangle_file}{datatype_hint}\n")
+        with self.__stage("validate"): # Decoded and validated in one step
+            length, width = self._codec.decode(json_content)
+        
+        if (None in [length, width]) and (not self._quiet): # In quiet mode, they are counted in the summary of the run instead
+            with self.__stage("log"):
+                RectangleCalculator.__log_corrupted_inputs(json_rectangle_file)
+        
+        if self._stats is not None:
+            self._stats.counts["corrupted" if None in [length, width] else "valid"] += 1
         
         return length, width
     
@@ -175,7 +265,73 @@ class RectangleCalculator:
         
         return self.__area
 
-    
+
+    @staticmethod
+    def __valiate_input_array(numbers): # Internal use only, vectorized version of __valiate_input_number()
+        numbers = np.asarray(numbers)
+
+        if numbers.dtype.kind in "iu": # Integers are never written in scientific notation, only the sign matters
+            valid = numbers >= 0
+            return np.where(valid, numbers, np.nan).astype(np.float64), valid
+
+        if numbers.dtype.kind == "f": # str(float) must match r"^\+?\d+\.?\d*$", i.e. finite, not negative (even -0.0)
+            numbers = numbers.astype(np.float64)  # and not switched to scientific notation (1e-05, 1e+16)
+            with np.errstate(invalid="ignore"):
+                valid = np.isfinite(numbers) & ~np.signbit(numbers) & ((numbers == 0) | ((numbers >= 1e-4) & (numbers < 1e16)))
+            return np.where(valid, numbers, np.nan), valid
+
+        # Anything else (strings, None, mixed objects, booleans) goes through str() like the scalar version
+        texts = numbers.astype(str)
+        body = np.char.lstrip(texts, "+")
+        without_newline = np.char.rstrip(body, "\n")
+        digits = np.char.replace(without_newline, ".", "", count=1)
+
+        valid = (
+            (np.char.str_len(texts) - np.char.str_len(body) <= 1) # At most one leading "+"
+            & (np.char.str_len(body) - np.char.str_len(without_newline) <= 1) # "$" tolerates one trailing newline
+            & ~np.char.startswith(without_newline, ".") # At least one digit before the decimal point
+            & np.char.isdecimal(digits) # Only digits and a single decimal point (also rejects empty strings)
+        )
+
+        values = np.where(valid, without_newline, "nan").astype(np.float64)
+        return values, valid
+
+
+    @staticmethod
+    def compute_batch(lengths, widths=None):
+        '''
+        Calculate the perimeter and area of many rectangles at once.
+
+        lengths: an array-like of lengths, or a DataFrame (pandas or polars) having the "length" and "width" columns
+        widths: an array-like of widths (ignored when lengths is a DataFrame)
+
+        The inputs are validated with the same rule as the perimeter and area properties,
+        return a dictionary of NumPy arrays: "length", "width", "perimeter", "area" and the "valid" mask.
+        Corrupted rectangles have NaN in all numeric arrays and False in the "valid" mask.
+        '''
+        if widths is None:
+            if not hasattr(lengths, "columns"):
+                raise ValueError("widths must be given unless lengths is a DataFrame with the \"length\" and \"width\" columns")
+
+            lengths, widths = lengths["length"], lengths["width"]
+
+        lengths, length_valid = RectangleCalculator.__valiate_input_array(lengths)
+        widths, width_valid = RectangleCalculator.__valiate_input_array(widths)
+        lengths, widths, length_valid, width_valid = np.broadcast_arrays(lengths, widths, length_valid, width_valid)
+
+        valid = length_valid & width_valid
+        lengths = np.where(valid, lengths, np.nan)
+        widths = np.where(valid, widths, np.nan)
+
+        return {
+            "length": lengths,
+            "width": widths,
+            "perimeter": 2 * (lengths + widths),
+            "area": lengths * widths,
+            "valid": valid
+        }
+
+
     def __save_output_file(self):
         if None not in [self.__length, self.__width]:
             length, width = self.__length, self.__width
@@ -183,19 +339,23 @@ class RectangleCalculator:
         else:
             length, width = self.length, self.width
         
-        result_dict = {
-            "length": length,
-            "width": width,
-            "perimeter": self.perimeter,
-            "area": self.area
-        }
+        with self.__stage("compute"):
+            result_dict = {
+                "length": length,
+                "width": width,
+                "perimeter": self.perimeter,
+                "area": self.area
+            }
 
         if None in [self.__perimeter, self.__area]:
             return None # Don't save the file if its outputs are corrupted
        
-        with open(self._single_output_path, "w") as json_pointer:
+        with self.__stage("write"), open(self._single_output_path, "w") as json_pointer:
             json.dump(result_dict, json_pointer, indent=4)
 
+            if self._stats is not None:
+                self._stats.counts["bytes_written"] += json_pointer.tell()
+
     
     def _display_saving_single_output_message(self):
         result_path = colored(str(self._single_output_path), (139, 0, 0), attrs=["bold"])
@@ -207,8 +367,8 @@ class RectangleCalculator:
 
     
     def summary(self, rectangle_output_name="nameless"):
-        rectangle_output_name = colored(str(rectangle_output_name), (139, 0, 0), attrs=["bold"])
-        prioritize_message = colored(", prioritize them for calculation.", "yellow", attrs=['bold'])
+        colored_name = lambda: colored(str(rectangle_output_name), (139, 0, 0), attrs=["bold"]) # Only built when a message is really shown
+        prioritize_message = lambda: colored(", prioritize them for calculation.", "yellow", attrs=['bold'])
 
         if (None in [self.__length, self.__width]) and ((str(self._input) == "") or (not Path(self._input).is_dir())):
             length, width = self.length, self.width
@@ -222,7 +382,7 @@ class RectangleCalculator:
                 area_result = colored(f"++ Area = {length} * {width} = {self.area}", "cyan", attrs=["bold"])
 
                 out_message = (
-                    f"\n\nResult of the {rectangle_output_name} {colored("rectangle:", "white", attrs=["bold"])}\n"
+                    f"\n\nResult of the {colored_name()} {colored("rectangle:", "white", attrs=["bold"])}\n"
                     f"++ Length = {length}\n"
                     f"++ Width = {width}\n"
                     f"{perimeter_result}\n"
@@ -239,13 +399,13 @@ class RectangleCalculator:
                 
                 else:
                     if (str(self._input) != "") and (Path(self._input).exists()) and (None not in [self.length, self.width, self.__length, self.__width]):
-                        logger.warning(f"Detected valid inputs in {rectangle_output_name}{prioritize_message}\n")
+                        logger.warning(f"Detected valid inputs in {colored_name()}{prioritize_message()}\n")
                                         
                     return out_message # This will make thi message printed out when being imported, avoid showing twice
             
             case _:
-                if (str(self._input) != "") and (Path(self._input).exists()) and (None not in [self.length, self.width, self.__length, self.__width]):
-                    logger.warning(f"Detected valid inputs in {rectangle_output_name}{prioritize_message}\n")
+                if (not self._quiet) and (str(self._input) != "") and (Path(self._input).exists()) and (None not in [self.length, self.width, self.__length, self.__width]):
+                    RectangleCalculator.__log_prioritized_inputs(rectangle_output_name)
                 
                 self.__save_output_file()
 
@@ -275,7 +435,10 @@ class RectangleCalculator:
             case _: # If the input JSON file is given, use its data for calculation
                 self.__length, self.__width = self.__load_rectangle_inputs(json_rectangle_file)    
 
-                if Path(self._input).is_dir() and (self._json_count >= 2):  
+                if self._output_dir is not None: # The output directory was already validated once for the whole run
+                    self._single_output_path = self._output_dir.joinpath(json_rectangle_file)
+
+                elif Path(self._input).is_dir() and (self._json_count >= 2):  
                     self._single_output_path = self.__validate_output_file(json_rectangle_file)
                     
                 elif ((Path(self._input).is_dir()) and (self._json_count == 1)) or (Path(self._input).is_file()):
@@ -292,21 +455,1091 @@ class RectangleCalculator:
                     self._single_output_path = self.__validate_output_file(self._output)
         
         
-        if str(json_rectangle_file).endswith(".json") and Path(self._input).exists() and (str(self._input) != ""):
-            out_message = self.summary(Path(json_rectangle_file).name)
+        with self.__stage("log"): # Saving the output file happens inside summary(), but it is timed separately
+            if str(json_rectangle_file).endswith(".json") and Path(self._input).exists() and (str(self._input) != ""):
+                out_message = self.summary(Path(json_rectangle_file).name)
+            
+            else:
+                out_message = self.summary()
+            
+            if out_message is not None:
+                logger.info(out_message)
+
+
+    def _batch_workflow(self, json_rectangle_files):
+        '''
+        Run _single_workflow() on a chunk of JSON files inside one CPU core,
+        then return a compact summary of the whole chunk instead of one result per file.
+        '''
+        chunk_summary = {"processed": 0, "saved": 0, "corrupted": [], "errors": [], "processed_files": [], "completed_ns": []}
+        self._stats = None if self._stats is None else RunStats() # Only the stats of this chunk are sent back
+
+        for json_rectangle_file in json_rectangle_files:
+            try:
+                self._single_workflow(json_rectangle_file)
+            
+            except Exception as e: # A broken file (e.g. invalid JSON syntax) should not stop the whole chunk
+                chunk_summary["errors"].append((str(json_rectangle_file), str(e)))
+                continue
+            
+            chunk_summary["processed"] += 1
+            chunk_summary["processed_files"].append(str(json_rectangle_file))
+            chunk_summary["completed_ns"].append(time.time_ns()) # When the result was written, for the latency of the watch mode
+
+            if None in [self.__length, self.__width]:
+                chunk_summary["corrupted"].append(str(json_rectangle_file))
+            
+            elif str(self._output) != "":
+                chunk_summary["saved"] += 1
         
-        else:
-            out_message = self.summary()
+        chunk_summary["stats"] = self._stats
         
-        if out_message is not None:
-            logger.info(out_message)
+        return chunk_summary
+
+
+    def _columnar_workflow(self, json_rectangle_files):
+        '''
+        Calculate a chunk of JSON files inside one CPU core like _batch_workflow(),
+        but return the results as columns instead of saving one JSON file per rectangle.
+        Every file gets one row, the corrupted or broken ones have NaN values and valid = False.
+        '''
+        chunk_summary = {"processed": 0, "saved": 0, "corrupted": [], "errors": [], "processed_files": []}
+        columns = {column: [] for column in ColumnarResultWriter.COLUMNS}
+        self._stats = None if self._stats is None else RunStats() # Only the stats of this chunk are sent back
+
+        for json_rectangle_file in json_rectangle_files:
+            try:
+                length, width = self.__load_rectangle_inputs(json_rectangle_file)
+            
+            except Exception as e: # A broken file (e.g. invalid JSON syntax) should not stop the whole chunk
+                chunk_summary["errors"].append((str(json_rectangle_file), str(e)))
+                length, width = None, None
             
+            else:
+                chunk_summary["processed"] += 1
+                chunk_summary["processed_files"].append(str(json_rectangle_file))
+
+                if None in [length, width]:
+                    chunk_summary["corrupted"].append(str(json_rectangle_file))
+                
+                else:
+                    chunk_summary["saved"] += 1
+
+            with self.__stage("compute"):
+                valid = None not in [length, width]
+                columns["source"].append(str(json_rectangle_file))
+                columns["length"].append(length if valid else float("nan"))
+                columns["width"].append(width if valid else float("nan"))
+                columns["perimeter"].append(2 * (length + width) if valid else float("nan"))
+                columns["area"].append(length * width if valid else float("nan"))
+                columns["valid"].append(valid)
+
+        chunk_summary["columns"] = columns
+        chunk_summary["stats"] = self._stats
+
+        return chunk_summary
+
+
+    @staticmethod
+    def _compute_json_lines(numbered_lines, collect_stats=False, quiet=False, codec=None):
+        '''
+        Calculate the rectangles given as numbered JSON Lines, e.g. (1, '{"length": 2, "width": 3}\\n'),
+        then return the results as JSON Lines together with a compact summary of the chunk.
+        Corrupted records are reported by their line number and are not written, like corrupted JSON files.
+        '''
+        chunk_summary = {"processed": 0, "saved": 0, "corrupted": [], "errors": [], "lines": []}
+        stats = RunStats() if collect_stats else None
+        stage = (lambda stage_name: nullcontext()) if stats is None else stats.stage
+        codec = RectangleCodec() if codec is None else codec
+
+        for line_number, line in numbered_lines:
+            if line.strip() == "": # Skip blank lines, e.g. the one at the end of the file
+                continue
+
+            try:
+                with stage("validate"): # Decoded and validated in one step
+                    length, width = codec.decode(line, keys=("length", "width"))
+            
+            except Exception as e: # Invalid JSON syntax or missing "length" / "width" keys
+                chunk_summary["errors"].append((f"line {line_number}", repr(e)))
+                continue
+
+            chunk_summary["processed"] += 1
+            
+            if stats is not None:
+                stats.counts["bytes_read"] += len(line.encode())
+                stats.counts["corrupted" if None in [length, width] else "valid"] += 1
+
+            if None in [length, width]:
+                chunk_summary["corrupted"].append(f"line {line_number}")
+
+                if not quiet:
+                    with stage("log"):
+                        RectangleCalculator.__log_corrupted_inputs(f"line {line_number}")
+                continue
+
+            with stage("compute"):
+                result_dict = {
+                    "line": line_number,
+                    "length": length,
+                    "width": width,
+                    "perimeter": 2 * (length + width),
+                    "area": length * width
+                }
+
+            with stage("write"): # Only serialized here, the main process writes the lines in order
+                chunk_summary["lines"].append(json.dumps(result_dict) + "\n")
+            
+            chunk_summary["saved"] += 1
+        
+        chunk_summary["stats"] = stats
+        
+        return chunk_summary
+            
+
+#------------------------------------------------------------------------------------------------------------#
+#--------------------------------------- Define RectangleCodec class ----------------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+class RectangleCodec:
+    '''
+    This class decodes the JSON inputs of a rectangle straight into its (length, width) as floats,
+    with the numeric validation done once while decoding (None for a corrupted value).
+
+    The fastest installed decoder is used (orjson, then msgspec), otherwise the standard json module.
+    The corrupted inputs are exactly the same as with the json module and the NUMERIC_PATTERN rule on str(value):
+    a record that looks corrupted, or that the fast decoder rejects (e.g. NaN, Infinity, huge numbers),
+    is decoded again by the json module, so only the rare corrupted records pay for the slow path.
+    '''
+
+    BACKENDS = ["orjson", "msgspec", "json"]
+    NUMERIC_PATTERN = re.compile(r"^\+?\d+\.?\d*$")
+
+
+    def __init__(self, backend="auto"):
+        '''
+        backend: "orjson", "msgspec", "json", or "auto" (the first one installed in this order)
+        '''
+        candidates = RectangleCodec.BACKENDS if backend == "auto" else [backend, "json"]
+
+        for candidate in candidates:
+            try:
+                match candidate:
+                    case "orjson":
+                        self._loads = import_module("orjson").loads
+                    
+                    case "msgspec":
+                        self._loads = import_module("msgspec.json").decode
+                    
+                    case _:
+                        self._loads = json.loads
+            
+            except ImportError:
+                continue
+            
+            break
+
+        if (backend not in ["auto", candidate]):
+            logger.warning(f"{backend} is not installed, the JSON inputs are decoded by the {candidate} module instead\n")
+
+        self.backend = candidate
+
+
+    def __reduce__(self): # Sent to the CPU cores by the name of its decoder only
+        return (RectangleCodec, (self.backend,))
+
+
+    @staticmethod
+    def to_number(value):
+        '''
+        Return value as a float if str(value) is a positive number like "12", "+3.5" or "7.", otherwise None.
+        The common types skip the str() -> regex -> float round trip.
+        '''
+        value_type = type(value)
+
+        if value_type is float: # str(float) matches if it is finite, not negative (even -0.0), and not in scientific notation
+            return value if (1e-4 <= value < 1e16) or ((value == 0.0) and (math.copysign(1.0, value) > 0)) else None
+        
+        if value_type is int: # str(int) only has digits unless it is negative
+            return (float(value) if value >= 0 else None) if value < 10**300 else RectangleCodec.__match_number(value)
+
+        if (value is None) or (value_type is bool): # "None", "True" and "False" never match
+            return None
+        
+        return RectangleCodec.__match_number(value)
+
+
+    @staticmethod
+    def __match_number(value): # Internal use only, the original rule for strings and any other type
+        return float(value) if RectangleCodec.NUMERIC_PATTERN.match(str(value)) else None
+
+
+    def loads(self, content):
+        try:
+            return self._loads(content)
+        
+        except Exception: # The json module accepts more (NaN, Infinity, huge numbers) and raises the usual errors
+            return json.loads(content)
+
+
+    def decode(self, content, keys=None):
+        '''
+        content: the JSON text (str or bytes) of one rectangle
+        keys: the names of the length and width fields, None means the first two values of the record (like a JSON input file)
+
+        Return (length, width), each one a float or None if corrupted.
+        '''
+        record = self.loads(content)
+        length, width = record.values() if keys is None else (record[keys[0]], record[keys[1]])
+        numbers = RectangleCodec.to_number(length), RectangleCodec.to_number(width)
+
+        if (None in numbers) and (self.backend != "json"): # e.g. orjson reads a 20-digit integer as a float in scientific notation
+            record = json.loads(content)
+            length, width = record.values() if keys is None else (record[keys[0]], record[keys[1]])
+            numbers = RectangleCodec.to_number(length), RectangleCodec.to_number(width)
+        
+        return numbers
+
+
+#------------------------------------------------------------------------------------------------------------#
+#--------------------------------- Define ColumnarResultWriter class ----------------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+class ColumnarResultWriter:
+    '''
+    This class writes the results of a multiple-files run into ONE columnar file,
+    which is much faster to write and to read back (pandas, polars) than thousands of small JSON files.
+
+    Parquet is used if pyarrow is installed, otherwise a structured NumPy .npy file.
+    The rows are buffered and written in row groups, so the memory stays bounded whatever the number of files.
+    '''
+
+    COLUMNS = ["source", "length", "width", "perimeter", "area", "valid"]
+
+
+    def __init__(self, output_dir, n_rows, source_width=64, file_format="columnar", row_group_size=65536):
+        '''
+        output_dir: the directory to save the "rectangle_results.parquet" or "rectangle_results.npy" file
+        n_rows: the total number of rows (one per input JSON file), needed to pre-allocate the .npy file
+        source_width: the maximum length of the source file names (for the fixed-width string column of the .npy file)
+        file_format: "parquet", "npy", or "columnar" (Parquet if pyarrow is installed, else .npy)
+        row_group_size: the number of rows buffered in memory before being written
+        '''
+        if file_format in ["columnar", "parquet"]:
+            try:
+                import pyarrow, pyarrow.parquet
+                file_format = "parquet"
+            
+            except ImportError:
+                if file_format == "parquet":
+                    logger.warning("pyarrow is not installed, the results are saved in a structured NumPy .npy file instead\n")
+                
+                file_format = "npy"
+
+        self.file_format = file_format
+        self.path = Path(output_dir).joinpath(f"rectangle_results.{file_format}")
+        self._row_group_size = row_group_size
+        self._buffer = {column: [] for column in ColumnarResultWriter.COLUMNS}
+        self._buffered = 0
+        self._written = 0
+
+        match file_format:
+            case "parquet":
+                self._pa, self._pq = pyarrow, pyarrow.parquet
+                self._schema = pyarrow.schema([
+                    ("source", pyarrow.string()),
+                    ("length", pyarrow.float64()),
+                    ("width", pyarrow.float64()),
+                    ("perimeter", pyarrow.float64()),
+                    ("area", pyarrow.float64()),
+                    ("valid", pyarrow.bool_())
+                ])
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+            
+            case _:
+                self._dtype = np.dtype([
+                    ("source", f"U{max(1, source_width)}"),
+                    ("length", "f8"),
+                    ("width", "f8"),
+                    ("perimeter", "f8"),
+                    ("area", "f8"),
+                    ("valid", "?")
+                ])
+                self._writer = np.lib.format.open_memmap(self.path, mode="w+", dtype=self._dtype, shape=(n_rows,)) # Written on disk, not kept in memory
+
+
+    def write(self, columns):
+        for column in ColumnarResultWriter.COLUMNS:
+            self._buffer[column].extend(columns[column])
+        
+        self._buffered += len(columns["source"])
+
+        if self._buffered >= self._row_group_size:
+            self.flush()
+
+
+    def flush(self):
+        if self._buffered == 0:
+            return None
+        
+        match self.file_format:
+            case "parquet":
+                self._writer.write_table(self._pa.table(self._buffer, schema=self._schema))
+            
+            case _:
+                rows = self._writer[self._written: self._written + self._buffered]
+                for column in ColumnarResultWriter.COLUMNS:
+                    rows[column] = self._buffer[column]
+        
+        self._written += self._buffered
+        self._buffer = {column: [] for column in ColumnarResultWriter.COLUMNS}
+        self._buffered = 0
+
+
+    def close(self):
+        self.flush()
+        
+        match self.file_format:
+            case "parquet":
+                self._writer.close()
+            
+            case _:
+                self._writer.flush()
+                del self._writer
+        
+        return self.path
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#------------------------------------------------------------------------------------------------------------#
+#--------------------------------------- Define RunStats class ----------------------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+class RunStats:
+    '''
+    This class records where the time of a run goes (opt-in with --stats or --stats-json):
+    the wall time of each stage, the bytes read and written, and the number of valid and corrupted inputs.
+
+    The time of a stage excludes the stages nested inside it (e.g. "write" happens inside "log" but is not counted twice).
+    Each CPU core records its own RunStats for every chunk, which are merged in the main process.
+    '''
+
+    STAGES = ["load", "validate", "compute", "log", "write"]
+
+
+    def __init__(self):
+        self.seconds = {stage_name: 0.0 for stage_name in RunStats.STAGES}
+        self.counts = {"valid": 0, "corrupted": 0, "bytes_read": 0, "bytes_written": 0}
+        self._nested_seconds = [] # Time spent in the nested stages of every running stage
+
+
+    @contextmanager
+    def stage(self, stage_name):
+        self._nested_seconds.append(0.0)
+        t0 = time.perf_counter()
+        
+        try:
+            yield
+        
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.seconds[stage_name] += elapsed - self._nested_seconds.pop()
+
+            if len(self._nested_seconds) > 0:
+                self._nested_seconds[-1] += elapsed
+
+
+    def merge(self, other):
+        if other is None:
+            return None
+        
+        for stage_name, seconds in other.seconds.items():
+            self.seconds[stage_name] += seconds
+        
+        for name, count in other.counts.items():
+            self.counts[name] += count
+
+
+    def to_dict(self, wall_seconds=None, run_summary=None):
+        stats_dict = {
+            "wall_seconds": wall_seconds,
+            "stage_seconds": dict(self.seconds), # Summed over all CPU cores, so it can be greater than the wall time
+            **self.counts
+        }
+
+        if run_summary is not None:
+            stats_dict["failed"] = len(run_summary["errors"])
+
+            if "latency_ms" in run_summary: # Only measured by the watch mode
+                stats_dict["latency_ms"] = run_summary["latency_ms"]
+
+        return stats_dict
+
+
+    def report(self, wall_seconds=None, run_summary=None):
+        stats_dict = self.to_dict(wall_seconds, run_summary)
+        total_seconds = sum(self.seconds.values())
+
+        stage_lines = [
+            f"++ {stage_name:<9} {seconds:10.4f} s ({seconds / total_seconds * 100 if total_seconds > 0 else 0:5.1f}%)"
+            for stage_name, seconds in stats_dict["stage_seconds"].items()
+        ]
+
+        logger.info(
+            f"\n\n{colored('Run statistics:', 'white', attrs=['bold'])}\n"
+            + (f"++ Wall time = {wall_seconds:.4f} s\n" if wall_seconds is not None else "")
+            + "\n".join(stage_lines) + "\n"
+            + f"++ Valid = {stats_dict['valid']}, Corrupted = {stats_dict['corrupted']}"
+            + (f", Failed = {stats_dict['failed']}" if "failed" in stats_dict else "") + "\n"
+            + f"++ Bytes read = {stats_dict['bytes_read']}, Bytes written = {stats_dict['bytes_written']}\n"
+        )
+
+
+#------------------------------------------------------------------------------------------------------------#
+#------------------------------------ Define multicore chunk processing functions ---------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+__worker_calculator = None # Each CPU core keeps its own copy of the calculator, received once at start-up
+
+
+def __init_worker(calculator): # Internal use only, run once in each CPU core when the pool is created
+    global __worker_calculator
+    __worker_calculator = calculator
+
+
+def __process_chunk(json_rectangle_files): # Internal use only, only the file names are sent to the CPU core
+    return __worker_calculator._batch_workflow(json_rectangle_files)
+
+
+def __process_columnar_chunk(json_rectangle_files): # Internal use only, the results come back as columns
+    return __worker_calculator._columnar_workflow(json_rectangle_files)
+
+
+def __split_chunks(json_files, cores, chunk_size=0): # Internal use only, cannot call out when the module is being imported
+    if chunk_size <= 0: # About 4 chunks per CPU core for load balancing, but not too large to keep the memory low
+        chunk_size = max(1, min(1000, math.ceil(len(json_files) / (cores * 4))))
+    
+    return [json_files[idx: idx + chunk_size] for idx in range(0, len(json_files), chunk_size)]
+
+
+def __merge_chunk_summary(run_summary, chunk_summary): # Internal use only, cannot call out when the module is being imported
+    run_summary["chunks"] += 1
+    run_summary["processed"] += chunk_summary["processed"]
+    run_summary["saved"] += chunk_summary["saved"]
+    run_summary["corrupted"].extend(chunk_summary["corrupted"])
+    run_summary["errors"].extend(chunk_summary["errors"])
+
+
+def __sample_names(names, sample_size=5): # Internal use only, e.g. "a.json, b.json, c.json, ... (+97 more)"
+    sample = ", ".join(colored(str(name), "yellow", attrs=['bold']) for name in sorted(names)[:sample_size])
+    return sample if len(names) <= sample_size else f"{sample}, ... (+{len(names) - sample_size} more)"
+
+
+def __report_run_summary(run_summary, unit="files", quiet=False): # Internal use only, cannot call out when the module is being imported
+    if quiet: # The per-file messages are collapsed into counts plus a sample of the names
+        if len(run_summary["corrupted"]) > 0:
+            datatype_hint = colored("They are expected to be POSITIVE NUMBERS (greater than zero)", "red", attrs = ['bold'])
+            logger.error(f"CORRUPTED inputs are detected in {len(run_summary['corrupted'])} {unit}: {__sample_names(run_summary['corrupted'])}. {datatype_hint}\n")
+        
+        if len(run_summary["errors"]) > 0:
+            logger.error(f"FAILED to process {len(run_summary['errors'])} {unit}: {__sample_names([name for name, _ in run_summary['errors']])}. First error: {run_summary['errors'][0][1]}\n")
+    
+    else:
+        for json_rectangle_source, error in run_summary["errors"]:
+            json_rectangle_source = colored(json_rectangle_source, "yellow", attrs=['bold'])
+            logger.error(f"FAILED to process {json_rectangle_source}: {error}\n")
+
+    logger.info(
+        f"Processed {run_summary['processed']} {unit} in {run_summary['chunks']} chunks: "
+        f"{run_summary['saved']} saved, {len(run_summary['corrupted'])} corrupted, {len(run_summary['errors'])} failed\n"
+    )
+
+
+def __run_multiple_files(calculator, input_json_files, columnar_writer=None, pool=None): # Internal use only, cannot call out when the module is being imported
+    chunks = __split_chunks(input_json_files, calculator._cores, calculator._chunk_size)
+    process_chunk = __process_chunk if columnar_writer is None else __process_columnar_chunk
+    run_summary = {"chunks": 0, "processed": 0, "saved": 0, "corrupted": [], "errors": [], "processed_files": [], "completed_ns": []}
+
+    if len(chunks) == 0: # Nothing to do (e.g. an incremental run without any changed file), don't start the CPU cores
+        return run_summary
+
+    if (calculator._read_threads > 0) and (calculator._output_dir is not None) and (columnar_writer is None) and (pool is None):
+        return __run_pipeline(calculator, input_json_files)
+
+    if pool is None: # The watch mode keeps its pool warm between the runs, a single run starts its own
+        with multiprocessing.Pool(processes=calculator._cores, initializer=__init_worker, initargs=(calculator,)) as pool:
+            return __run_multiple_files(calculator, input_json_files, columnar_writer, pool)
+
+    for chunk_summary in pool.imap_unordered(process_chunk, chunks):
+        __merge_chunk_summary(run_summary, chunk_summary)
+        run_summary["processed_files"].extend(chunk_summary["processed_files"])
+        run_summary["completed_ns"].extend(chunk_summary.get("completed_ns", []))
+
+        if calculator._stats is not None:
+            calculator._stats.merge(chunk_summary["stats"])
+
+        if columnar_writer is not None:
+            columnar_writer.write(chunk_summary["columns"])
+
+    __report_run_summary(run_summary, unit="files", quiet=calculator._quiet)
+
+    return run_summary
+
+
+#------------------------------------------------------------------------------------------------------------#
+#------------------------------------ Define incremental run functions --------------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+__MANIFEST_NAME = ".rectangle_manifest.json" # Saved in the output directory, next to the results
+
+
+def __scan_json_stats(directory): # Internal use only, one os.scandir() call instead of one os.stat() per file
+    json_stats = {}
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                entry_stat = entry.stat()
+                json_stats[entry.name] = [entry_stat.st_size, entry_stat.st_mtime_ns]
+    
+    return json_stats
+
+
+def __plan_incremental_run(calculator, input_json_files): # Internal use only, cannot call out when the module is being imported
+    previous_files = __load_manifest(calculator)
+    input_stats = __scan_json_stats(calculator._input)
+    input_stats = {name: input_stats[name] for name in input_json_files if name in input_stats}
+    output_json_files = set(__scan_json_stats(calculator._output))
+
+    changed_json_files = []
+    for name, stats in input_stats.items():
+        previous = previous_files.get(name)
+
+        if (previous is None) or (previous["stats"] != stats) or (previous["saved"] and (name not in output_json_files)):
+            Path(calculator._output).joinpath(name).unlink(missing_ok=True) # A changed file might be corrupted now, drop its old result
+            changed_json_files.append(name)
+    
+    deleted_json_files = [name for name in previous_files if name not in input_stats]
+
+    if (len(previous_files) == 0) and (not any(True for _ in Path(calculator._output).rglob("*[!.json]"))):
+        # No manifest of this input yet (the first incremental run): the results left in a directory of JSON files only
+        # without a matching input are stale, like the ones a normal run drops by clearing the directory
+        deleted_json_files = [name for name in output_json_files if (name not in input_stats) and (name != __MANIFEST_NAME)]
+
+    for name in deleted_json_files:
+        Path(calculator._output).joinpath(name).unlink(missing_ok=True)
+
+    logger.info(
+        f"Incremental run: {len(changed_json_files)} new or changed, {len(input_stats) - len(changed_json_files)} unchanged, "
+        f"{len(deleted_json_files)} deleted input files\n"
+    )
+
+    return input_stats, previous_files, changed_json_files
+
+
+def __save_manifest(calculator, input_stats, previous_files, run_summary): # Internal use only, cannot call out when the module is being imported
+    failed_json_files = {name for name, _ in run_summary["errors"]} # Not recorded, so they will be retried in the next run
+    corrupted_json_files = set(run_summary["corrupted"])
+    processed_json_files = set(run_summary["processed_files"])
+
+    files = {}
+    for name, stats in input_stats.items():
+        if name in failed_json_files:
+            continue
+        
+        elif name in processed_json_files:
+            files[name] = {"stats": stats, "saved": name not in corrupted_json_files}
+        
+        elif name in previous_files:
+            files[name] = previous_files[name]
+
+    manifest = {"input": str(Path(calculator._input).resolve()), "files": files}
+
+    with open(Path(calculator._output).joinpath(__MANIFEST_NAME), "w") as json_pointer:
+        json.dump(manifest, json_pointer)
+    
+    return files
+
+
+def __load_manifest(calculator): # Internal use only, the files recorded by the previous run of the same input directory
+    manifest_path = Path(calculator._output).joinpath(__MANIFEST_NAME)
+
+    if manifest_path.exists():
+        with open(manifest_path, "r") as json_pointer:
+            manifest = json.load(json_pointer)
+        
+        if manifest.get("input") == str(Path(calculator._input).resolve()): # A manifest of another input directory is useless
+            return manifest.get("files", {})
+    
+    return {}
+
+
+#------------------------------------------------------------------------------------------------------------#
+#------------------------------------ Define threaded I/O pipeline functions --------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+def __bounded_map(executor, function, items, window): # Internal use only, like executor.map() in order, but at most `window` tasks are in flight
+    pending = deque()
+
+    for item in items:
+        if len(pending) >= window: # Backpressure: wait for the oldest task before reading further ahead
+            yield pending.popleft().result()
+        
+        pending.append(executor.submit(function, item))
+    
+    while len(pending) > 0:
+        yield pending.popleft().result()
+
+
+def __read_rectangle_file(json_path, codec): # Internal use only, run in a reader thread: open, then decode and validate
+    t0 = time.perf_counter()
+
+    try:
+        with open(json_path, "rb") as json_pointer:
+            json_content = json_pointer.read()
+    
+    except Exception as e:
+        return None, None, str(e), 0, time.perf_counter() - t0, 0.0
+    
+    t1 = time.perf_counter()
+
+    try:
+        length, width = codec.decode(json_content) # Decoded and validated in one step, like __load_rectangle_inputs()
+    
+    except Exception as e: # A broken file (e.g. invalid JSON syntax) is reported, like in a CPU core
+        return None, None, str(e), len(json_content), t1 - t0, time.perf_counter() - t1
+    
+    return length, width, None, len(json_content), t1 - t0, time.perf_counter() - t1
+
+
+def __compute_pipeline_batch(lengths, widths): # Internal use only, run in the main thread or in a CPU core of the pipeline
+    t0 = time.perf_counter()
+    results = RectangleCalculator.compute_batch(lengths, widths)
+    results = {column: values.tolist() for column, values in results.items()}
+
+    return results, time.perf_counter() - t0
+
+
+def __write_result_file(json_output_file, result_dict): # Internal use only, run in a writer thread
+    t0 = time.perf_counter()
+
+    try:
+        with open(json_output_file, "w") as json_pointer:
+            json.dump(result_dict, json_pointer, indent=4)
+            bytes_written = json_pointer.tell()
+    
+    except Exception as e:
+        return str(e), 0, time.perf_counter() - t0
+    
+    return None, bytes_written, time.perf_counter() - t0
+
+
+def __run_pipeline(calculator, input_json_files): # Internal use only, cannot call out when the module is being imported
+    '''
+    Calculate a directory as three overlapped stages, for high-latency storage (e.g. network filesystems):
+    reader threads open, decode and validate the JSON files (with the same rule as RectangleCodec.decode()) ahead of the calculation,
+    the batches of valid numbers are calculated with compute_batch() by --cores CPU cores (in the main thread for 1 core),
+    and writer threads save the results.
+    Only a few tasks per thread or core are in flight between two stages, so the memory stays bounded whatever the number of files.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    import numpy as np # Imported before the first batch, so the import is not timed as the compute stage
+
+    read_threads = calculator._read_threads
+    write_threads = calculator._write_threads if calculator._write_threads > 0 else read_threads
+    batch_size = calculator._chunk_size if calculator._chunk_size > 0 else 256
+    stats = calculator._stats
+    stage = (lambda stage_name: nullcontext()) if stats is None else stats.stage
+    run_summary = {"chunks": 0, "processed": 0, "saved": 0, "corrupted": [], "errors": [], "processed_files": [], "completed_ns": []}
+    pending_batches = deque()
+    pending_writes = deque()
+
+    # Like summary(), a valid file is prioritized over valid inputs given by -l and -w, which is worth a warning for every file
+    warn_prioritized = (not calculator._quiet) and (None not in [RectangleCodec.to_number(calculator.length), RectangleCodec.to_number(calculator.width)])
+
+    def collect_write(): # The oldest write first, so the results are counted in the order of the files
+        name, future = pending_writes.popleft()
+        error, bytes_written, seconds = future.result()
+
+        if error is not None:
+            run_summary["errors"].append((name, error))
+            return None
+        
+        run_summary["processed"] += 1
+        run_summary["saved"] += 1
+        run_summary["processed_files"].append(name)
+        run_summary["completed_ns"].append(time.time_ns())
+
+        if stats is not None:
+            stats.seconds["write"] += seconds
+            stats.counts["bytes_written"] += bytes_written
+
+    def collect_batch(): # The oldest batch first, then its results are queued for the writer threads
+        names, pending_result = pending_batches.popleft()
+        results, seconds = pending_result if pool is None else pending_result.get()
+
+        if stats is not None:
+            stats.seconds["compute"] += seconds # Measured where it ran, the waiting time of the main thread is not counted
+
+        for idx, name in enumerate(names):
+            if not results["valid"][idx]:
+                run_summary["processed"] += 1
+                run_summary["processed_files"].append(name)
+                run_summary["corrupted"].append(name)
+
+                if stats is not None:
+                    stats.counts["corrupted"] += 1
+
+                if not calculator._quiet:
+                    with stage("log"):
+                        RectangleCalculator._RectangleCalculator__log_corrupted_inputs(name)
+                continue
+
+            if stats is not None:
+                stats.counts["valid"] += 1
+
+            if warn_prioritized:
+                with stage("log"):
+                    RectangleCalculator._RectangleCalculator__log_prioritized_inputs(name)
+
+            result_dict = {column: results[column][idx] for column in ["length", "width", "perimeter", "area"]}
+
+            if len(pending_writes) >= write_threads * 4: # Backpressure: wait for the oldest write before queueing another one
+                collect_write()
+            
+            pending_writes.append((name, writers.submit(__write_result_file, calculator._output_dir.joinpath(name), result_dict)))
+
+    # The CPU cores are started before the threads, a forked process only gets a copy of the thread calling fork()
+    with (nullcontext() if calculator._cores <= 1 else multiprocessing.Pool(processes=calculator._cores)) as pool, \
+         ThreadPoolExecutor(read_threads, thread_name_prefix="rectangle-reader") as readers, \
+         ThreadPoolExecutor(write_threads, thread_name_prefix="rectangle-writer") as writers:
+        
+        json_paths = (calculator._input.joinpath(name) for name in input_json_files)
+        read_rectangle_file = partial(__read_rectangle_file, codec=calculator._codec)
+        records = zip(input_json_files, __bounded_map(readers, read_rectangle_file, json_paths, read_threads * 4))
+
+        for batch in batched(records, batch_size):
+            run_summary["chunks"] += 1
+            names, lengths, widths = [], [], []
+
+            for name, (length, width, error, bytes_read, load_seconds, validate_seconds) in batch:
+                if stats is not None:
+                    stats.seconds["load"] += load_seconds
+                    stats.seconds["validate"] += validate_seconds
+                    stats.counts["bytes_read"] += bytes_read
+
+                if error is not None:
+                    run_summary["errors"].append((name, error))
+                    continue
+                
+                names.append(name)
+                lengths.append(np.nan if length is None else length) # Already validated by the readers, the corrupted values are NaN
+                widths.append(np.nan if width is None else width)
+            
+            if len(names) == 0:
+                continue
+
+            lengths, widths = np.array(lengths, dtype=np.float64), np.array(widths, dtype=np.float64)
+
+            if pool is None:
+                pending_batches.append((names, __compute_pipeline_batch(lengths, widths)))
+            
+            else:
+                pending_batches.append((names, pool.apply_async(__compute_pipeline_batch, (lengths, widths))))
+
+            if len(pending_batches) > max(calculator._cores, 1) * 2: # Backpressure: at most two batches per CPU core in flight
+                collect_batch()
+        
+        while len(pending_batches) > 0:
+            collect_batch()
+
+        while len(pending_writes) > 0:
+            collect_write()
+    
+    __report_run_summary(run_summary, unit="files", quiet=calculator._quiet)
+
+    return run_summary
+
+
+#------------------------------------------------------------------------------------------------------------#
+#------------------------------------------ Define watch mode functions -------------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+__WATCH_REPORT_SECONDS = 60 # How often a long-running watch logs its latency percentiles
+__WATCH_LATENCY_WINDOW = 100_000 # The percentiles are computed on the latest files only, so the memory stays bounded
+
+
+def __init_watch_worker(calculator): # Internal use only, Ctrl+C is handled by the main process only, which stops the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    __init_worker(calculator)
+
+
+def __latency_percentiles(latencies): # Internal use only, nearest-rank percentiles in milliseconds
+    ordered = sorted(latencies)
+
+    if len(ordered) == 0:
+        return {}
+    
+    percentiles = {f"p{q}": ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)] for q in [50, 90, 99]}
+    percentiles["max"] = ordered[-1]
+
+    return percentiles
+
+
+def __report_latency(latencies, total_files): # Internal use only, cannot call out when the module is being imported
+    percentiles = __latency_percentiles(latencies)
+
+    if len(percentiles) > 0:
+        logger.info(
+            f"Latency from file arrival to written result ({total_files} files, the latest {len(latencies)} counted): "
+            + ", ".join(f"{name} = {milliseconds:.1f} ms" for name, milliseconds in percentiles.items()) + "\n"
+        )
+    
+    return percentiles
+
+
+def __watch_directory(calculator, poll_interval=1.0, timeout=0.0): # Internal use only, cannot call out when the module is being imported
+    '''
+    Poll the input directory with one os.scandir() per interval, and calculate the new or changed JSON files as they arrive.
+    The processed files are recorded in the manifest of the incremental mode (the cursor), so a restarted watch resumes where it stopped.
+    All files found by one poll are calculated together, split into chunks for the CPU cores of the warm pool.
+    '''
+    cursor = __load_manifest(calculator)
+    failed_stats = {} # Broken files are only retried once they change
+    latencies = deque(maxlen=__WATCH_LATENCY_WINDOW)
+    run_summary = {"chunks": 0, "processed": 0, "saved": 0, "corrupted": [], "errors": []}
+
+    t_start = time.monotonic()
+    last_report = t_start
+
+    input_dir = colored(str(calculator._input), (139, 0, 0), attrs=["bold"])
+    logger.info(f"Watching {input_dir} every {poll_interval} s with {calculator._cores} CPU cores, press Ctrl+C to stop\n")
+
+    with multiprocessing.Pool(processes=calculator._cores, initializer=__init_watch_worker, initargs=(calculator,)) as pool:
+        try:
+            while (timeout <= 0) or (time.monotonic() - t_start < timeout):
+                input_stats = __scan_json_stats(calculator._input)
+                arrived_json_files = [
+                    name for name, stats in input_stats.items()
+                    if (cursor.get(name, {}).get("stats") != stats) and (failed_stats.get(name) != stats)
+                ]
+
+                if len(arrived_json_files) == 0:
+                    time.sleep(poll_interval)
+                    continue
+
+                batch_summary = __run_multiple_files(calculator, arrived_json_files, pool=pool) # No sleep after a batch, the backlog is polled at once
+
+                for name, completed_ns in zip(batch_summary["processed_files"], batch_summary["completed_ns"]):
+                    latencies.append((completed_ns - input_stats[name][1]) / 1e6) # The modification time of the file is its arrival time
+
+                failed_stats.update({name: input_stats[name] for name, _ in batch_summary["errors"]})
+                cursor = __save_manifest(calculator, input_stats, cursor, batch_summary)
+                __merge_chunk_summary(run_summary, batch_summary)
+                run_summary["chunks"] += batch_summary["chunks"] - 1 # Count the chunks, not the batches
+
+                if time.monotonic() - last_report >= __WATCH_REPORT_SECONDS:
+                    __report_latency(latencies, run_summary["processed"])
+                    last_report = time.monotonic()
+
+        except KeyboardInterrupt:
+            logger.info("Stopped watching\n")
+    
+    __report_run_summary(run_summary, unit="files", quiet=True)
+    run_summary["latency_ms"] = __report_latency(latencies, run_summary["processed"])
+
+    return run_summary
+
+
+#------------------------------------------------------------------------------------------------------------#
+#------------------------------------ Define JSON Lines streaming functions ---------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+def __validate_jsonl_output(output): # Internal use only, "" or "-" means writing the results to the standard output
+    if str(output) in ["", "-"]:
+        return "-"
+    
+    output = Path(output)
+
+    if output.suffix != ".jsonl":
+        output = output.parent.joinpath(output.stem + ".jsonl")
+
+        output_path = colored(str(output), (139, 0, 0), attrs=["bold"])
+        logger.warning(f'Inputs are streamed from JSON Lines, so the output path should end with ".jsonl", automatically set as {output_path}\n')
+    
+    output.parent.mkdir(exist_ok=True, parents=True)
+
+    return output
+
+
+def __iter_json_lines(json_lines_pointer, chunk_size): # Internal use only, a generator reading one chunk of lines at a time
+    for numbered_lines in batched(enumerate(json_lines_pointer, start=1), chunk_size):
+        yield numbered_lines
+
+
+def __run_json_lines(calculator): # Internal use only, cannot call out when the module is being imported
+    chunk_size = calculator._chunk_size if calculator._chunk_size > 0 else 1000
+    run_summary = {"chunks": 0, "processed": 0, "saved": 0, "corrupted": [], "errors": []}
+
+    calculator._output = __validate_jsonl_output(calculator._output)
+    input_pointer = sys.stdin if str(calculator._input) == "-" else open(calculator._input, "r")
+    output_pointer = sys.stdout if str(calculator._output) == "-" else open(calculator._output, "w")
+
+    try:
+        chunks = __iter_json_lines(input_pointer, chunk_size)
+
+        compute_json_lines = partial(RectangleCalculator._compute_json_lines, collect_stats=calculator._stats is not None, quiet=calculator._quiet, codec=calculator._codec)
+
+        with multiprocessing.Pool(processes=calculator._cores) as pool:
+            # Only a few chunks per CPU core are read ahead, so the memory stays the same whatever the input size
+            for wave in batched(chunks, calculator._cores * 4):
+                for chunk_summary in pool.imap(compute_json_lines, wave): # imap keeps the line order
+                    if calculator._stats is None:
+                        output_pointer.writelines(chunk_summary["lines"])
+                    
+                    else:
+                        with calculator._stats.stage("write"):
+                            output_pointer.writelines(chunk_summary["lines"])
+                        
+                        calculator._stats.merge(chunk_summary["stats"])
+                        calculator._stats.counts["bytes_written"] += sum(len(line.encode()) for line in chunk_summary["lines"])
+                    
+                    __merge_chunk_summary(run_summary, chunk_summary)
+    
+    finally:
+        if input_pointer is not sys.stdin:
+            input_pointer.close()
+
+        if output_pointer is not sys.stdout:
+            output_pointer.close()
+        
+        else:
+            output_pointer.flush()
+
+    __report_run_summary(run_summary, unit="lines", quiet=calculator._quiet)
+
+    return run_summary
+
+
+#------------------------------------------------------------------------------------------------------------#
+#------------------------------------ Define process_paths() library function -------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+def __collect_json_paths(inputs): # Internal use only, the JSON files of the given files and directories, in the given order
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = [inputs]
+    
+    json_paths = []
+    for input_path in inputs:
+        input_path = Path(input_path)
+
+        if input_path.is_dir():
+            json_paths.extend(sorted(str(json_path) for json_path in input_path.glob("*.json")))
+        
+        elif input_path.is_file():
+            json_paths.append(str(input_path))
+        
+        else:
+            raise FileNotFoundError(f"The input path does not exist: {input_path}")
+    
+    return json_paths
+
+
+def __process_paths_chunk(json_paths, output_dir=None): # Internal use only, run in the current process or in one CPU core
+    calculator = RectangleCalculator()
+    calculator._input = Path() # The given paths are used as they are, relative to the current directory
+    calculator._quiet = True # A library call never logs per file, the errors are returned instead
+
+    chunk_summary = calculator._columnar_workflow(json_paths)
+    columns = chunk_summary["columns"]
+    errors = dict(chunk_summary["errors"])
+
+    results = []
+    for idx, json_path in enumerate(columns["source"]):
+        valid = columns["valid"][idx]
+        result_dict = {
+            "source": json_path,
+            "length": columns["length"][idx] if valid else None,
+            "width": columns["width"][idx] if valid else None,
+            "perimeter": columns["perimeter"][idx] if valid else None,
+            "area": columns["area"][idx] if valid else None,
+            "valid": valid,
+            "error": errors.get(json_path)
+        }
+
+        if valid and (output_dir is not None): # Same content as the result files of the command line
+            with open(Path(output_dir).joinpath(Path(json_path).name), "w") as json_pointer:
+                json.dump({name: result_dict[name] for name in ["length", "width", "perimeter", "area"]}, json_pointer, indent=4)
+        
+        results.append(result_dict)
+    
+    return results
+
+
+def process_paths(inputs, output=None, workers=1, chunk_size=0):
+    '''
+    Library entry point: calculate the rectangles of JSON files without parsing the command line,
+    configuring the logs or asking for any confirmation, and return the results in memory.
+
+    inputs: a path (or a list of paths) leading to a JSON file or to a directory of JSON files
+    output: a directory to also save one JSON result file per valid rectangle (None means nothing is written).
+            Unlike the command line, the existing files of this directory are never deleted.
+    workers: the number of CPU cores (1 means everything runs in the current process, no pool is started)
+    chunk_size: the number of JSON files sent to a CPU core at once (0 means automatically chosen)
+
+    Return one dictionary per JSON file, in the order of the inputs (the files of a directory are sorted by name):
+    {"source", "length", "width", "perimeter", "area", "valid", "error"}
+    The corrupted or broken files have None in the numeric fields, valid = False,
+    and the exception message in "error" if the file could not be read at all.
+    '''
+    json_paths = __collect_json_paths(inputs)
+
+    if output is not None:
+        Path(output).mkdir(exist_ok=True, parents=True)
+
+    if (workers <= 1) or (len(json_paths) <= 1):
+        return __process_paths_chunk(json_paths, output)
+
+    results = []
+    chunks = __split_chunks(json_paths, workers, chunk_size)
+    process_chunk = partial(__process_paths_chunk, output_dir=output)
+
+    with multiprocessing.Pool(processes=min(workers, len(chunks))) as pool:
+        for chunk_results in pool.imap(process_chunk, chunks): # imap keeps the order of the inputs
+            results.extend(chunk_results)
+    
+    return results
+
+
+#------------------------------------------------------------------------------------------------------------#
+#------------------------------------------ Define report_stats() function ----------------------------------#
+#------------------------------------------------------------------------------------------------------------#
+
+def __report_stats(calculator, run_summary, wall_seconds, stats_json=""): # Internal use only, cannot call out when the module is being imported
+    calculator._stats.report(wall_seconds, run_summary)
+
+    if stats_json != "":
+        Path(stats_json).parent.mkdir(exist_ok=True, parents=True)
+
+        with open(stats_json, "w") as json_pointer:
+            json.dump(calculator._stats.to_dict(wall_seconds, run_summary), json_pointer, indent=4)
+        
+        stats_path = colored(str(stats_json), (139, 0, 0), attrs=["bold"])
+        logger.info(f"The run statistics are saved in {stats_path}\n")
+
 
 #------------------------------------------------------------------------------------------------------------#
 #------------------------------------------ Define log_file() function --------------------------------------#
 #------------------------------------------------------------------------------------------------------------#
 
-def __config_log_file(project_dir): # Internal use only, cannot call out when the module is being imported
+def __config_log_file(project_dir, enqueue=False): # Internal use only, cannot call out when the module is being imported
     logger_path = Path(project_dir).joinpath("rectangle_logs.txt")
     if logger_path.exists():
         logger_path.unlink() # Delete the rectangle_logs.txt of the previous run if existed
@@ -314,7 +1547,15 @@ def __config_log_file(project_dir): # Internal use only, cannot call out when th
     logger.add(sink = logger_path, # The path to the .txt file that saves logs
             rotation="1 MB",  # Rotate when file reaches 1MB
             retention="10 days",  # Keep logs for 10 days
-            level="WARNING") # Only save the WARNING level and above
+            level="WARNING", # Only save the WARNING level and above
+            enqueue=enqueue) # Send the logs of all CPU cores through a queue to one writer (quiet mode)
+
+
+def __config_quiet_logging(): # Internal use only, cannot call out when the module is being imported
+    logger.remove() # Replace the default synchronous stderr sink (DEBUG level)
+    logger.add(sink = sys.stderr,
+            level="INFO", # Skip the DEBUG messages, their lazy arguments are never built
+            enqueue=True) # The CPU cores only put their logs in a queue, one thread of the main process writes them
 
 
 #--------------------------------------------------------------------------------------------------------------#
@@ -322,6 +1563,8 @@ def __config_log_file(project_dir): # Internal use only, cannot call out when th
 #--------------------------------------------------------------------------------------------------------------#
 
 def __parse_args():
+    from argparse import ArgumentParser, HelpFormatter # Only the command line needs it
+
     formatter = lambda prog: HelpFormatter(prog, width=200, max_help_position=50)
 
     parser = ArgumentParser(
@@ -333,9 +1576,21 @@ def __parse_args():
     
     parser.add_argument("-l", "--length", required=False, default=None, metavar="\b", help="Length of the rectangle (expected to be a positive number).")
     parser.add_argument("-w", "--width", required=False, default=None, metavar="\b", help="Width of the rectangle (expected to be a positive number).")
-    parser.add_argument("-i", "--input", required=False, default="", metavar="\b", help="Input path leading to a JSON file containing the length and width of a rectangle, or to a directory having multiple JSON input files.")
-    parser.add_argument("-o", "--output", required=False, default="", metavar="\b", help="Output path leading to a JSON file to store the results, or to a directory to store multiple JSON output files.")
+    parser.add_argument("-i", "--input", required=False, default="", metavar="\b", help="Input path leading to a JSON file containing the length and width of a rectangle, or to a directory having multiple JSON input files, or to a .jsonl file (\"-\" for stdin) having one rectangle per line.")
+    parser.add_argument("-o", "--output", required=False, default="", metavar="\b", help="Output path leading to a JSON file to store the results, or to a directory to store multiple JSON output files, or to a .jsonl file (\"-\" for stdout) when streaming JSON Lines.")
     parser.add_argument("-c", "--cores", required=False, default=2, type=int, metavar="\b", help="The number of CPU cores to be used for parallel computing.")
+    parser.add_argument("-s", "--chunk-size", required=False, default=0, type=int, metavar="\b", help="The number of JSON files sent to a CPU core at once (0 means automatically chosen from the number of files and cores).")
+    parser.add_argument("-f", "--format", required=False, default="json", choices=["json", "columnar", "parquet", "npy"], help="Output format of a multiple-files run: one JSON file per rectangle (default), or one columnar file for all rectangles (Parquet if pyarrow is installed, else .npy).")
+    parser.add_argument("--json-codec", required=False, default="auto", choices=["auto", "orjson", "msgspec", "json"], help="The decoder of the JSON inputs (auto: orjson or msgspec if installed, else the json module). The corrupted inputs are the same with all of them.")
+    parser.add_argument("--incremental", required=False, action="store_true", help="Keep the output directory and only recalculate the new or changed JSON files (tracked in a manifest next to the results).")
+    parser.add_argument("-q", "--quiet", required=False, action="store_true", help="Bulk processing: collapse the per-file messages into a summary (counts plus a sample of file names) and write the logs of all CPU cores through one queue.")
+    parser.add_argument("--read-threads", required=False, default=0, type=int, metavar="\b", help="Run a directory as a pipeline: this many threads read the JSON files ahead of a batched calculation (for network filesystems, 0 means disabled).")
+    parser.add_argument("--write-threads", required=False, default=0, type=int, metavar="\b", help="The number of threads saving the results in the pipeline (0 means as many as --read-threads).")
+    parser.add_argument("--watch", required=False, action="store_true", help="Keep running on the input directory and calculate the new or changed JSON files as they arrive (needs an output directory, stop with Ctrl+C).")
+    parser.add_argument("--poll-interval", required=False, default=1.0, type=float, metavar="\b", help="Seconds between two scans of the input directory in the watch mode.")
+    parser.add_argument("--watch-timeout", required=False, default=0.0, type=float, metavar="\b", help="Stop the watch mode after this many seconds (0 means running until Ctrl+C).")
+    parser.add_argument("--stats", required=False, action="store_true", help="Record the time of each stage, the bytes read/written and the valid/corrupted counts, then print them at the end.")
+    parser.add_argument("--stats-json", required=False, default="", metavar="\b", help="Also export the run statistics to this JSON file (implies --stats).")
 
     return parser.parse_args()
 
@@ -363,11 +1618,48 @@ def main():
         calculator._input = args.input
         calculator._output = args.output
         calculator._cores = args.cores
+        calculator._chunk_size = args.chunk_size
+        calculator._incremental = args.incremental
+        calculator._output_format = args.format
+        calculator._stats = RunStats() if (args.stats or args.stats_json != "") else None
+        calculator._quiet = args.quiet
+        calculator._codec = RectangleCodec(args.json_codec)
+        calculator._read_threads = args.read_threads
+        calculator._write_threads = args.write_threads
+
+        if calculator._quiet:
+            __config_quiet_logging()
+
+        run_summary = None
+        t_start = time.perf_counter()
 
-        if (calculator._input != "") and (Path(calculator._input).is_dir()):
+        if (calculator._input == "-") or ((Path(calculator._input).suffix == ".jsonl") and (Path(calculator._input).is_file())):
+            run_summary = __run_json_lines(calculator)
+
+            if calculator._output != "-":
+                output_file = colored(str(calculator._output), (139, 0, 0), attrs=["bold"])
+                logger.info(f"All results are saved in {output_file}\n")
+
+        elif (calculator._input != "") and (Path(calculator._input).is_dir()) and args.watch:
             calculator._input = Path(calculator._input)
             
-            input_json_files = [(entry.name,) for entry in calculator._input.glob("*.json")]
+            if str(calculator._output) == "":
+                logger.critical("The watch mode needs an output directory, given by -o (--output)\n")
+                return None
+            
+            if calculator._output_format != "json":
+                logger.warning("The watch mode only saves the JSON output format, one file per rectangle\n")
+            
+            calculator._incremental = True # Never delete the results of the previous runs
+            calculator._output = calculator._RectangleCalculator__validate_output_directory()
+            __config_log_file(calculator._input.parent, enqueue=calculator._quiet)
+
+            run_summary = __watch_directory(calculator, args.poll_interval, args.watch_timeout)
+
+        elif (calculator._input != "") and (Path(calculator._input).is_dir()):
+            calculator._input = Path(calculator._input)
+            
+            input_json_files = [entry.name for entry in calculator._input.glob("*.json")]
             calculator._json_count = len(input_json_files)
             
             if calculator._json_count > 1:
@@ -385,27 +1677,46 @@ def main():
                         answer = input(colored("Would you like to proceed? [y/n]: ", "blue", attrs=["bold"]))
 
                         if answer.lower() == "y":
-                            with multiprocessing.Pool(processes=calculator._cores) as pool:
-                                pool.starmap(func=calculator._single_workflow, iterable=input_json_files)
+                            run_summary = __run_multiple_files(calculator, input_json_files)
                         
                         else:
                             return None # stop the program
                         
                     case _:
-                        __config_log_file(calculator._input.parent) # Only produce rectangle_logs.txt if the input and output directories or files are given           
-                        
-                        with multiprocessing.Pool(processes=calculator._cores) as pool:
-                                pool.starmap(func=calculator._single_workflow, iterable=input_json_files)
+                        __config_log_file(calculator._input.parent, enqueue=calculator._quiet) # Only produce rectangle_logs.txt if the input and output directories or files are given           
                         
-                        # for entry in calculator._input.glob("*.json"):
-                        #     calculator._single_workflow(entry.name)
-                        
-                        output_dir = colored(str(calculator._output), (139, 0, 0), attrs=["bold"])
-                        logger.info(f"All result files are saved in {output_dir}\n")
+                        if calculator._output_format != "json":
+                            if calculator._incremental:
+                                logger.warning("The incremental mode only applies to the JSON output format, all files are recalculated\n")
+
+                            source_width = max(len(name) for name in input_json_files)
+                            with ColumnarResultWriter(calculator._output, len(input_json_files), source_width, calculator._output_format) as columnar_writer:
+                                run_summary = __run_multiple_files(calculator, input_json_files, columnar_writer)
+                            
+                            if calculator._stats is not None:
+                                calculator._stats.counts["bytes_written"] += columnar_writer.path.stat().st_size
+                            
+                            output_file = colored(str(columnar_writer.path), (139, 0, 0), attrs=["bold"])
+                            logger.info(f"All results are saved in {output_file}\n")
+
+                        else:
+                            if calculator._incremental:
+                                input_stats, previous_files, changed_json_files = __plan_incremental_run(calculator, input_json_files)
+                                run_summary = __run_multiple_files(calculator, changed_json_files)
+                                __save_manifest(calculator, input_stats, previous_files, run_summary)
+                            
+                            else:
+                                run_summary = __run_multiple_files(calculator, input_json_files)
+                            
+                            # for entry in calculator._input.glob("*.json"):
+                            #     calculator._single_workflow(entry.name)
+                            
+                            output_dir = colored(str(calculator._output), (139, 0, 0), attrs=["bold"])
+                            logger.info(f"All result files are saved in {output_dir}\n")
             
             elif calculator._json_count == 1:
                 logger.debug("Only one input JSON file is detected in the given directory. If the output path is also given, it should be in a file format.\n")
-                calculator._input = calculator._input.joinpath(input_json_files[0][0])
+                calculator._input = calculator._input.joinpath(input_json_files[0])
                 calculator._single_workflow(calculator._input)
                 calculator._display_saving_single_output_message()
             
@@ -433,6 +1744,9 @@ def main():
             calculator._single_workflow('')
             calculator._display_saving_single_output_message()
 
+        if calculator._stats is not None:
+            __report_stats(calculator, run_summary, time.perf_counter() - t_start, args.stats_json)
+
     
     except Exception as e:
         logger.critical(f"{e}\n")
@@ -445,3 +1759,4 @@ def main():
 if __name__ == "__main__":
     main()
     logger.info("Program ended! Thank you!\n")
+    logger.complete() # Wait for the queued logs (quiet mode) to be written
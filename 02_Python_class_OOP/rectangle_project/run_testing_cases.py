@@ -0,0 +1,232 @@
+'''
+Parallel runner of the 140 testing cases of the rectangle_module.py (listed in testing_cases.py)
+
+Every combination of --length/--width, --input and --output is run as its own command, in its own temporary directory
+(with fresh copies of the data and data_single directories), so the cases never see the results of each other
+and can run at the same time, --workers at once.
+
+For each case, the exit status, the files created, changed or deleted, the log messages and the duration are captured.
+They are then compared with the golden expectations of testing_cases_golden.json (the log messages without their time,
+source line and color, and the output files as a digest of their names and contents).
+
+It exits with an error if a case does not match its golden expectations (or has none).
+After an intended change of behavior, review the mismatches, then save the new expectations with --update-golden.
+
+Usage (must be in 02_Python_class_OOP/rectangle_project first):
+    python run_testing_cases.py
+    python run_testing_cases.py --workers 8 --slowest 10 --report testing_cases_report.json
+    python run_testing_cases.py --cases both_valid --update-golden
+'''
+
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from pathlib import Path
+import hashlib, json, os, re, shutil, subprocess, sys, tempfile, time
+
+PROJECT_DIR = Path(__file__).resolve().parent
+MODULE_PATH = PROJECT_DIR.joinpath("rectangle_module.py")
+GOLDEN_PATH = PROJECT_DIR.joinpath("testing_cases_golden.json")
+
+# The same dimensions as testing_cases.py, each value with the arguments it gives to the command
+LENGTH_WIDTH = {
+    "not_given": [],
+    "one_valid": ["-l", "2", "-w", "a"],
+    "both_valid": ["-w", "23", "-l", "55"],
+    "both_invalid": ["-l", "a", "-w", "b"],
+}
+INPUT = {
+    "not_given": [],
+    "dir_many_json": ["-i", "data"],
+    "dir_one_json": ["-i", "data_single"],
+    "dir_no_json": ["-i", "no_json"],
+    "json_file": ["-i", "data_single/rectangle_single.json"],
+    "other_file": ["-i", "notes.txt"],
+    "not_existed": ["-i", "abcxyz"],
+}
+OUTPUT = {
+    "not_given": [],
+    "not_existed_dir": ["-o", "result_test"],
+    "existed_dir": ["-o", "result_existed"],
+    "json_file": ["-o", "result_test.json"],
+    "not_json_file": ["-o", "result_test.txt"],
+}
+
+LOG_PREFIX = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d+ \| (\w+)\s*\| \S+ -( |$)") # Time | LEVEL | name:function:line - message
+ANSI_CODES = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def testing_cases():
+    '''
+    The 140 cases, in the order of testing_cases.py: (case name, command arguments).
+    '''
+    cases = []
+
+    for (length_width, length_width_args), (input, input_args), (output, output_args) in product(LENGTH_WIDTH.items(), INPUT.items(), OUTPUT.items()):
+        cases.append((f"{length_width}/{input}/{output}", length_width_args + input_args + output_args))
+
+    return cases
+
+
+def prepare_case_directory(case_dir):
+    '''
+    The inputs every case may point to. The output paths are relative, so they are created inside case_dir too.
+    '''
+    for input_dir in ["data", "data_single"]:
+        shutil.copytree(PROJECT_DIR.joinpath(input_dir), case_dir.joinpath(input_dir), ignore=shutil.ignore_patterns("*.py", "__pycache__"))
+
+    case_dir.joinpath("no_json").mkdir()
+    case_dir.joinpath("no_json", "notes.txt").write_text("A directory without any JSON file\n")
+    case_dir.joinpath("notes.txt").write_text("Not a JSON file\n")
+
+    case_dir.joinpath("result_existed").mkdir()
+    case_dir.joinpath("result_existed", "old_result.json").write_text('{"perimeter": 0, "area": 0}\n')
+
+
+def snapshot(case_dir):
+    # Path relative to case_dir -> (size, modification time) of every file
+    files = {}
+
+    for dir_path, _, file_names in os.walk(case_dir):
+        for file_name in file_names:
+            file_stat = os.stat(os.path.join(dir_path, file_name))
+            files[os.path.relpath(os.path.join(dir_path, file_name), case_dir)] = (file_stat.st_size, file_stat.st_mtime_ns)
+
+    return files
+
+
+def file_digest(case_dir, relative_paths):
+    digest = hashlib.sha256()
+
+    for relative_path in sorted(relative_paths):
+        digest.update(relative_path.encode())
+        digest.update(hashlib.sha256(case_dir.joinpath(relative_path).read_bytes()).digest())
+
+    return digest.hexdigest()
+
+
+def normalize_logs(text, case_dir):
+    '''
+    Keep "LEVEL | message" of each log line, without the time, the source line and the colors (which change from run to run).
+    The lines are sorted, as the CPU cores of a multiple-files run log at the same time.
+    '''
+    lines = []
+
+    for line in ANSI_CODES.sub("", text).replace(str(case_dir), "<case>").splitlines():
+        line = LOG_PREFIX.sub(r"\1 | ", line.rstrip()).rstrip() # A message starting with a new line leaves "LEVEL |"
+        if line != "":
+            lines.append(line)
+
+    return sorted(lines)
+
+
+def run_case(case_name, case_args, timeout, answer):
+    with tempfile.TemporaryDirectory(prefix="rectangle_case_") as temp_dir:
+        case_dir = Path(temp_dir).resolve()
+        prepare_case_directory(case_dir)
+        files_before = snapshot(case_dir)
+
+        t0 = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                [sys.executable, str(MODULE_PATH)] + case_args,
+                cwd=case_dir,
+                input=f"{answer}\n", # The answer to "Would you like to proceed? [y/n]" (multiple files without an output directory)
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            exit_code, stdout, stderr = completed.returncode, completed.stdout, completed.stderr
+
+        except subprocess.TimeoutExpired as e:
+            exit_code, stdout, stderr = "timeout", e.stdout or "", e.stderr or ""
+            stdout, stderr = [text.decode(errors="replace") if isinstance(text, bytes) else text for text in [stdout, stderr]]
+
+        duration = time.perf_counter() - t0
+
+        files_after = snapshot(case_dir)
+        changed_files = [
+            relative_path for relative_path, file_info in files_after.items()
+            if (files_before.get(relative_path) != file_info) and (relative_path != "rectangle_logs.txt") # The log file has the time of each message
+        ]
+        logs = normalize_logs(stdout + "\n" + stderr, case_dir)
+
+        result = {
+            "exit_code": exit_code,
+            "changed_files": len(changed_files),
+            "changed_files_digest": file_digest(case_dir, changed_files),
+            "deleted_files": sorted(set(files_before) - set(files_after)),
+            "log_file": "rectangle_logs.txt" in files_after,
+            "log_levels": dict(sorted(Counter(line.split(" | ")[0] for line in logs if " | " in line).items())),
+            "logs_digest": hashlib.sha256("\n".join(logs).encode()).hexdigest(),
+        }
+
+    return case_name, case_args, result, duration, logs
+
+
+def main():
+    parser = ArgumentParser(description="Run the testing cases of the rectangle_module.py in parallel and compare them with the golden expectations.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of cases running at the same time.")
+    parser.add_argument("--cases", default="", help="Only run the cases whose name (length_width/input/output) contains this text.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="A case running longer than this many seconds is stopped and failed.")
+    parser.add_argument("--answer", default="y", help="The answer given to the confirmation prompt of the rectangle_module.py.")
+    parser.add_argument("--slowest", type=int, default=5, help="Print the durations of this many slowest cases.")
+    parser.add_argument("--report", default="", help="Also save the results, the durations and the normalized logs of every case to this JSON file.")
+    parser.add_argument("--update-golden", action="store_true", help="Save the results of the run as the new golden expectations instead of comparing them.")
+    args = parser.parse_args()
+
+    cases = [(case_name, case_args) for case_name, case_args in testing_cases() if args.cases in case_name]
+    golden = json.loads(GOLDEN_PATH.read_text()) if GOLDEN_PATH.exists() else {}
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor: # Each case is its own process, the threads only wait for them
+        outcomes = list(executor.map(lambda case: run_case(*case, args.timeout, args.answer), cases))
+    total_time = time.perf_counter() - t0
+
+    failed_cases = []
+    for case_name, case_args, result, duration, _ in outcomes:
+        expected = golden.get(case_name)
+
+        if args.update_golden:
+            golden[case_name] = result
+
+        elif expected is None:
+            failed_cases.append(case_name)
+            print(f"NO GOLDEN: {case_name} (python rectangle_module.py {' '.join(case_args)})")
+
+        elif expected != result:
+            failed_cases.append(case_name)
+            differences = ", ".join(f"{key}: {expected.get(key)} -> {value}" for key, value in result.items() if expected.get(key) != value)
+            print(f"MISMATCH: {case_name} (python rectangle_module.py {' '.join(case_args)})\n    {differences}")
+
+    print(f"\n{len(cases)} cases in {total_time:.2f} s with {args.workers} workers ({sum(outcome[3] for outcome in outcomes):.2f} s of case time)")
+    print(f"The {min(args.slowest, len(outcomes))} slowest cases:")
+    for case_name, case_args, _, duration, _ in sorted(outcomes, key=lambda outcome: outcome[3], reverse=True)[:args.slowest]:
+        print(f"{duration:8.3f} s | {case_name:<40} | python rectangle_module.py {' '.join(case_args)}")
+
+    if args.report != "":
+        with open(args.report, "w") as report_pointer:
+            json.dump(
+                [
+                    {"case": case_name, "command": ["python", "rectangle_module.py"] + case_args, "duration": duration, "result": result, "logs": logs}
+                    for case_name, case_args, result, duration, logs in outcomes
+                ],
+                report_pointer,
+                indent=4
+            )
+
+    if args.update_golden:
+        GOLDEN_PATH.write_text(json.dumps({case_name: golden[case_name] for case_name, _ in testing_cases() if case_name in golden}, indent=4) + "\n")
+        print(f"\nThe golden expectations of {len(cases)} cases are saved in {GOLDEN_PATH.name}")
+
+    elif len(failed_cases) > 0:
+        print(f"\n{len(failed_cases)} of {len(cases)} cases FAILED")
+        sys.exit(1)
+
+    else:
+        print(f"\nAll {len(cases)} cases match the golden expectations")
+
+
+if __name__ == "__main__":
+    main()
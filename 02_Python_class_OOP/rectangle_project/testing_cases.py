@@ -2,6 +2,9 @@
 # --input:            : not_given, dir_many_json, dir_one_json, dir_no_json, json_file, other_file, not_existed
 # --output:           : not_given, existed_dir, not_existed_dir, json_file, not_json_file
 
+# Run all 140 cases at once, in parallel and each in its own temporary directory, against the golden expectations:
+#     python run_testing_cases.py (see its docstring for the options)
+
 from itertools import product
 import polars as pl
 